@@ -1,9 +1,11 @@
-from .fixed_length_chunking import fixed_length_chunking
-from .sliding_window_chunking import sliding_window_chunking
-from .sentence_chunking import sentence_based_chunking
-from .punctuation_chunking import punctuation_based_chunking
+from .spans import iter_word_spans, materialize
+from .fixed_length_chunking import fixed_length_chunking, iter_fixed_length_spans
+from .sliding_window_chunking import sliding_window_chunking, iter_sliding_window_spans
+from .sentence_chunking import sentence_based_chunking, iter_sentence_spans
+from .punctuation_chunking import punctuation_based_chunking, iter_punctuation_spans
 from .semantic_chunking import semantic_chunking
-from .chunking_factory import get_chunks
+from .embedding_chunking import embedding_semantic_chunking, split_sentences, group_sentences
+from .chunking_factory import get_chunks, iter_chunk_spans, SPAN_METHODS
 
 __all__ = [
     "fixed_length_chunking",
@@ -11,5 +13,16 @@ __all__ = [
     "sentence_based_chunking",
     "punctuation_based_chunking",
     "semantic_chunking",
-    "get_chunks"
+    "embedding_semantic_chunking",
+    "split_sentences",
+    "group_sentences",
+    "get_chunks",
+    "iter_chunk_spans",
+    "SPAN_METHODS",
+    "iter_word_spans",
+    "iter_fixed_length_spans",
+    "iter_sliding_window_spans",
+    "iter_sentence_spans",
+    "iter_punctuation_spans",
+    "materialize"
 ]
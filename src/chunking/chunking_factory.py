@@ -1,8 +1,13 @@
 from src.chunking import (fixed_length_chunking, sliding_window_chunking, sentence_based_chunking,
-                          punctuation_based_chunking, semantic_chunking)
+                          punctuation_based_chunking, semantic_chunking, embedding_semantic_chunking,
+                          iter_fixed_length_spans, iter_sliding_window_spans, iter_sentence_spans,
+                          iter_punctuation_spans)
 
+# Chunking methods whose chunks are contiguous spans of the text
+SPAN_METHODS = ("fixed_length", "sliding_window", "sentence_based", "punctuation_based")
 
-def get_chunks(content, method, chunk_size=100, overlap=0, num_topics=5):
+
+def get_chunks(content, method, chunk_size=100, overlap=0, num_topics=5, model=None):
     """
     Dispatches the appropriate chunking method.
 
@@ -11,6 +16,7 @@ def get_chunks(content, method, chunk_size=100, overlap=0, num_topics=5):
     :param chunk_size: Size of each chunk.
     :param overlap: Overlap size for sliding window chunking.
     :param num_topics: Number of topics for semantic chunking.
+    :param model: SentenceTransformer model for 'semantic_embedding' chunking, defaults to all-mpnet-base-v2.
     :return: A list of text chunks.
     """
     if method == "fixed_length":
@@ -23,5 +29,33 @@ def get_chunks(content, method, chunk_size=100, overlap=0, num_topics=5):
         return punctuation_based_chunking(content)
     elif method == "semantic":
         return semantic_chunking(content, num_topics, chunk_size)
+    elif method == "semantic_embedding":
+        if model is None:
+            from src.common.model_registry import get_embedding_model
+            model = get_embedding_model("all-mpnet-base-v2")
+        return embedding_semantic_chunking(content, model, chunk_size)
     else:
         raise ValueError(f"Invalid chunking method: {method}")
+
+
+def iter_chunk_spans(content, method, chunk_size=100, overlap=0):
+    """
+    Streams the chunks of a span-based method as (start, end) character offsets into
+    `content`, so large texts are chunked lazily and chunk strings are only built when needed.
+
+    :param content: The text to be chunked.
+    :param method: One of SPAN_METHODS.
+    :param chunk_size: Size of each chunk.
+    :param overlap: Overlap size for sliding window chunking.
+    :return: A generator of (start, end) offsets.
+    """
+    if method == "fixed_length":
+        return iter_fixed_length_spans(content, chunk_size)
+    elif method == "sliding_window":
+        return iter_sliding_window_spans(content, chunk_size, overlap)
+    elif method == "sentence_based":
+        return iter_sentence_spans(content)
+    elif method == "punctuation_based":
+        return iter_punctuation_spans(content)
+    else:
+        raise ValueError(f"Chunking method does not produce spans: {method}")
@@ -0,0 +1,97 @@
+from src.chunking.sentence_chunking import sent_tokenize
+import numpy as np
+
+
+def split_sentences(content, max_words=40):
+    """
+    :param content: The text to be chunked.
+    :param max_words: Sentences longer than this are split into pieces of `max_words`
+                      words (e.g. text whose punctuation was removed by cleaning).
+    :return: List of non-empty sentences, in document order.
+    """
+    sentences = []
+    for sentence in sent_tokenize(content):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            sentences.append(" ".join(words[start:start + max_words]))
+    return sentences
+
+
+def find_boundaries(embeddings, threshold=None, percentile=20):
+    """
+    Finds where the topic changes between adjacent sentences.
+
+    :param embeddings: float32 matrix with one row per sentence.
+    :param threshold: Cosine similarity below which a chunk ends; defaults to the
+                      `percentile` of the adjacent similarities of the document.
+    :param percentile: Percentile used when no threshold is given.
+    :return: Sorted indices of the sentences starting a new chunk.
+    """
+    if len(embeddings) < 2:
+        return np.empty(0, dtype=np.int64)
+    norms = np.linalg.norm(embeddings, axis=1)
+    normalized = embeddings / np.maximum(norms, 1e-12)[:, None]
+    similarities = np.einsum("ij,ij->i", normalized[:-1], normalized[1:])
+    if threshold is None:
+        threshold = np.percentile(similarities, percentile)
+    return np.flatnonzero(similarities < threshold) + 1
+
+
+def group_sentences(sentences, embeddings, chunk_size=100, threshold=None, percentile=20):
+    """
+    Groups consecutive sentences into chunks and derives the chunk vectors from the sentence vectors.
+
+    A chunk ends where the similarity of adjacent sentences drops (see `find_boundaries`)
+    or before it would exceed `chunk_size` words. The vector of a chunk is the mean of its
+    sentence vectors weighted by their length, normalized to unit length, so the chunks
+    do not have to be encoded again.
+
+    :param sentences: List of sentences, in document order.
+    :param embeddings: float32 matrix with one row per sentence.
+    :param chunk_size: Maximum number of words per chunk (a longer sentence is a chunk on its own).
+    :param threshold: Optional cosine similarity threshold, see `find_boundaries`.
+    :param percentile: Percentile of the adjacent similarities used when no threshold is given.
+    :return: Tuple (chunks, vectors) of the chunk texts and a float32 matrix with one row per chunk.
+    """
+    if not sentences:
+        return [], np.zeros((0, embeddings.shape[1] if embeddings.ndim == 2 else 0), dtype=np.float32)
+    boundaries = set(find_boundaries(embeddings, threshold, percentile).tolist())
+    words = [len(sentence.split()) for sentence in sentences]
+
+    groups = []
+    start, size = 0, 0
+    for index, count in enumerate(words):
+        if index > start and (index in boundaries or size + count > chunk_size):
+            groups.append((start, index))
+            start, size = index, 0
+        size += count
+    groups.append((start, len(sentences)))
+
+    weights = np.asarray([len(sentence) for sentence in sentences], dtype=np.float32)
+    vectors = np.empty((len(groups), embeddings.shape[1]), dtype=np.float32)
+    for row, (first, last) in enumerate(groups):
+        vector = weights[first:last] @ embeddings[first:last]
+        vectors[row] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+    chunks = [" ".join(sentences[first:last]) for first, last in groups]
+    return chunks, vectors
+
+
+def embedding_semantic_chunking(content, model, chunk_size=100, threshold=None, percentile=20, batch_size=64):
+    """
+    Splits content into chunks of consecutive sentences on similarity drops between sentence embeddings.
+
+    :param content: The text to be chunked.
+    :param model: SentenceTransformer model encoding the sentences.
+    :param chunk_size: Maximum number of words per chunk.
+    :param threshold: Optional cosine similarity threshold, see `find_boundaries`.
+    :param percentile: Percentile of the adjacent similarities used when no threshold is given.
+    :param batch_size: Number of sentences per forward pass.
+    :return: A list of semantic chunks, in document order.
+    """
+    sentences = split_sentences(content)
+    if not sentences:
+        return []
+    embeddings = model.encode(sentences, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+    chunks, _ = group_sentences(sentences, np.asarray(embeddings, dtype=np.float32), chunk_size, threshold,
+                                percentile)
+    return chunks
@@ -1,3 +1,17 @@
+from src.chunking.spans import iter_word_window_spans, join_words
+
+
+def iter_fixed_length_spans(content, chunk_size):
+    """
+    Streams fixed-length chunks of words as character offsets.
+
+    :param content: The text to be chunked.
+    :param chunk_size: Number of words per chunk.
+    :return: A generator of (start, end) offsets into `content`.
+    """
+    return iter_word_window_spans(content, chunk_size, chunk_size)
+
+
 def fixed_length_chunking(content, chunk_size):
     """
     Splits content into fixed-length chunks of words.
@@ -6,8 +20,4 @@ def fixed_length_chunking(content, chunk_size):
     :param chunk_size: Number of words per chunk.
     :return: A list of text chunks.
     """
-    words = content.split()
-    return [
-        " ".join(words[i:i + chunk_size])
-        for i in range(0, len(words), chunk_size)
-    ]
+    return join_words(content, iter_fixed_length_spans(content, chunk_size))
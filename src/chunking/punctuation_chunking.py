@@ -1,3 +1,21 @@
+def iter_punctuation_spans(content, delimiter=";"):
+    """
+    Streams the pieces between delimiters as character offsets, like `content.split(delimiter)`.
+
+    :param content: The text to be chunked.
+    :param delimiter: The punctuation mark to split on.
+    :return: A generator of (start, end) offsets into `content`.
+    """
+    start = 0
+    while True:
+        end = content.find(delimiter, start)
+        if end == -1:
+            yield start, len(content)
+            return
+        yield start, end
+        start = end + len(delimiter)
+
+
 def punctuation_based_chunking(content, delimiter=";"):
     """
     Splits content into chunks based on a punctuation delimiter.
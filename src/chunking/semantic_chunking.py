@@ -1,13 +1,6 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
-from sentence_transformers import SentenceTransformer
-from nltk.tokenize import sent_tokenize
+from src.chunking.sentence_chunking import sent_tokenize
 from textwrap import wrap
 import numpy as np
-import nltk
-
-# Ensure NLTK tokenizer is available
-nltk.download('punkt_tab')
 
 def semantic_chunking(content, num_topics=5, chunk_size=100):
     """
@@ -18,6 +11,10 @@ def semantic_chunking(content, num_topics=5, chunk_size=100):
     :param chunk_size: Size of each semantic chunk.
     :return: A list of semantic chunks.
     """
+    # scikit-learn is only loaded when semantic chunking is used
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+
     # Tokenize sentences
     sentences = sent_tokenize(content)
 
@@ -1,4 +1,55 @@
-from nltk.tokenize import sent_tokenize
+import threading
+import nltk
+from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+
+_punkt_lock = threading.Lock()
+_punkt_ready = False
+
+
+def ensure_punkt():
+    """
+    Downloads the NLTK sentence tokenizer data the first time it is needed, instead of at import.
+    """
+    global _punkt_ready
+    if _punkt_ready:
+        return
+    with _punkt_lock:
+        if _punkt_ready:
+            return
+        try:
+            nltk.data.find("tokenizers/punkt_tab")
+        except LookupError:
+            nltk.download("punkt_tab")
+        _punkt_ready = True
+
+
+def sent_tokenize(content):
+    """
+    Splits content into sentences, see `nltk.tokenize.sent_tokenize`.
+
+    :param content: The text to be split.
+    :return: A list of sentences.
+    """
+    ensure_punkt()
+    return nltk_sent_tokenize(content)
+
+
+def iter_sentence_spans(content):
+    """
+    Streams the sentences of content as character offsets.
+
+    :param content: The text to be split.
+    :return: A generator of (start, end) offsets into `content`.
+    """
+    position = 0
+    for sentence in sent_tokenize(content):
+        # The tokenizer returns substrings of the text, they are located in order
+        start = content.find(sentence, position)
+        if start == -1:
+            continue
+        position = start + len(sentence)
+        yield start, position
+
 
 def sentence_based_chunking(content):
     """
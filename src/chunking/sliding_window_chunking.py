@@ -1,3 +1,18 @@
+from src.chunking.spans import iter_word_window_spans, join_words
+
+
+def iter_sliding_window_spans(content, chunk_size, overlap):
+    """
+    Streams overlapping chunks of words as character offsets.
+
+    :param content: The text to be chunked.
+    :param chunk_size: Number of words per chunk.
+    :param overlap: Number of overlapping words between chunks.
+    :return: A generator of (start, end) offsets into `content`.
+    """
+    return iter_word_window_spans(content, chunk_size, chunk_size - overlap)
+
+
 def sliding_window_chunking(content, chunk_size, overlap):
     """
     Splits content into overlapping chunks using a sliding window.
@@ -7,8 +22,4 @@ def sliding_window_chunking(content, chunk_size, overlap):
     :param overlap: Number of overlapping words between chunks.
     :return: A list of overlapping text chunks.
     """
-    words = content.split()
-    return [
-        " ".join(words[i:i + chunk_size])
-        for i in range(0, len(words), chunk_size - overlap)
-    ]
+    return join_words(content, iter_sliding_window_spans(content, chunk_size, overlap))
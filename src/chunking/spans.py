@@ -0,0 +1,58 @@
+import re
+
+_word = re.compile(r"\S+")
+
+
+def iter_word_spans(content):
+    """
+    :param content: The text to be split.
+    :return: A generator of the (start, end) character offsets of the words of the text.
+    """
+    for match in _word.finditer(content):
+        yield match.span()
+
+
+def iter_word_window_spans(content, chunk_size, step):
+    """
+    Streams windows of `chunk_size` words starting every `step` words, like slicing
+    `content.split()`, without splitting the whole text or copying the words.
+
+    :param content: The text to be chunked.
+    :param chunk_size: Number of words per window.
+    :param step: Number of words between the starts of two windows.
+    :return: A generator of (start, end) character offsets; the windows at the end of the text may be shorter.
+    """
+    if chunk_size <= 0 or step <= 0:
+        raise ValueError(f"Invalid window of {chunk_size} words every {step} words")
+    window = []
+    skip = 0  # Words between two windows when the step is larger than the window
+    for span in iter_word_spans(content):
+        if skip:
+            skip -= 1
+            continue
+        window.append(span)
+        if len(window) == chunk_size:
+            yield window[0][0], window[-1][1]
+            del window[:step]
+            skip = max(step - chunk_size, 0)
+    while window:
+        yield window[0][0], window[-1][1]
+        del window[:step]
+
+
+def materialize(content, spans):
+    """
+    :param content: The chunked text.
+    :param spans: Iterable of (start, end) offsets.
+    :return: The list of chunk texts.
+    """
+    return [content[start:end] for start, end in spans]
+
+
+def join_words(content, spans):
+    """
+    :param content: The chunked text.
+    :param spans: Iterable of (start, end) offsets.
+    :return: The list of chunk texts with their words joined by single spaces.
+    """
+    return [" ".join(content[start:end].split()) for start, end in spans]
@@ -1,5 +1,6 @@
 from .logger import logger
 from .config_loader import load_config
 from .db import Base, engine
-from .utils import construct_mongo_uri, get_qdrant_config, get_mongodb_config, get_processing_config
-from .embedding_model import generate_embedding
\ No newline at end of file
+from .utils import construct_mongo_uri, get_qdrant_config, get_mongodb_config, get_processing_config, get_ingestion_config
+from .model_registry import ModelRegistry, model_registry, get_embedding_model, get_pipeline_embedding_model
+from .embedding_model import generate_embedding
@@ -1,18 +1,21 @@
 # File: src/common/embedding_model.py
-from sentence_transformers import SentenceTransformer
+from src.common.model_registry import get_embedding_model
 
-# Load model once globally
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")  # Small & fast
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # Small & fast
 
 
-def generate_embedding(text):
+def generate_embedding(text, model_name=DEFAULT_MODEL, backend="torch"):
     """
     Generates an embedding for a given text using SentenceTransformers.
 
+    The model is loaded on first use and shared through the model registry.
+
     Args:
         text (str): Input text.
+        model_name (str): Name of the embedding model.
+        backend (str): Inference backend ("torch", "onnx" or "onnx-int8").
 
     Returns:
         list: Embedding vector.
     """
-    return model.encode(text).tolist()  # Convert to list for JSON compatibility
+    return get_embedding_model(model_name, backend).encode(text).tolist()  # Convert to list for JSON compatibility
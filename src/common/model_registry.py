@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+def load_sentence_transformer(model_name, backend="torch", export_dir="models/onnx", quantization="avx2",
+                              **options):
+    """
+    Loads a SentenceTransformer model.
+
+    :param model_name: Name or path of the model.
+    :param backend: "torch" (fp32 PyTorch), "onnx" (ONNX Runtime) or "onnx-int8"
+                    (ONNX Runtime with dynamically quantized int8 weights).
+    :param export_dir: Folder the quantized ONNX exports are stored in.
+    :param quantization: Quantization config of the int8 export ("avx2", "avx512", "avx512_vnni", "arm64").
+    :param options: Keyword arguments of SentenceTransformer (e.g. device).
+    :return: The loaded model.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, **options)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", **options)
+    if backend == "onnx-int8":
+        return load_quantized_onnx_model(model_name, export_dir, quantization, **options)
+    raise ValueError(f"Invalid embedding backend: {backend}")
+
+
+def load_quantized_onnx_model(model_name, export_dir, quantization="avx2", **options):
+    """
+    Loads the int8 ONNX export of a model, exporting and quantizing it on first use.
+
+    :param model_name: Name or path of the model.
+    :param export_dir: Folder the exports are stored in, one sub-folder per model.
+    :param quantization: Quantization config of the export.
+    :param options: Keyword arguments of SentenceTransformer (e.g. device).
+    :return: The loaded model.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model_dir = os.path.join(export_dir, model_name.replace("/", "__"))
+    # The default export name depends on the config (qint8 or quint8), the suffix is set explicitly
+    file_suffix = f"int8_{quantization}"
+    file_name = f"onnx/model_{file_suffix}.onnx"
+    if not os.path.exists(os.path.join(model_dir, file_name)):
+        print(f"Exporting {model_name} to ONNX with int8 quantization ({quantization})")
+        try:
+            model = SentenceTransformer(model_name, backend="onnx", **options)
+            model.save(model_dir)
+            export_dynamic_quantized_onnx_model(model, quantization, model_dir, file_suffix=file_suffix)
+        except ImportError as e:
+            raise Exception(f"The onnx-int8 backend requires sentence-transformers[onnx]: {e}")
+    return SentenceTransformer(model_dir, backend="onnx", model_kwargs={"file_name": file_name}, **options)
+
+
+def model_memory_bytes(model):
+    """
+    Estimates the resident size of a model from its parameters and buffers.
+
+    :param model: A torch module (SentenceTransformer) or any object.
+    :return: Approximate size in bytes, 0 when it cannot be estimated.
+    """
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except (AttributeError, TypeError):
+        return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+
+    Each (model name, options) pair is loaded once and shared by every caller. The
+    number of resident models is bounded by `max_models` and their estimated size by
+    `max_memory_bytes`; the least recently used model is evicted first. Lookups are
+    thread-safe, and concurrent requests for a model that is still loading wait for
+    that load instead of starting another one.
+    """
+
+    def __init__(self, max_models=2, max_memory_bytes=None, loader=load_sentence_transformer):
+        """
+        :param max_models: Maximum number of resident models.
+        :param max_memory_bytes: Optional maximum estimated size of the resident models.
+        :param loader: Callable (model_name, **options) loading a model.
+        """
+        self.max_models = max_models
+        self.max_memory_bytes = max_memory_bytes
+        self.loader = loader
+        self.models = OrderedDict()  # key -> (model, memory_bytes), least recently used first
+        self.loading = {}  # key -> threading.Event set once the load finished
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_times = {}
+
+    @classmethod
+    def from_env(cls, **options):
+        """
+        Creates a registry bounded by the MODEL_REGISTRY_MAX_MODELS (default 2) and
+        MODEL_REGISTRY_MAX_MEMORY_MB (unbounded when unset) environment variables.
+
+        :param options: Other keyword arguments of the registry (e.g. loader).
+        :return: The registry.
+        """
+        max_memory_mb = os.getenv("MODEL_REGISTRY_MAX_MEMORY_MB")
+        return cls(
+            max_models=int(os.getenv("MODEL_REGISTRY_MAX_MODELS", 2)),
+            max_memory_bytes=int(float(max_memory_mb) * 1024 ** 2) if max_memory_mb else None,
+            **options
+        )
+
+    def get(self, model_name, **options):
+        """
+        Returns a loaded model, loading it on first use.
+
+        :param model_name: Name or path of the model.
+        :param options: Keyword arguments passed to the loader (e.g. device).
+        :return: The model.
+        """
+        key = (model_name, tuple(sorted(options.items())))
+        while True:
+            with self.lock:
+                if key in self.models:
+                    self.models.move_to_end(key)
+                    self.hits += 1
+                    return self.models[key][0]
+                loaded = self.loading.get(key)
+                if loaded is None:
+                    self.misses += 1
+                    loaded = self.loading[key] = threading.Event()
+                    break
+            # Another thread is loading this model, use its result (or retry if it failed)
+            loaded.wait()
+
+        try:
+            start = time.perf_counter()
+            model = self.loader(model_name, **options)
+            load_time = time.perf_counter() - start
+            memory_bytes = model_memory_bytes(model)
+            print(f"Loaded model {model_name} in {load_time:.2f}s ({memory_bytes / 1024 ** 2:.0f} MB)")
+            with self.lock:
+                self.load_times.setdefault(model_name, []).append(round(load_time, 3))
+                self.models[key] = (model, memory_bytes)
+                self._evict(keep=key)
+            return model
+        finally:
+            with self.lock:
+                self.loading.pop(key).set()
+
+    def _evict(self, keep):
+        """
+        Evicts least recently used models until the limits hold. Called with the lock held.
+        """
+        while len(self.models) > 1 and (
+                len(self.models) > self.max_models
+                or (self.max_memory_bytes is not None
+                    and sum(memory for _, memory in self.models.values()) > self.max_memory_bytes)):
+            key = next(iter(self.models))
+            if key == keep:
+                break
+            del self.models[key]
+            self.evictions += 1
+            print(f"Evicted model {key[0]}")
+
+    def clear(self):
+        """
+        Drops every resident model.
+        """
+        with self.lock:
+            self.models.clear()
+
+    def stats(self):
+        """
+        :return: Dictionary with the hits, misses, evictions, load times (seconds per
+                 load, by model) and the resident models with their estimated size.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_times": {name: list(times) for name, times in self.load_times.items()},
+                "resident_models": [
+                    {"model": key[0], "options": dict(key[1]), "memory_bytes": memory}
+                    for key, (_, memory) in self.models.items()
+                ],
+                "resident_memory_bytes": sum(memory for _, memory in self.models.values())
+            }
+
+
+model_registry = ModelRegistry.from_env()
+
+
+def get_embedding_model(model_name, backend="torch", **options):
+    """
+    Returns the shared instance of an embedding model.
+
+    :param model_name: Name or path of the SentenceTransformer model.
+    :param backend: Inference backend ("torch", "onnx" or "onnx-int8").
+    :param options: Keyword arguments of `load_sentence_transformer` (e.g. device, export_dir).
+    :return: The loaded model.
+    """
+    if backend != "torch":
+        options["backend"] = backend
+    return model_registry.get(model_name, **options)
+
+
+def get_pipeline_embedding_model(processing_config, default_model="all-mpnet-base-v2"):
+    """
+    Returns the embedding model configured for a pipeline.
+
+    :param processing_config: Pipeline processing config (`embedding_model`, `embedding_backend`,
+                              `onnx_export_dir`, `onnx_quantization`).
+    :param default_model: Model used when the config does not name one.
+    :return: Tuple (model_name, backend, model).
+    """
+    model_name = processing_config.get("embedding_model", default_model)
+    backend = processing_config.get("embedding_backend", "torch")
+    options = {}
+    if backend == "onnx-int8":
+        options["export_dir"] = processing_config.get("onnx_export_dir", "models/onnx")
+        options["quantization"] = processing_config.get("onnx_quantization", "avx2")
+    return model_name, backend, get_embedding_model(model_name, backend, **options)
@@ -74,3 +74,11 @@ def get_processing_config(db, pipeline_id: int):
     if not pipeline:
         return {"error": "Pipeline not found"}
     return pipeline.processing_config
+
+
+def get_ingestion_config(db, pipeline_id: int):
+    # Fetch pipeline details
+    pipeline = get_pipeline_by_id(db, pipeline_id)
+    if not pipeline:
+        return {"error": "Pipeline not found"}
+    return pipeline.ingestion_config or {}
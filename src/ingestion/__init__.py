@@ -1,6 +1,10 @@
-from .file_ingestion import ingest_files
-from .confluence_ingestion import ingest_confluence
-from .database_ingestion import ingest_database
-from .log_ingestion import ingest_logs
-from .datalake_ingestion import ingest_datalake
-# from .stream_ingestion import ingest_stream
+from .file_ingestion import ingest_files, iter_files
+from .extractors import register_extractor, get_extractor, supported_extensions, iter_extract
+from .confluence_ingestion import ingest_confluence, iter_confluence
+from .database_ingestion import ingest_database, iter_database
+from .log_ingestion import ingest_logs, iter_logs
+from .datalake_ingestion import ingest_datalake, iter_datalake
+from .stream_ingestion import MessageBroker, InMemoryBroker, KafkaBroker, run_stream_ingestion
+from .manifest import IngestionManifest
+from .pdf_extraction import PdfPageCache, extract_pdf_pages, iter_pdf_pages
+from .web_ingestion import fetch_from_web_page, iter_crawl
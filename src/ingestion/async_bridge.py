@@ -0,0 +1,27 @@
+import asyncio
+
+
+def iter_async(async_iterable):
+    """
+    Consumes an async iterable from synchronous code.
+
+    The iterable runs on a private event loop that only advances while the caller
+    asks for the next item, so the consumer applies natural backpressure.
+
+    :param async_iterable: Async iterable (e.g. an async generator).
+    :return: A generator of the items of the async iterable.
+    """
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        if hasattr(iterator, "aclose"):
+            loop.run_until_complete(iterator.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -1,13 +1,148 @@
-import requests
+import asyncio
+import random
+import httpx
+from src.ingestion.async_bridge import iter_async
 
-def ingest_confluence(api_url, auth):
+
+def ingest_confluence(api_url, auth, **options):
     """
     Fetches content from Confluence pages.
     :param api_url: Confluence API URL.
     :param auth: Authentication credentials (username and API token).
     :return: List of Confluence page content.
     """
-    response = requests.get(api_url, auth=(auth["username"], auth["api_token"]))
-    response.raise_for_status()
-    pages = response.json()["results"]
-    return [{"source": "confluence", "content": page["body"]["storage"]["value"], "metadata": {"id": page["id"], "title": page["title"]}} for page in pages]
+    return list(iter_confluence(api_url, auth, **options))
+
+
+def iter_confluence(api_url, auth, stored_versions=None, **options):
+    """
+    Streams Confluence pages, following the pagination of the content listing.
+
+    :param api_url: Confluence content API URL (e.g. https://host/wiki/rest/api/content).
+    :param auth: Authentication credentials (username and API token).
+    :param stored_versions: Dictionary mapping page filepath to the version already stored.
+                            Pages with the same version are skipped.
+    :param options: Keyword arguments of `aiter_confluence`.
+    :return: A generator of page documents.
+    """
+    return iter_async(aiter_confluence(api_url, auth, stored_versions, **options))
+
+
+async def aiter_confluence(api_url, auth, stored_versions=None, concurrency=8, page_size=50,
+                           max_retries=5, timeout=30.0, transport=None):
+    """
+    Lists Confluence pages and fetches the bodies of new or updated pages concurrently.
+
+    :param api_url: Confluence content API URL.
+    :param auth: Authentication credentials (username and API token).
+    :param stored_versions: Dictionary mapping page filepath to the version already stored.
+    :param concurrency: Maximum number of requests in flight.
+    :param page_size: Number of pages per listing request.
+    :param max_retries: Retries on 429 and 5xx responses, connection errors and timeouts.
+    :param timeout: Request timeout in seconds.
+    :param transport: Optional httpx transport (e.g. to target a stub server in tests).
+    :return: An async generator of page documents.
+    """
+    stored_versions = stored_versions or {}
+    api_url = api_url.rstrip("/")
+    semaphore = asyncio.Semaphore(concurrency)
+    client = httpx.AsyncClient(
+        auth=(auth["username"], auth["api_token"]) if auth else None,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        transport=transport
+    )
+    fetched = 0
+    skipped = 0
+    async with client:
+        async for pages in _iter_listing(client, api_url, page_size, max_retries):
+            changed = []
+            for page in pages:
+                filepath = f"{api_url}/{page['id']}"
+                if stored_versions.get(filepath) == page.get("version", {}).get("number"):
+                    skipped += 1
+                    continue
+                changed.append(page)
+
+            tasks = [_fetch_page(client, semaphore, api_url, page["id"], max_retries) for page in changed]
+            for task in asyncio.as_completed(tasks):
+                try:
+                    page = await task
+                except Exception as e:
+                    print(f"Failed to fetch Confluence page: {e}")
+                    continue
+                fetched += 1
+                yield _page_to_document(api_url, page, stored_versions)
+
+    print(f"Fetched {fetched} Confluence pages, skipped {skipped} unchanged pages")
+
+
+async def _iter_listing(client, api_url, page_size, max_retries):
+    """
+    Yields the `results` of every page of the content listing.
+    """
+    url = api_url
+    params = {"limit": page_size, "start": 0, "expand": "version"}
+    while url:
+        payload = await _get_json(client, url, params, max_retries)
+        results = payload.get("results", [])
+        if results:
+            yield results
+
+        links = payload.get("_links", {})
+        if links.get("next"):
+            # The next link is relative to the wiki base and already carries the query string
+            url = links.get("base", "") + links["next"] if links["next"].startswith("/") else links["next"]
+            params = None
+        elif params is not None and len(results) == page_size:
+            params = {**params, "start": params["start"] + page_size}
+        else:
+            url = None
+
+
+async def _fetch_page(client, semaphore, api_url, page_id, max_retries):
+    async with semaphore:
+        return await _get_json(client, f"{api_url}/{page_id}", {"expand": "body.storage,version"}, max_retries)
+
+
+async def _get_json(client, url, params, max_retries):
+    """
+    GETs a JSON document, retrying with exponential backoff on 429 and 5xx responses,
+    connection errors and timeouts.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.get(url, params=params)
+        except httpx.TransportError:
+            # Connection failures, resets and timeouts (httpx.TimeoutException)
+            if attempt == max_retries:
+                raise
+            await _backoff(attempt)
+            continue
+        if response.status_code != 429 and response.status_code < 500:
+            response.raise_for_status()
+            return response.json()
+        if attempt == max_retries:
+            response.raise_for_status()
+        await _backoff(attempt, response.headers.get("Retry-After"))
+
+
+async def _backoff(attempt, retry_after=None):
+    delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+    await asyncio.sleep(delay + random.uniform(0, 0.5))
+
+
+def _page_to_document(api_url, page, stored_versions):
+    filepath = f"{api_url}/{page['id']}"
+    return {
+        "source": "confluence",
+        "content": page["body"]["storage"]["value"],
+        "metadata": {
+            "id": page["id"],
+            "title": page["title"],
+            "version": page.get("version", {}).get("number"),
+            "filepath": filepath,
+            "filename": page["title"],
+            "change": "modified" if filepath in stored_versions else "new"
+        }
+    }
@@ -1,19 +1,229 @@
-import psycopg2
+import threading
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from psycopg2 import pool, sql
 
-def ingest_database(config):
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+def get_connection_pool(config, minconn=1, maxconn=5):
+    """
+    Returns the process-wide connection pool of a database, creating it on first use.
+
+    :param config: Connection settings (host, port, database, user, password).
+    :param minconn: Minimum number of pooled connections.
+    :param maxconn: Maximum number of pooled connections.
+    :return: A psycopg2 ThreadedConnectionPool.
+    """
+    key = (config["host"], config["port"], config["database"], config["user"])
+    with _connection_pools_lock:
+        if key not in _connection_pools:
+            _connection_pools[key] = pool.ThreadedConnectionPool(
+                minconn,
+                config.get("max_connections", maxconn),
+                host=config["host"],
+                port=config["port"],
+                database=config["database"],
+                user=config["user"],
+                password=config["password"]
+            )
+        return _connection_pools[key]
+
+
+def ingest_database(config, query=None):
+    """
+    Fetches all rows of a query as documents.
+
+    :param config: Connection settings.
+    :param query: SQL query to run (required).
+    :return: List of documents.
+    """
     try:
-        conn = psycopg2.connect(
-            host=config["host"],
-            port=config["port"],
-            database=config["database"],
-            user=config["user"],
-            password=config["password"]
-        )
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM your_table")  # Replace with your query
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        conn.close()
-        return [dict(zip(columns, row)) for row in rows]
+        return list(iter_database(config, {"name": config.get("database", "unknown"), "query": query}))
+    except ValueError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error fetching data from database: {str(e)}")
+
+
+def iter_database(config, source_config=None, watermark=None, last_key=None):
+    """
+    Streams the rows of a query as documents, without loading the result in memory.
+
+    Rows are read in `batch_size` batches through a named server-side cursor, or with
+    keyset pagination on `key_column` when it is configured. When `watermark_column`
+    is set, rows are read in (watermark, key) order, every document carries a
+    checkpoint with its watermark (as an ISO-8601 string for dates, with its time
+    zone) and key, and a run resumes after the checkpoint of the previous one. Without
+    a key column (or a stored key), rows at the stored watermark are read again.
+
+    Source config keys:
+      - query: SQL query producing the rows (required).
+      - content_columns: Columns joined into the document content (default: `content`
+        if present, otherwise every column as "column: value" lines).
+      - metadata_columns: Columns copied into the metadata (default: all non-content columns).
+      - id_column: Column identifying a row; used to build the document filepath.
+      - key_column: Column used for keyset pagination instead of a server-side cursor.
+      - watermark_column: Monotonic column (e.g. updated_at) used for incremental runs.
+      - batch_size: Number of rows fetched per round-trip.
+
+    :param config: Connection settings.
+    :param source_config: Data source configuration.
+    :param watermark: Last watermark value stored for the source.
+    :param last_key: Key of the last row stored for the source, at that watermark.
+    :return: A generator of documents.
+    """
+    source_config = source_config or {}
+    query = source_config.get("query")
+    if not query:
+        raise ValueError(f"Database source {source_config.get('name', 'unknown')} has no query configured")
+    batch_size = int(source_config.get("batch_size", 1000))
+    key_column = source_config.get("key_column")
+    watermark_column = source_config.get("watermark_column")
+    order_by = _order_columns(source_config)
+    resume = None
+    if watermark_column and watermark is not None:
+        if last_key is not None and len(order_by) == 2:
+            resume = (order_by, [watermark, last_key], False)
+        else:
+            # Rows sharing the watermark may not all have been stored, they are read again
+            resume = ([watermark_column], [watermark], True)
+
+    connection_pool = get_connection_pool(config)
+    conn = connection_pool.getconn()
+    try:
+        if key_column:
+            rows = _iter_keyset(conn, query, order_by, resume, batch_size)
+        else:
+            rows = _iter_server_side(conn, query, order_by, resume, batch_size)
+
+        for columns, row in rows:
+            yield _row_to_document(dict(zip(columns, row)), config, source_config)
+    finally:
+        conn.rollback()
+        connection_pool.putconn(conn)
+
+
+def _order_columns(source_config):
+    """
+    :return: The columns the rows are read in: (watermark, key) with a watermark, so
+             checkpoints only move forward and identify a row, else the key column.
+    """
+    watermark_column = source_config.get("watermark_column")
+    key_column = source_config.get("key_column") or source_config.get("id_column")
+    columns = [column for column in (watermark_column, key_column) if column]
+    return columns if watermark_column else columns[-1:]
+
+
+def _iter_server_side(conn, query, order_by, resume, batch_size):
+    statement, params = _filtered_query(query, resume, order_by=order_by)
+    with conn.cursor(name=f"ingest_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(statement, params)
+        columns = None
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if columns is None:
+                columns = [desc[0] for desc in cursor.description]
+            for row in rows:
+                yield columns, row
+
+
+def _iter_keyset(conn, query, key_columns, resume, batch_size):
+    # The first page starts after the checkpoint, the next ones after the last row read
+    lower_bound = resume
+    with conn.cursor() as cursor:
+        while True:
+            statement, params = _filtered_query(query, lower_bound, order_by=key_columns, limit=batch_size)
+            cursor.execute(statement, params)
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            columns = [desc[0] for desc in cursor.description]
+            key_indexes = [columns.index(column) for column in key_columns]
+            for row in rows:
+                yield columns, row
+            lower_bound = (key_columns, [rows[-1][index] for index in key_indexes], False)
+            if len(rows) < batch_size:
+                break
+
+
+def _filtered_query(query, lower_bound=None, order_by=None, limit=None):
+    """
+    Wraps the configured query with a lower bound, an order and a limit.
+
+    :param lower_bound: Optional tuple (columns, values, inclusive): only rows whose
+                        columns compare greater (or equal) to the values are read.
+    :return: Tuple (statement, params).
+    """
+    params = []
+    if not lower_bound and not order_by and limit is None:
+        return sql.SQL(query), params
+
+    statement = sql.SQL("SELECT * FROM ({}) AS source_rows").format(sql.SQL(query))
+    if lower_bound:
+        columns, values, inclusive = lower_bound
+        statement += sql.SQL(" WHERE ({}) {} ({})").format(
+            sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+            sql.SQL(">=" if inclusive else ">"),
+            sql.SQL(", ").join(sql.Placeholder() for _ in columns)
+        )
+        params.extend(values)
+    if order_by:
+        statement += sql.SQL(" ORDER BY ") + sql.SQL(", ").join(sql.Identifier(column) for column in order_by)
+    if limit is not None:
+        statement += sql.SQL(" LIMIT %s")
+        params.append(limit)
+    return statement, params
+
+
+def _row_to_document(row, config, source_config):
+    content_columns = source_config.get("content_columns") or (["content"] if "content" in row else list(row))
+    metadata_columns = source_config.get("metadata_columns") or [c for c in row if c not in content_columns]
+
+    if len(content_columns) == 1:
+        value = row.get(content_columns[0])
+        content = "" if value is None else str(value)
+    else:
+        content = "\n".join(f"{column}: {row[column]}" for column in content_columns if row.get(column) is not None)
+
+    metadata = {column: _to_bson_value(row.get(column)) for column in metadata_columns}
+    id_column = source_config.get("id_column") or source_config.get("key_column")
+    if id_column:
+        metadata["filepath"] = f"db://{config['database']}/{source_config.get('name', 'query')}/{row[id_column]}"
+        metadata["filename"] = str(row[id_column])
+        # A row read again after an update replaces its stored document
+        metadata["change"] = "modified"
+
+    watermark_column = source_config.get("watermark_column")
+    if watermark_column:
+        order_by = _order_columns(source_config)
+        metadata["checkpoint"] = {
+            "watermark": _checkpoint_value(row[watermark_column]),
+            "key": _checkpoint_value(row[order_by[1]]) if len(order_by) == 2 else None
+        }
+
+    return {"content": content, "metadata": metadata}
+
+
+def _checkpoint_value(value):
+    # Dates are kept as ISO-8601 strings: BSON datetimes lose microseconds and the time zone
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_bson_value(value):
+    if value is None or isinstance(value, (str, int, float, bool, datetime)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
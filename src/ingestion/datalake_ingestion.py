@@ -1,12 +1,186 @@
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from src.ingestion.extractors import get_extractor, iter_extract
+from src.ingestion.file_ingestion import extract_file
 
-def ingest_datalake(bucket_name, prefix):
+
+def ingest_datalake(bucket_name, prefix, **options):
     """
     Fetches data from an S3 data lake.
     :param bucket_name: S3 bucket name.
     :param prefix: S3 prefix for files.
-    :return: List of objects from S3.
+    :return: List of documents extracted from the S3 objects.
+    """
+    return list(iter_datalake(bucket_name, prefix, **options))
+
+
+def iter_datalake(bucket_name, prefix, stored_etags=None, ingestion_config=None, workers=8,
+                  max_download_concurrency=4, s3_client=None):
+    """
+    Streams documents extracted from the objects under an S3 prefix.
+
+    The listing is paginated, objects whose ETag matches the one stored when they were
+    completely ingested are skipped, and the remaining objects are downloaded (ranged,
+    multi-part for large objects) and extracted with the registered file extractors
+    through a bounded thread pool.
+    Objects with a streaming extractor (CSV, JSONL) are only downloaded by the pool;
+    their records are read lazily from the temporary file while they are consumed.
+    The last document of an object carries the `document_count` of the object, which
+    marks it as completely stored.
+
+    :param bucket_name: S3 bucket name.
+    :param prefix: S3 prefix for files.
+    :param stored_etags: Dictionary mapping the s3:// filepath of each stored object to the
+                         ETag it was completely stored with, or None when only part of its
+                         documents were stored (they are replaced).
+    :param ingestion_config: Pipeline ingestion config, passed to the extractors.
+    :param workers: Number of objects downloaded and extracted at the same time.
+    :param max_download_concurrency: Ranged requests per object download.
+    :param s3_client: Optional boto3 S3 client (e.g. pointing to a local S3 stand-in).
+    :return: A generator of documents.
+    """
+    s3 = s3_client or boto3.client("s3")
+    transfer_config = TransferConfig(max_concurrency=max_download_concurrency)
+    options = dict(ingestion_config or {})
+    options["pdf_page_workers"] = 1
+    stored_etags = stored_etags or {}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # At most 2 * workers objects are in flight ahead of the consumer
+        pending = deque()
+        try:
+            for obj in _iter_changed_objects(s3, bucket_name, prefix, stored_etags):
+                pending.append((obj, executor.submit(_download_and_extract, s3, bucket_name, obj, options,
+                                                     transfer_config)))
+                if len(pending) >= workers * 2:
+                    obj, future = pending.popleft()
+                    for document in _documents(bucket_name, obj, future, stored_etags, options):
+                        yield document
+            while pending:
+                obj, future = pending.popleft()
+                for document in _documents(bucket_name, obj, future, stored_etags, options):
+                    yield document
+        finally:
+            # Objects downloaded for streaming but never consumed
+            for _, future in pending:
+                future.add_done_callback(_discard_download)
+
+    print(f"Ingested objects from s3://{bucket_name}/{prefix} in {time.perf_counter() - start:.2f}s")
+
+
+def _iter_changed_objects(s3, bucket_name, prefix, stored_etags):
+    """
+    Yields the listing entries of supported objects that are new or changed.
     """
-    s3 = boto3.client('s3')
-    objects = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)["Contents"]
-    return [{"source": "datalake", "content": obj, "metadata": {}} for obj in objects]
+    skipped = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("/") or get_extractor(key) is None:
+                continue
+            if stored_etags.get(_filepath(bucket_name, key)) == obj["ETag"]:
+                skipped += 1
+                continue
+            yield obj
+    print(f"Skipped {skipped} unchanged objects in s3://{bucket_name}/{prefix}")
+
+
+def _download_and_extract(s3, bucket_name, obj, options, transfer_config):
+    """
+    Downloads an object to a temporary file and extracts its documents.
+
+    :return: The extraction result, or the path of the downloaded file when the
+             object has a streaming extractor (the caller removes the file).
+    """
+    ext = os.path.splitext(obj["Key"])[1].lower()
+    streaming = get_extractor(obj["Key"]).streaming
+    fd, tmp_path = tempfile.mkstemp(suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            s3.download_fileobj(bucket_name, obj["Key"], file, Config=transfer_config)
+        if streaming:
+            return tmp_path
+        return extract_file(tmp_path, options, file_hash=obj["ETag"].strip('"'))
+    except Exception:
+        if streaming:
+            os.remove(tmp_path)
+        raise
+    finally:
+        if not streaming:
+            os.remove(tmp_path)
+
+
+def _documents(bucket_name, obj, future, stored_etags, options):
+    filepath = _filepath(bucket_name, obj["Key"])
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"Failed to download object:{filepath}: {e}")
+        return
+
+    if isinstance(result, str):
+        start = time.perf_counter()
+        try:
+            documents = iter_extract(result, options, file_hash=obj["ETag"].strip('"'))
+            for document in _object_documents(bucket_name, obj, documents, None, stored_etags):
+                yield document
+        except Exception as e:
+            print(f"Failed to ingest object:{filepath}: {e}")
+        finally:
+            os.remove(result)
+        print(f"Streamed object:{filepath} in {time.perf_counter() - start:.2f}s")
+        return
+
+    if result["error"]:
+        print(f"Failed to ingest object:{filepath}: {result['error']}")
+        return
+    for document in _object_documents(bucket_name, obj, result["documents"], result["extraction_time"],
+                                      stored_etags):
+        yield document
+
+
+def _object_documents(bucket_name, obj, documents, extraction_time, stored_etags):
+    filepath = _filepath(bucket_name, obj["Key"])
+    change = "modified" if filepath in stored_etags else "new"
+    previous = None
+    count = 0
+    for index, (content, metadata) in enumerate(documents):
+        # Held back by one so the last document of the object can be marked
+        if previous is not None:
+            yield previous
+        previous = {
+            "source": "datalake",
+            "content": content,
+            "metadata": {
+                **metadata,
+                "filepath": filepath,
+                "filename": os.path.basename(obj["Key"]),
+                "etag": obj["ETag"],
+                "size": obj["Size"],
+                "last_modified": obj["LastModified"].isoformat(),
+                "extraction_time": extraction_time,
+                # Only the first document replaces what is stored for the object
+                "change": change if index == 0 else None,
+                "processed": False
+            }
+        }
+        count += 1
+    if previous is not None:
+        previous["metadata"]["document_count"] = count
+        yield previous
+
+
+def _discard_download(future):
+    if not future.cancelled() and future.exception() is None and isinstance(future.result(), str):
+        os.remove(future.result())
+
+
+def _filepath(bucket_name, key):
+    return f"s3://{bucket_name}/{key}"
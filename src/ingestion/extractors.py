@@ -0,0 +1,249 @@
+import csv
+import json
+import logging
+import mimetypes
+import os
+from collections import namedtuple
+from bs4 import BeautifulSoup
+from docx import Document
+from src.ingestion.pdf_extraction import PdfPageCache, extract_pdf_pages, iter_pdf_pages, join_pages
+
+try:
+    import lxml  # noqa: F401  C-based parser, much faster than html.parser
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+Extractor = namedtuple("Extractor", ["name", "function", "extensions", "mime_types", "streaming"])
+
+_extractors_by_extension = {}
+_extractors_by_mime_type = {}
+
+
+def register_extractor(name, extensions, mime_types=(), streaming=False):
+    """
+    Registers a file extractor.
+
+    An extractor is a generator function `(file_path, options) -> (content, metadata)*`
+    yielding one or more documents per file. Streaming extractors read their file
+    incrementally (e.g. one record at a time) and are run lazily in the ingesting
+    process instead of a pool worker, so their documents are never all in memory.
+
+    :param name: Name of the extractor.
+    :param extensions: File extensions handled by the extractor (e.g. [".csv"]).
+    :param mime_types: MIME types handled by the extractor.
+    :param streaming: Whether the extractor streams large files record by record.
+    :return: Decorator registering the function.
+    """
+    def decorator(function):
+        extractor = Extractor(name, function, tuple(extensions), tuple(mime_types), streaming)
+        for extension in extensions:
+            _extractors_by_extension[extension.lower()] = extractor
+        for mime_type in mime_types:
+            _extractors_by_mime_type[mime_type] = extractor
+        return function
+    return decorator
+
+
+def get_extractor(file_path=None, mime_type=None):
+    """
+    Finds the extractor of a file, by extension first and then by MIME type.
+
+    :param file_path: Path (or key) of the file.
+    :param mime_type: MIME type of the file, guessed from the path when omitted.
+    :return: The Extractor, or None when the file type is not supported.
+    """
+    if file_path:
+        extractor = _extractors_by_extension.get(os.path.splitext(file_path)[1].lower())
+        if extractor:
+            return extractor
+        mime_type = mime_type or mimetypes.guess_type(file_path)[0]
+    if mime_type:
+        return _extractors_by_mime_type.get(mime_type.split(";")[0].strip())
+    return None
+
+
+def supported_extensions():
+    """
+    :return: Sorted list of the registered file extensions.
+    """
+    return sorted(_extractors_by_extension)
+
+
+def iter_extract(file_path, options=None, file_hash=None, mime_type=None):
+    """
+    Extracts the documents of a file with its registered extractor.
+
+    :param file_path: Path to the file.
+    :param options: Extraction options (ingestion config).
+    :param file_hash: Content hash of the file, used by extractors that cache results.
+    :param mime_type: Optional MIME type used when the extension is not registered.
+    :return: A generator of (content, metadata) tuples.
+    """
+    extractor = get_extractor(file_path, mime_type)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {file_path}")
+    options = dict(options or {})
+    options["file_hash"] = file_hash
+    return extractor.function(file_path, options)
+
+
+def ingest_docx(file_path):
+    doc = Document(file_path)
+    content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    return content
+
+
+def ingest_pdf(file_path):
+    """
+    Extracts text from a PDF file.
+    :param file_path: Path to the PDF file.
+    :return: Dictionary containing file metadata and content.
+    """
+    try:
+        content = "\n".join(text for _, text in iter_pdf_pages(file_path))
+        print(f"Processed PDF file:{file_path}")
+        logging.info(f"Processed PDF file:{file_path}")
+        return content
+    except Exception as e:
+        raise Exception(f"Failed to ingest PDF: {e}")
+
+
+def ingest_text(file_path):
+    """
+    Reads content from a plain text file.
+    :param file_path: Path to the text file.
+    :return: Dictionary containing file metadata and content.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        logging.info(f"Processed text file:{file_path}")
+        print(f"Processed text file:{file_path}")
+        return content
+    except Exception as e:
+        raise Exception(f"Failed to ingest text file: {e}")
+
+
+def html_to_text(html):
+    """
+    Extracts the visible text of an HTML document.
+
+    :param html: HTML markup.
+    :return: Tuple (text, soup).
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    return soup.get_text(), soup
+
+
+@register_extractor("text", [".txt"], ["text/plain"])
+def extract_text_documents(file_path, options):
+    yield ingest_text(file_path), {}
+
+
+@register_extractor("markdown", [".md", ".markdown"], ["text/markdown"])
+def extract_markdown_documents(file_path, options):
+    yield ingest_text(file_path), {"format": "markdown"}
+
+
+@register_extractor("docx", [".docx"], ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"])
+def extract_docx_documents(file_path, options):
+    yield ingest_docx(file_path), {}
+
+
+@register_extractor("html", [".html", ".htm"], ["text/html"])
+def extract_html_documents(file_path, options):
+    with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+        text, soup = html_to_text(file.read())
+    metadata = {}
+    if soup.title and soup.title.string:
+        metadata["title"] = soup.title.string.strip()
+    yield text, metadata
+
+
+@register_extractor("pdf", [".pdf"], ["application/pdf"])
+def extract_pdf_documents(file_path, options):
+    """
+    PDFs go through the page-streaming extractor; with `pdf_split_pages` every page
+    becomes its own document carrying `page_number`, otherwise the document carries
+    `page_count` and the character offset of every page in the extracted text (kept
+    out of the chunk payloads, see PAYLOAD_EXCLUDED_FIELDS), from which each chunk
+    gets its `page_number`.
+    """
+    cache_dir = options.get("pdf_cache_dir")
+    pages = extract_pdf_pages(
+        file_path,
+        backend=options.get("pdf_backend"),
+        workers=int(options.get("pdf_page_workers", 1)),
+        cache=PdfPageCache(cache_dir) if cache_dir else None,
+        file_hash=options.get("file_hash")
+    )
+    if options.get("pdf_split_pages", False):
+        for number, text in enumerate(pages, start=1):
+            yield text, {"page_number": number, "page_count": len(pages)}
+        return
+
+    content, page_offsets = join_pages(pages)
+    # The content is stored stripped, the offsets are shifted to index the stored content
+    stripped = content.lstrip()
+    shift = len(content) - len(stripped)
+    page_offsets = [max(offset - shift, 0) for offset in page_offsets]
+    yield stripped, {"page_count": len(pages), "page_offsets": page_offsets}
+
+
+@register_extractor("csv", [".csv", ".tsv"], ["text/csv", "text/tab-separated-values"], streaming=True)
+def extract_csv_records(file_path, options):
+    """
+    Yields one document per CSV row, reading the file one row at a time.
+
+    `record_content_fields` selects the columns forming the content (default: every
+    column as "column: value" lines) and `record_metadata_fields` the columns copied
+    into the metadata.
+    """
+    delimiter = "\t" if file_path.lower().endswith(".tsv") else options.get("csv_delimiter", ",")
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as file:
+        for row_number, row in enumerate(csv.DictReader(file, delimiter=delimiter), start=1):
+            yield _record_document(row, options, "row_number", row_number)
+
+
+@register_extractor("jsonl", [".jsonl", ".ndjson"], ["application/x-ndjson", "application/jsonl"], streaming=True)
+def extract_jsonl_records(file_path, options):
+    """
+    Yields one document per JSON line, reading the file one line at a time.
+    Invalid lines are skipped.
+    """
+    with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping invalid JSON line {line_number} of {file_path}: {e}")
+                continue
+            if not isinstance(record, dict):
+                record = {"value": record}
+            yield _record_document(record, options, "line_number", line_number)
+
+
+def _record_document(record, options, position_field, position):
+    content_fields = options.get("record_content_fields") or list(record)
+    if len(content_fields) == 1:
+        value = record.get(content_fields[0])
+        content = "" if value is None else _record_value(value)
+    else:
+        content = "\n".join(f"{field}: {_record_value(record[field])}"
+                            for field in content_fields if record.get(field) not in (None, ""))
+
+    metadata = {position_field: position}
+    for field in options.get("record_metadata_fields") or []:
+        if field in record:
+            metadata[field] = record[field]
+    return content, metadata
+
+
+def _record_value(value):
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
@@ -1,79 +1,233 @@
 import logging
+import multiprocessing
 import os
-from pymongo.errors import DuplicateKeyError
-from PyPDF2 import PdfReader
-from docx import Document
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.ingestion.extractors import get_extractor, iter_extract, ingest_docx, ingest_pdf, ingest_text  # noqa: F401
+from src.ingestion.manifest import IngestionManifest
 
 
-def ingest_files(folder_path, mongo_storage):
-    data = []
+def ingest_files(folder_path, mongo_storage, ingestion_config=None):
+    """
+    Walks a folder and extracts the content of every new or modified file.
+
+    The manifest is not updated; callers storing the documents should use
+    `iter_files` with an `IngestionManifest` and record the stored batches.
+
+    :param folder_path: Root folder to ingest.
+    :param mongo_storage: MongoDBStorage holding the ingestion manifest.
+    :param ingestion_config: Pipeline ingestion config.
+    :return: List of documents with content and metadata.
+    """
+    manifest = IngestionManifest(mongo_storage, folder_path).load()
+    return list(iter_files(folder_path, manifest, ingestion_config))
+
+
+def iter_files(folder_path, manifest, ingestion_config=None):
+    """
+    Walks a folder and yields the documents of every new or modified file as soon as it is extracted.
+
+    Files are compared against the ingestion manifest (stat first, content hash only
+    when the stat changed), so unchanged files are skipped without touching MongoDB.
+    Each file goes through the extractor registered for its extension (or MIME type)
+    and may yield several documents. When `extraction_workers` in the ingestion
+    config is greater than 1, the extraction is fanned out across a process pool;
+    streaming extractors (CSV, JSONL) are read lazily in this process instead, so a
+    file of millions of records is never held in memory. A file that fails to
+    extract is logged and skipped without affecting the others. Only a small
+    window of files is in flight at a time, so memory does not grow with the
+    size of the folder.
+
+    :param folder_path: Root folder to ingest.
+    :param manifest: Loaded IngestionManifest of the folder.
+    :param ingestion_config: Pipeline ingestion config.
+    :return: A generator of documents with content and metadata. Each document
+             carries its fingerprint (size, mtime, content_hash) and `change`; the
+             last document of a file carries the `document_count` of the file.
+    """
+    ingestion_config = ingestion_config or {}
+    workers = int(ingestion_config.get("extraction_workers", 1))
+    options = dict(ingestion_config)
+    if workers > 1:
+        # Pool workers cannot start their own page-level pools
+        options["pdf_page_workers"] = 1
+
+    start = time.perf_counter()
+    ingested = 0
+    failed = 0
+    items = _walk_files(folder_path, manifest)
+    for result, (change, fingerprint) in _extract_files(items, workers, options):
+        if result["error"]:
+            failed += 1
+            logging.error(f"Failed to ingest file:{result['filepath']}: {result['error']}")
+            print(f"Failed to ingest file:{result['filepath']}: {result['error']}")
+            continue
+
+        file_start = time.perf_counter()
+        previous = None
+        count = 0
+        try:
+            for content, metadata in result["documents"]:
+                # Held back by one so the last document of the file can be marked
+                if previous is not None:
+                    yield previous
+                previous = _file_document(result, content, metadata, fingerprint, change if count == 0 else None)
+                count += 1
+        except Exception as e:
+            failed += 1
+            logging.error(f"Failed to ingest file:{result['filepath']}: {e}")
+            print(f"Failed to ingest file:{result['filepath']} after {count} documents: {e}")
+            continue
+
+        if previous is not None:
+            # The manifest records the file once its last document is stored
+            previous["metadata"]["document_count"] = count
+            yield previous
+        else:
+            manifest.record_empty(result["filepath"], fingerprint, change)
+        ingested += 1
+        extraction_time = result["extraction_time"]
+        if extraction_time is None:
+            extraction_time = time.perf_counter() - file_start
+        print(f"Ingested file:{result['filepath']} ({count} documents) in {extraction_time:.2f}s")
+
+    print(f"Extracted {ingested} files ({failed} failed) with {workers} worker(s) "
+          f"in {time.perf_counter() - start:.2f}s")
+    manifest.finish(purge_deleted=ingestion_config.get("purge_deleted", False))
+
+
+def _file_document(result, content, metadata, fingerprint, change):
+    # Add metadata and mark as unprocessed
+    return {
+        "content": content,
+        "metadata": {
+            **metadata,
+            "filepath": result["filepath"],
+            "filename": os.path.basename(result["filepath"]),
+            "extraction_time": result["extraction_time"],
+            "size": fingerprint["size"],
+            "mtime": fingerprint["mtime"],
+            "content_hash": fingerprint["content_hash"],
+            # Only the first document replaces what is stored for the file
+            "change": change,
+            "processed": False  # Mark as unprocessed
+        }
+    }
+
+
+def _walk_files(folder_path, manifest):
+    """
+    Yields the supported files under a folder that are new or modified.
+
+    :param folder_path: Root folder to walk.
+    :param manifest: Loaded IngestionManifest of the folder.
+    :return: A generator of (file_path, (change, fingerprint)) tuples.
+    """
     print(f"Processing dir: {folder_path}")
     for root, _, files in os.walk(folder_path):
         for file in files:
-            print(f"Processign file: {file}")
             file_path = os.path.join(root, file)
-            # Check if the file is already processed
-            if mongo_storage.is_file_processed(file_path):
-                print(f"File:{file_path} is already ingested")
-                continue
-
-            print(f"Ingesting file:{file_path}")
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext == ".pdf":
-                content = ingest_pdf(file_path)
-            elif ext == ".txt":
-                content = ingest_text(file_path)
-            else:
+            if get_extractor(file_path) is None:
                 print(f"Unsupported file type: {file_path}")
                 continue
 
-            # Add metadata and mark as unprocessed
-            data.append({
-                "content": content,
-                "metadata": {
-                    "filepath": file_path,
-                    "filename": file,
-                    "processed": False  # Mark as unprocessed
-                }
-            })
-    return data
+            try:
+                change, fingerprint = manifest.check(file_path)
+            except OSError as e:
+                print(f"Failed to stat file:{file_path}: {e}")
+                continue
+            if change is None:
+                continue
+            yield file_path, (change, fingerprint)
 
 
-def ingest_docx(file_path):
-    doc = Document(file_path)
-    content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-    return content
+def _extract_files(items, workers, options):
+    """
+    Yields extraction results, using a process pool when more than one worker is configured.
 
+    At most `2 * workers` files are submitted ahead of the consumer. Files with a
+    streaming extractor are not submitted; their result holds a lazy generator of
+    documents read in this process.
 
-def ingest_pdf(file_path):
-    """
-    Extracts text from a PDF file.
-    :param file_path: Path to the PDF file.
-    :return: Dictionary containing file metadata and content.
+    :param items: Iterable of (file_path, (change, fingerprint)) tuples; the context is passed through.
+    :param workers: Number of extraction processes.
+    :param options: Extraction options (ingestion config).
+    :return: A generator of (result, context) tuples, in input order.
     """
+    if workers <= 1:
+        for file_path, context in items:
+            if get_extractor(file_path).streaming:
+                yield stream_file(file_path, options, context[1]["content_hash"]), context
+            else:
+                yield extract_file(file_path, options, context[1]["content_hash"]), context
+        return
+
+    # Sources are ingested from threads, forking while they hold locks could deadlock the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque()
+        for file_path, context in items:
+            future = None
+            if not get_extractor(file_path).streaming:
+                future = executor.submit(extract_file, file_path, options, context[1]["content_hash"])
+            pending.append((file_path, context, future, options))
+            if len(pending) >= workers * 2:
+                yield _future_result(*pending.popleft())
+        while pending:
+            yield _future_result(*pending.popleft())
+
+
+def _future_result(file_path, context, future, options):
+    if future is None:
+        return stream_file(file_path, options, context[1]["content_hash"]), context
     try:
-        reader = PdfReader(file_path)
-        content = ''
-        for page in reader.pages:
-            content += page.extract_text()
-        print(f"Processed PDF file:{file_path}")
-        logging.info(f"Processed PDF file:{file_path}")
-        return content
+        return future.result(), context
     except Exception as e:
-        raise Exception(f"Failed to ingest PDF: {e}")
+        # A crashed worker breaks the future but must not lose the remaining files
+        return {"filepath": file_path, "documents": [], "error": str(e), "extraction_time": 0.0}, context
 
 
-def ingest_text(file_path):
+def extract_file(file_path, options=None, file_hash=None):
     """
-    Reads content from a plain text file.
-    :param file_path: Path to the text file.
-    :return: Dictionary containing file metadata and content.
+    Extracts all the documents of a single file. Runs inside pool workers, so errors
+    are returned instead of raised.
+
+    :param file_path: Path to the file.
+    :param options: Extraction options (`pdf_backend`, `pdf_page_workers`, `pdf_cache_dir`, `pdf_split_pages`,
+                    `record_content_fields`, `record_metadata_fields`).
+    :param file_hash: Content hash of the file, used by the PDF page cache.
+    :return: Dictionary with filepath, documents (list of (content, metadata) tuples),
+             error and extraction_time (seconds).
     """
+    start = time.perf_counter()
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        logging.info(f"Processed text file:{file_path}")
-        print(f"Processed text file:{file_path}")
-        return content
+        documents = list(iter_extract(file_path, options, file_hash))
+        error = None
     except Exception as e:
-        raise Exception(f"Failed to ingest text file: {e}")
\ No newline at end of file
+        documents = []
+        error = str(e)
+    return {
+        "filepath": file_path,
+        "documents": documents,
+        "error": error,
+        "extraction_time": time.perf_counter() - start
+    }
+
+
+def stream_file(file_path, options=None, file_hash=None):
+    """
+    Opens the documents of a file without extracting them yet. Errors are raised
+    while iterating the documents.
+
+    :param file_path: Path to the file.
+    :param options: Extraction options.
+    :param file_hash: Content hash of the file.
+    :return: Dictionary with filepath, documents (generator of (content, metadata) tuples),
+             error (None) and extraction_time (None, the documents are read lazily).
+    """
+    return {
+        "filepath": file_path,
+        "documents": iter_extract(file_path, options, file_hash),
+        "error": None,
+        "extraction_time": None
+    }
@@ -1,4 +1,192 @@
-def ingest_logs(file_path):
-    with open(file_path, "r") as file:
-        logs = file.readlines()
-    return {"content": "".join(logs), "source": file_path}
+import hashlib
+import mmap
+import os
+import re
+
+# Names of rotated or compressed copies (app.log.1, app.log.2.gz, app.log-20240101), skipped in folders
+ROTATED_NAME = re.compile(r"(\.\d+|-\d{8,10})(\.(gz|bz2|xz|zst))?$|\.(gz|bz2|xz|zst)$")
+
+
+def ingest_logs(file_path, **options):
+    """
+    Reads the records of a log file (or a folder of log files).
+
+    :param file_path: Path to a log file or a folder of log files.
+    :return: List of log documents.
+    """
+    return list(iter_logs(file_path, **options))
+
+
+def iter_logs(file_path, state=None, record_pattern=None, records_per_document=1000, window_bytes=64 * 1024 * 1024):
+    """
+    Incrementally reads append-only log files, starting after the last ingested byte.
+
+    Files are memory-mapped and only the bytes appended since the stored offset are
+    scanned. A file whose inode changed, which shrank, or whose first bytes differ
+    from the stored ones is considered rotated and read from the start. When its
+    previous inode is still next to it under another name (app.log.1), the lines
+    appended to it before the rotation are read first. Rotated copies themselves are
+    skipped when reading a folder.
+
+    Records are lines, or, with `record_pattern`, groups of lines starting with a line
+    matching the pattern (e.g. a timestamp) followed by its continuation lines. Each
+    document holds up to `records_per_document` records and carries a checkpoint with
+    the state of every file read so far.
+
+    :param file_path: Path to a log file or a folder of log files.
+    :param state: Stored state ({"files": [checkpoint, ...]}) of a previous run.
+    :param record_pattern: Regex matching the first line of a multi-line record.
+    :param records_per_document: Maximum number of records per document.
+    :param window_bytes: Maximum number of bytes decoded at a time.
+    :return: A generator of log documents with line and byte range metadata.
+    """
+    # Keyed by path in memory, stored as a list since paths are not valid MongoDB keys
+    files = {checkpoint["path"]: checkpoint for checkpoint in (state or {}).get("files", [])}
+    pattern = re.compile(record_pattern) if record_pattern else None
+
+    for log_path in _log_files(file_path):
+        checkpoint = files.get(log_path)
+        sources = [(log_path, checkpoint, False)]
+        rotated_path = _rotated_path(log_path, checkpoint)
+        if rotated_path:
+            print(f"Log file:{log_path} was rotated, reading the end of {rotated_path} first")
+            # The rotated file no longer grows, its last record is complete
+            sources.insert(0, (rotated_path, checkpoint, True))
+
+        for read_path, read_checkpoint, complete in sources:
+            for records, checkpoint in _iter_record_batches(read_path, read_checkpoint, pattern,
+                                                            records_per_document, window_bytes, complete):
+                # The state stays under the name the file is read from on the next run
+                files[log_path] = {"path": log_path, **checkpoint}
+                yield _document(read_path, records, checkpoint, files)
+
+
+def _document(log_path, records, checkpoint, files):
+    first_line, first_byte = records[0][1], records[0][2]
+    return {
+        "source": "log",
+        "content": "\n".join(record for record, _, _ in records),
+        "metadata": {
+            "filepath": log_path,
+            "filename": os.path.basename(log_path),
+            # 1-based, inclusive line range
+            "line_start": first_line + 1,
+            "line_end": checkpoint["line"],
+            "byte_start": first_byte,
+            "byte_end": checkpoint["offset"],
+            "record_count": len(records),
+            "checkpoint": {"files": list(files.values())},
+            "processed": False
+        }
+    }
+
+
+def _log_files(file_path):
+    if os.path.isdir(file_path):
+        for root, _, files in os.walk(file_path):
+            for file in sorted(files):
+                if not ROTATED_NAME.search(file):
+                    yield os.path.join(root, file)
+    else:
+        yield file_path
+
+
+def _rotated_path(log_path, checkpoint):
+    """
+    :return: Path of the file next to log_path that has the inode of its checkpoint, if log_path was rotated.
+    """
+    if not checkpoint or "inode" not in checkpoint:
+        return None
+    try:
+        if os.stat(log_path).st_ino == checkpoint["inode"]:
+            return None
+        folder = os.path.dirname(log_path) or "."
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if path != log_path and os.path.isfile(path) and os.stat(path).st_ino == checkpoint["inode"] \
+                    and _head(path, checkpoint.get("head_length", 64)) == checkpoint.get("head"):
+                return path
+    except OSError:
+        pass
+    return None
+
+
+def _head(path, head_length):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read(head_length)).hexdigest()
+
+
+def _iter_record_batches(log_path, checkpoint, pattern, records_per_document, window_bytes, complete=False):
+    """
+    Yields (records, checkpoint) where records are (text, first_line, first_byte) tuples.
+    With `complete`, the last multi-line record is yielded instead of being kept for the next run.
+    """
+    stat = os.stat(log_path)
+    if stat.st_size == 0:
+        return
+
+    with open(log_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        # The first bytes identify the file content across runs (inode numbers can be reused)
+        head_length = min(64, checkpoint.get("head_length", 64) if checkpoint else 64, size)
+        head = hashlib.sha256(mm[:head_length]).hexdigest()
+        offset, line = 0, 0
+        if checkpoint and checkpoint.get("inode") == stat.st_ino and checkpoint.get("head") == head \
+                and checkpoint.get("offset", 0) <= size:
+            offset, line = checkpoint["offset"], checkpoint["line"]
+        elif checkpoint:
+            print(f"Log file:{log_path} was rotated or truncated, reading from the start")
+        # The fingerprint grows with a file that was shorter than 64 bytes
+        if head_length < min(64, size):
+            head_length = min(64, size)
+            head = hashlib.sha256(mm[:head_length]).hexdigest()
+
+        # Only complete lines are read; a partially written last line waits for the next run
+        end = mm.rfind(b"\n", offset, size) + 1
+        if end <= offset:
+            return
+
+        records = []
+        current = None  # [lines, first_line, first_byte] of the record being assembled
+        for text, line_number, line_start in _iter_lines(mm, offset, end, line, window_bytes):
+            if pattern is None or current is None or pattern.match(text):
+                if current is not None:
+                    records.append(current)
+                current = [[text], line_number, line_start]
+            else:
+                current[0].append(text)
+
+            if len(records) >= records_per_document:
+                yield _batch(records), _checkpoint(stat, head, head_length, current[2], current[1])
+                records = []
+
+        if current is not None:
+            if pattern is None or complete:
+                records.append(current)
+                yield _batch(records), _checkpoint(stat, head, head_length, end, current[1] + len(current[0]))
+            elif records:
+                # The last multi-line record may still grow, it is read again on the next run
+                yield _batch(records), _checkpoint(stat, head, head_length, current[2], current[1])
+
+
+def _iter_lines(mm, offset, end, line, window_bytes):
+    """
+    Yields (text, line_number, byte_offset) for every line between offset and end.
+    """
+    position = offset
+    while position < end:
+        window_end = min(position + window_bytes, end)
+        if window_end < end:
+            window_end = mm.rfind(b"\n", position, window_end) + 1 or mm.find(b"\n", window_end) + 1
+        for raw_line in mm[position:window_end].split(b"\n")[:-1]:
+            yield raw_line.decode("utf-8", errors="replace"), line, position
+            position += len(raw_line) + 1
+            line += 1
+
+
+def _batch(records):
+    return [("\n".join(lines), first_line, first_byte) for lines, first_line, first_byte in records]
+
+
+def _checkpoint(stat, head, head_length, offset, line):
+    return {"offset": offset, "line": line, "inode": stat.st_ino, "head": head, "head_length": head_length}
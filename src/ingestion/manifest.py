@@ -0,0 +1,178 @@
+import hashlib
+import os
+from datetime import datetime
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """
+    Computes the SHA-256 of a file without loading it in memory.
+
+    :param file_path: Path to the file.
+    :param block_size: Number of bytes read at a time.
+    :return: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """
+    Tracks which files of an ingestion root were ingested, and in which state.
+
+    Each entry maps a filepath to its size, mtime, content hash and ingestion time.
+    The entries of a root are loaded with one query at the start of a run; a file is
+    only hashed when its size or mtime differ from the manifest. A file missing from
+    the manifest that already has stored documents (from a run that stopped before
+    the file was recorded) is reported as modified, so its documents are replaced.
+    Files yielding no document (an empty CSV, a PDF without text) are recorded with a
+    zero `document_count` when the run finishes.
+    """
+
+    def __init__(self, mongo_storage, root):
+        """
+        :param mongo_storage: MongoDBStorage holding the manifest collection.
+        :param root: Folder the manifest entries belong to.
+        """
+        self.mongo_storage = mongo_storage
+        self.root = root
+        self.entries = {}
+        self.stored = set()
+        self.seen = set()
+        self.new = []
+        self.modified = []
+        self.unchanged = 0
+        self.touched = []
+        self.emptied = []
+        self.delta = None
+
+    def load(self):
+        """
+        Loads the manifest of the root. Files stored before the manifest existed are
+        adopted without re-ingesting them; their hash is filled in on their next change.
+        """
+        self.entries = self.mongo_storage.fetch_manifest(self.root)
+        if not self.entries:
+            # Documents stored with a fingerprint belong to a run of the manifest, not to a legacy one
+            legacy_filepaths = self.mongo_storage.fetch_filepaths(
+                self.root, {"metadata.content_hash": {"$exists": False}}
+            )
+            self.entries = {filepath: {"filepath": filepath, "legacy": True} for filepath in legacy_filepaths}
+        # Only the stored files the manifest does not know are kept
+        self.stored = {filepath for filepath in self.mongo_storage.iter_filepaths(self.root)
+                       if filepath not in self.entries}
+        print(f"Loaded {len(self.entries)} manifest entries for {self.root}")
+        return self
+
+    def check(self, file_path):
+        """
+        Classifies a file against the manifest.
+
+        :param file_path: Path to the file.
+        :return: Tuple (change, fingerprint) where change is "new", "modified" or
+                 None when the file is unchanged.
+        """
+        self.seen.add(file_path)
+        stat = os.stat(file_path)
+        fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        entry = self.entries.get(file_path)
+
+        if entry is not None and entry.get("legacy"):
+            # Ingested before the manifest existed, adopt its current stat
+            fingerprint["content_hash"] = None
+            self.touched.append(self._entry(file_path, fingerprint))
+            self.unchanged += 1
+            return None, fingerprint
+
+        if entry is not None and entry.get("size") == fingerprint["size"] \
+                and entry.get("mtime") == fingerprint["mtime"]:
+            self.unchanged += 1
+            return None, entry
+
+        fingerprint["content_hash"] = hash_file(file_path)
+        if entry is None and file_path not in self.stored:
+            self.new.append(file_path)
+            return "new", fingerprint
+
+        if entry is not None and entry.get("content_hash") == fingerprint["content_hash"]:
+            # Only the stat changed (e.g. touch or copy), refresh it without re-ingesting
+            self.touched.append(self._entry(file_path, fingerprint, entry.get("ingested_at"),
+                                            entry.get("document_count")))
+            self.unchanged += 1
+            return None, fingerprint
+
+        # Changed, or stored by a run that stopped before the file was recorded
+        self.modified.append(file_path)
+        return "modified", fingerprint
+
+    def record(self, documents):
+        """
+        Records ingested files in the manifest. Called after their batch is stored.
+
+        A file is recorded with its last document (the one carrying `document_count`),
+        so a file whose documents span several batches is only recorded once all of
+        them are stored.
+
+        :param documents: Stored documents carrying the fingerprint in their metadata.
+        """
+        entries = {}
+        for doc in documents:
+            metadata = doc.get("metadata", {})
+            if "content_hash" not in metadata or "document_count" not in metadata:
+                continue
+            entries[metadata["filepath"]] = self._entry(metadata["filepath"], metadata,
+                                                        document_count=metadata["document_count"])
+        self.mongo_storage.upsert_manifest_entries(list(entries.values()))
+
+    def record_empty(self, file_path, fingerprint, change):
+        """
+        Notes a new or modified file that yielded no document, so it is not extracted
+        again on every run. It is recorded by `finish`, and the documents stored for
+        its previous version are removed then.
+
+        :param file_path: Path to the file.
+        :param fingerprint: Fingerprint returned by `check`.
+        :param change: "new" or "modified".
+        """
+        self.touched.append(self._entry(file_path, fingerprint, document_count=0))
+        if change == "modified":
+            self.emptied.append(file_path)
+
+    def finish(self, purge_deleted=False):
+        """
+        Completes a run: refreshes touched entries and reports the delta.
+
+        :param purge_deleted: Remove the documents and entries of deleted files.
+        :return: Dictionary with the new, modified and deleted filepaths and the unchanged
+                 count, also kept in `delta`.
+        """
+        if self.emptied:
+            self.mongo_storage.delete_data({"metadata.filepath": {"$in": self.emptied}})
+        self.mongo_storage.upsert_manifest_entries(self.touched)
+        deleted = sorted(filepath for filepath in self.entries if filepath not in self.seen)
+        if purge_deleted and deleted:
+            self.mongo_storage.delete_data({"metadata.filepath": {"$in": deleted}})
+            self.mongo_storage.delete_manifest_entries(deleted)
+
+        self.delta = {
+            "new": self.new,
+            "modified": self.modified,
+            "deleted": deleted,
+            "unchanged": self.unchanged
+        }
+        print(f"Manifest delta for {self.root}: {len(self.new)} new, {len(self.modified)} modified, "
+              f"{len(deleted)} deleted, {self.unchanged} unchanged")
+        return self.delta
+
+    def _entry(self, file_path, fingerprint, ingested_at=None, document_count=None):
+        return {
+            "filepath": file_path,
+            "root": self.root,
+            "size": fingerprint["size"],
+            "mtime": fingerprint["mtime"],
+            "content_hash": fingerprint["content_hash"],
+            "ingested_at": ingested_at or datetime.now().isoformat(),
+            "document_count": document_count,
+        }
@@ -0,0 +1,174 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader
+
+try:
+    import fitz  # PyMuPDF, optional faster backend
+except ImportError:
+    fitz = None
+
+
+def available_backends():
+    """
+    :return: Names of the PDF backends usable in this environment.
+    """
+    backends = ["pypdf2"]
+    if fitz is not None:
+        backends.insert(0, "pymupdf")
+    return backends
+
+
+def resolve_backend(backend=None):
+    """
+    Picks the PDF backend to use.
+
+    :param backend: Requested backend name, or None for the fastest available one.
+    :return: Backend name.
+    """
+    if backend is None:
+        return available_backends()[0]
+    if backend not in available_backends():
+        raise ValueError(f"PDF backend '{backend}' is not available. Available: {available_backends()}")
+    return backend
+
+
+def count_pages(file_path, backend=None):
+    """
+    :param file_path: Path to the PDF file.
+    :param backend: PDF backend name.
+    :return: Number of pages in the PDF.
+    """
+    if resolve_backend(backend) == "pymupdf":
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    return len(PdfReader(file_path).pages)
+
+
+def iter_pdf_pages(file_path, backend=None, start=0, stop=None):
+    """
+    Extracts a PDF page by page.
+
+    :param file_path: Path to the PDF file.
+    :param backend: PDF backend name, or None for the fastest available one.
+    :param start: Index of the first page to extract.
+    :param stop: Index after the last page to extract (None for the end of the file).
+    :return: A generator of (page_number, text) tuples, page numbers starting at 1.
+    """
+    if resolve_backend(backend) == "pymupdf":
+        with fitz.open(file_path) as doc:
+            stop = doc.page_count if stop is None else min(stop, doc.page_count)
+            for index in range(start, stop):
+                yield index + 1, doc.load_page(index).get_text()
+        return
+
+    pages = PdfReader(file_path).pages
+    stop = len(pages) if stop is None else min(stop, len(pages))
+    for index in range(start, stop):
+        yield index + 1, pages[index].extract_text() or ""
+
+
+def _extract_page_range(file_path, backend, start, stop):
+    return [text for _, text in iter_pdf_pages(file_path, backend, start, stop)]
+
+
+def extract_pdf_pages(file_path, backend=None, workers=1, cache=None, file_hash=None, min_pages_per_worker=50):
+    """
+    Extracts the text of every page of a PDF.
+
+    Large PDFs are split into page ranges extracted in parallel when `workers` is
+    greater than 1. When a cache and the file hash are given, the pages of an
+    unchanged file are read from the cache instead of being extracted again.
+
+    :param file_path: Path to the PDF file.
+    :param backend: PDF backend name, or None for the fastest available one.
+    :param workers: Number of processes used for one file.
+    :param cache: Optional PdfPageCache.
+    :param file_hash: Content hash of the file, used as cache key.
+    :param min_pages_per_worker: Minimum number of pages given to each process.
+    :return: List of page texts.
+    """
+    backend = resolve_backend(backend)
+    if cache is not None and file_hash:
+        pages = cache.get(file_hash, backend)
+        if pages is not None:
+            print(f"Loaded {len(pages)} cached pages for PDF file:{file_path}")
+            return pages
+
+    page_count = count_pages(file_path, backend)
+    workers = min(workers, page_count // min_pages_per_worker)
+    if workers > 1:
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        # Spawned, not forked: the caller may run other threads (e.g. concurrent sources)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_extract_page_range, file_path, backend, start, stop)
+                       for start, stop in ranges]
+            pages = [text for future in futures for text in future.result()]
+    else:
+        pages = [text for _, text in iter_pdf_pages(file_path, backend)]
+
+    if cache is not None and file_hash:
+        cache.put(file_hash, backend, pages)
+    return pages
+
+
+def join_pages(pages, separator="\n"):
+    """
+    Joins page texts into one document.
+
+    :param pages: List of page texts.
+    :param separator: String inserted between pages.
+    :return: Tuple (content, page_offsets) where page_offsets[i] is the character
+             offset of page i + 1 in content.
+    """
+    page_offsets = []
+    offset = 0
+    for text in pages:
+        page_offsets.append(offset)
+        offset += len(text) + len(separator)
+    return separator.join(pages), page_offsets
+
+
+class PdfPageCache:
+    """
+    On-disk cache of extracted PDF pages, keyed by file content hash and backend.
+
+    Entries are written atomically so concurrent extraction processes can share it.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: Directory holding the cached page files.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, file_hash, backend):
+        return os.path.join(self.cache_dir, f"{file_hash}.{backend}.json")
+
+    def get(self, file_hash, backend):
+        """
+        :return: Cached list of page texts, or None when the file is not cached.
+        """
+        try:
+            with open(self._path(file_hash, backend), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, file_hash, backend, pages):
+        """
+        Stores the page texts of a file.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(pages, file)
+            os.replace(tmp_path, self._path(file_hash, backend))
+        except OSError as e:
+            print(f"Failed to cache PDF pages: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
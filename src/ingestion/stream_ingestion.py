@@ -1,12 +1,271 @@
-# from kafka import KafkaConsumer
-#
-# def ingest_stream(bootstrap_servers, topic, group_id):
-#     """
-#     Consumes data from a Kafka stream.
-#     :param bootstrap_servers: Kafka bootstrap servers.
-#     :param topic: Kafka topic name.
-#     :param group_id: Kafka consumer group ID.
-#     :return: List of messages from the stream.
-#     """
-#     consumer = KafkaConsumer(topic, bootstrap_servers=bootstrap_servers, group_id=group_id, auto_offset_reset='earliest')
-#     return [{"source": "stream", "content": msg.value.decode("utf-8"), "metadata": {"offset": msg.offset}} for msg in consumer]
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+Message = namedtuple("Message", ["topic", "partition", "offset", "value"])
+
+
+class MessageBroker(ABC):
+    """
+    Interface of the message brokers a stream source consumes from.
+
+    All methods are called from the consuming thread only.
+    """
+
+    @abstractmethod
+    def poll(self, max_records, timeout):
+        """
+        :param max_records: Maximum number of messages to return.
+        :param timeout: Seconds to wait for messages.
+        :return: List of Message, empty when none arrived (or when paused).
+        """
+
+    @abstractmethod
+    def commit(self, messages):
+        """
+        Marks messages as consumed so they are not delivered again.
+
+        :param messages: Messages whose offsets are committed.
+        """
+
+    @abstractmethod
+    def pause(self):
+        """Stops fetching new messages until `resume` is called."""
+
+    @abstractmethod
+    def resume(self):
+        """Resumes fetching messages."""
+
+    def close(self):
+        """Releases the broker connection."""
+
+
+class InMemoryBroker(MessageBroker):
+    """
+    Broker backed by a list, used to run stream ingestion without Kafka.
+    """
+
+    def __init__(self, messages=None, topic="in-memory"):
+        self.topic = topic
+        self.messages = []
+        self.position = 0
+        self.committed = {}
+        self.paused = False
+        for value in messages or []:
+            self.publish(value)
+
+    def publish(self, value):
+        self.messages.append(Message(self.topic, 0, len(self.messages), value))
+
+    def poll(self, max_records, timeout):
+        if self.paused or self.position >= len(self.messages):
+            time.sleep(min(timeout, 0.01))
+            return []
+        batch = self.messages[self.position:self.position + max_records]
+        self.position += len(batch)
+        return batch
+
+    def commit(self, messages):
+        for message in messages:
+            key = (message.topic, message.partition)
+            self.committed[key] = max(self.committed.get(key, -1), message.offset)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+class KafkaBroker(MessageBroker):
+    """
+    Kafka consumer with manual offset commits.
+    """
+
+    def __init__(self, bootstrap_servers, topic, group_id):
+        from kafka import KafkaConsumer
+
+        self.consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            auto_offset_reset="earliest",
+            enable_auto_commit=False
+        )
+
+    def poll(self, max_records, timeout):
+        records = self.consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [
+            Message(record.topic, record.partition, record.offset, record.value)
+            for partition_records in records.values()
+            for record in partition_records
+        ]
+
+    def commit(self, messages):
+        from kafka import TopicPartition
+        from kafka.structs import OffsetAndMetadata
+
+        offsets = {}
+        for message in messages:
+            partition = TopicPartition(message.topic, message.partition)
+            offsets[partition] = max(offsets.get(partition, -1), message.offset)
+        if offsets:
+            self.consumer.commit({partition: OffsetAndMetadata(offset + 1, None)
+                                  for partition, offset in offsets.items()})
+
+    def pause(self):
+        self.consumer.pause(*self.consumer.assignment())
+
+    def resume(self):
+        self.consumer.resume(*self.consumer.paused())
+
+    def close(self):
+        self.consumer.close(autocommit=False)
+
+
+def run_stream_ingestion(broker, write_batch, max_batch_size=500, max_batch_seconds=5.0, max_pending_batches=4,
+                         stop_event=None, max_batches=None, idle_timeout=None):
+    """
+    Consumes a broker in micro-batches and writes each batch on a writer thread.
+
+    A micro-batch is closed when it holds `max_batch_size` messages or when
+    `max_batch_seconds` elapsed since its first message. Offsets are committed only
+    after the batch was written; when `max_pending_batches` batches are waiting for the
+    writer, consumption is paused until the writer catches up. A failed write stops
+    the consumer without committing, so the messages are delivered again. Messages
+    without a value (e.g. Kafka tombstones) are not written, their offsets are
+    committed with the rest of the batch.
+
+    The loop runs until `stop_event` is set, `max_batches` batches were written, or no
+    message arrived for `idle_timeout` seconds.
+
+    :param broker: MessageBroker to consume.
+    :param write_batch: Callable storing a list of documents.
+    :param max_batch_size: Maximum number of messages per micro-batch.
+    :param max_batch_seconds: Maximum age of a micro-batch in seconds.
+    :param max_pending_batches: Size of the write queue.
+    :param stop_event: Optional threading.Event stopping the consumer.
+    :param max_batches: Optional number of batches after which the consumer stops.
+    :param idle_timeout: Optional number of idle seconds after which the consumer stops.
+    :return: Dictionary with the number of messages, skipped empty messages, batches and pauses.
+    """
+    stop_event = stop_event or threading.Event()
+    pending = queue.Queue(maxsize=max_pending_batches)
+    written = queue.Queue()
+    failure = []
+
+    def writer():
+        while True:
+            messages = pending.get()
+            if messages is None:
+                return
+            try:
+                documents = [_message_to_document(message) for message in messages if message.value]
+                if documents:
+                    write_batch(documents)
+                written.put(messages)
+            except Exception as e:
+                failure.append(e)
+                stop_event.set()
+                return
+
+    writer_thread = threading.Thread(target=writer, name="stream-writer", daemon=True)
+    writer_thread.start()
+
+    stats = {"messages": 0, "skipped": 0, "batches": 0, "pauses": 0}
+    batch = []
+    batch_started = None
+    last_message = time.monotonic()
+    paused = False
+    submitted = 0
+    try:
+        while not stop_event.is_set():
+            _commit_written(broker, written, stats)
+            if max_batches is not None and submitted >= max_batches:
+                break
+
+            # Backpressure: stop fetching while the writer is behind
+            if pending.full() and not paused:
+                broker.pause()
+                paused = True
+                stats["pauses"] += 1
+            elif paused and pending.qsize() < max_pending_batches / 2:
+                broker.resume()
+                paused = False
+
+            timeout = max_batch_seconds if batch_started is None \
+                else max(0.0, batch_started + max_batch_seconds - time.monotonic())
+            messages = broker.poll(max_batch_size - len(batch), min(timeout, 1.0))
+            now = time.monotonic()
+            if messages:
+                last_message = now
+                batch_started = batch_started or now
+                batch.extend(messages)
+            elif idle_timeout is not None and not batch and not paused and now - last_message >= idle_timeout:
+                break
+
+            if batch and (len(batch) >= max_batch_size or now - batch_started >= max_batch_seconds):
+                if _submit(pending, batch, stop_event, writer_thread):
+                    submitted += 1
+                    batch, batch_started = [], None
+    finally:
+        if batch and not failure:
+            _submit(pending, batch, None, writer_thread)
+        _submit(pending, None, None, writer_thread)
+        writer_thread.join()
+        _commit_written(broker, written, stats)
+        broker.close()
+
+    if failure:
+        raise Exception(f"Failed to write stream batch: {failure[0]}")
+    print(f"Stream ingestion stopped: {stats['messages']} messages ({stats['skipped']} empty) in "
+          f"{stats['batches']} batches, paused {stats['pauses']} times")
+    return stats
+
+
+def _submit(pending, batch, stop_event, writer_thread):
+    """
+    Hands a batch to the writer, waiting while the write queue is full.
+
+    :return: False when the consumer is stopping or the writer exited.
+    """
+    while writer_thread.is_alive():
+        try:
+            pending.put(batch, timeout=0.1)
+            return True
+        except queue.Full:
+            if stop_event is not None and stop_event.is_set():
+                return False
+    return False
+
+
+def _commit_written(broker, written, stats):
+    while True:
+        try:
+            messages = written.get_nowait()
+        except queue.Empty:
+            return
+        broker.commit(messages)
+        stats["messages"] += len(messages)
+        stats["skipped"] += sum(1 for message in messages if not message.value)
+        stats["batches"] += 1
+
+
+def _message_to_document(message):
+    value = message.value
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    return {
+        "source": "stream",
+        "content": value,
+        "metadata": {
+            "filepath": f"{message.topic}/{message.partition}/{message.offset}",
+            "filename": message.topic,
+            "topic": message.topic,
+            "partition": message.partition,
+            "offset": message.offset,
+            "processed": False
+        }
+    }
@@ -1,8 +1,167 @@
+import asyncio
+from collections import defaultdict
+from urllib.parse import urldefrag, urljoin, urlparse
+import httpx
 import requests
 from bs4 import BeautifulSoup
+from src.ingestion.async_bridge import iter_async
+from src.ingestion.extractors import HTML_PARSER, html_to_text
 
-def fetch_from_web_page(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+
+def fetch_from_web_page(url, timeout=30):
+    response = requests.get(url, timeout=timeout)
+    soup = BeautifulSoup(response.text, HTML_PARSER)
     text = soup.get_text()
     return {"content": text, "source": url}
+
+
+def iter_crawl(seed_urls, stored=None, **options):
+    """
+    Crawls a site and streams its pages as documents.
+
+    :param seed_urls: URLs the crawl starts from.
+    :param stored: Dictionary mapping page URL to its stored etag, last_modified and links.
+    :param options: Keyword arguments of `aiter_crawl`.
+    :return: A generator of page documents.
+    """
+    return iter_async(aiter_crawl(seed_urls, stored, **options))
+
+
+async def aiter_crawl(seed_urls, stored=None, max_depth=2, max_pages=1000, concurrency=16,
+                      per_host_concurrency=4, timeout=20.0, transport=None):
+    """
+    Crawls pages reachable from the seed URLs on the same hosts.
+
+    Pages already stored are requested with If-None-Match / If-Modified-Since; a 304
+    response is not yielded again, and the links stored with the page are followed so
+    the crawl still reaches the rest of the site.
+
+    :param seed_urls: URLs the crawl starts from.
+    :param stored: Dictionary mapping page URL to its stored etag, last_modified and links.
+    :param max_depth: Maximum number of links followed from a seed URL.
+    :param max_pages: Maximum number of URLs visited.
+    :param concurrency: Maximum number of requests in flight.
+    :param per_host_concurrency: Maximum number of requests in flight per host.
+    :param timeout: Request timeout in seconds.
+    :param transport: Optional httpx transport (e.g. to target a stub server in tests).
+    :return: An async generator of new or changed page documents.
+    """
+    stored = stored or {}
+    allowed_hosts = {urlparse(url).netloc for url in seed_urls}
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host_concurrency))
+    frontier = asyncio.Queue()
+    results = asyncio.Queue()
+    seen = set()
+    stats = {"fetched": 0, "not_modified": 0, "failed": 0}
+
+    for url in seed_urls:
+        url = urldefrag(url)[0]
+        if url not in seen:
+            seen.add(url)
+            frontier.put_nowait((url, 0))
+
+    def enqueue(links, depth):
+        for link in links:
+            if depth > max_depth or len(seen) >= max_pages:
+                return
+            if link not in seen and urlparse(link).netloc in allowed_hosts:
+                seen.add(link)
+                frontier.put_nowait((link, depth))
+
+    async def worker(client):
+        while True:
+            url, depth = await frontier.get()
+            try:
+                async with host_limits[urlparse(url).netloc]:
+                    document = await _fetch_page(client, url, depth, stored.get(url))
+                if document is None:
+                    stats["not_modified"] += 1
+                    enqueue(stored[url].get("links") or [], depth + 1)
+                else:
+                    stats["fetched"] += 1
+                    enqueue(document["metadata"]["links"], depth + 1)
+                    if document["content"] is not None:
+                        await results.put(document)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Failed to crawl {url}: {e}")
+            finally:
+                frontier.task_done()
+
+    client = httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        transport=transport
+    )
+    async with client:
+        workers = [asyncio.create_task(worker(client)) for _ in range(concurrency)]
+        crawl_done = asyncio.create_task(frontier.join())
+        try:
+            while True:
+                next_result = asyncio.create_task(results.get())
+                finished, _ = await asyncio.wait({next_result, crawl_done}, return_when=asyncio.FIRST_COMPLETED)
+                if next_result in finished:
+                    yield next_result.result()
+                    continue
+                next_result.cancel()
+                break
+            while not results.empty():
+                yield results.get_nowait()
+        finally:
+            for task in workers:
+                task.cancel()
+            crawl_done.cancel()
+            await asyncio.gather(*workers, crawl_done, return_exceptions=True)
+
+    print(f"Crawled {len(seen)} URLs: {stats['fetched']} fetched, {stats['not_modified']} not modified, "
+          f"{stats['failed']} failed")
+
+
+async def _fetch_page(client, url, depth, stored_page):
+    """
+    Fetches a page, conditionally when it was stored before.
+
+    :return: The page document, or None when the server answered 304 Not Modified.
+             The content is None for non-HTML responses.
+    """
+    headers = {}
+    if stored_page:
+        if stored_page.get("etag"):
+            headers["If-None-Match"] = stored_page["etag"]
+        if stored_page.get("last_modified"):
+            headers["If-Modified-Since"] = stored_page["last_modified"]
+
+    response = await client.get(url, headers=headers)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+
+    metadata = {
+        "filepath": url,
+        "filename": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "depth": depth,
+        # Followed on the next crawl when the page is not modified, kept out of the chunk payloads
+        "links": [],
+        "change": "modified" if stored_page else "new",
+        "processed": False
+    }
+    if "html" not in response.headers.get("Content-Type", ""):
+        return {"source": "web", "content": None, "metadata": metadata}
+
+    text, soup = html_to_text(response.text)
+    metadata["links"] = _extract_links(str(response.url), soup)
+    if soup.title and soup.title.string:
+        metadata["filename"] = soup.title.string.strip()
+    return {"source": "web", "content": text, "metadata": metadata}
+
+
+def _extract_links(base_url, soup):
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = urldefrag(urljoin(base_url, anchor["href"]))[0]
+        if urlparse(link).scheme in ("http", "https"):
+            links.append(link)
+    return list(dict.fromkeys(links))
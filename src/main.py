@@ -1,12 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.common import Base, engine
-from src.routers import pipelines, users, config, workflow, evaluation
+from src.routers import pipelines, users, config, workflow, evaluation, health
+from src.services import init_database, start_warm_up
 
 app = FastAPI()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+
+@app.on_event("startup")
+def startup():
+    # Create tables at startup rather than import; failures are reported by /api/health/ready
+    init_database()
+    # Models load on first use, or in the background when WARMUP_* variables are set
+    start_warm_up()
+
 
 # Configure CORS
 origins = [
@@ -28,6 +34,7 @@ app.include_router(pipelines.router, prefix="/api/pipelines", tags=["pipelines"]
 app.include_router(config.router, prefix="/api/config", tags=["config"])
 app.include_router(workflow.router, prefix="/api/workflow", tags=["workflow"])
 app.include_router(evaluation.router, prefix="/api/evaluate", tags=["evaluation"])
+app.include_router(health.router, prefix="/api/health", tags=["health"])
 
 
 import uvicorn
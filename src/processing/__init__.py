@@ -1,4 +1,8 @@
 from .standardizer import standardize_data
 from .metadata_enrichment import enrich_metadata
-from .embedding_generation import generate_embeddings
-from .text_cleaning import clean_text, clean_batch
\ No newline at end of file
+from .document_batch import DocumentBatch, benchmark_document_batches
+from .embedding_generation import generate_embeddings, create_chunk_encoder, ChunkEncoder
+from .embedding_batch import EmbeddingBatch
+from .deduplication import NearDuplicateIndex, get_near_duplicate_index
+from .text_cleaning import clean_text, clean_batch, clean_chunks, TextNormalizer, benchmark_text_normalization
+from .embedding_pool import EmbeddingPool, create_embedding_pool
@@ -0,0 +1,312 @@
+import os
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_word = re.compile(r"\w+")
+
+
+def shingle_hashes(text, shingle_size=3):
+    """
+    :param text: Chunk text.
+    :param shingle_size: Number of words per shingle.
+    :return: uint64 array of the CRC32 hashes of the distinct word shingles of the text
+             (the whole text when it has fewer words than a shingle).
+    """
+    words = _word.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64,
+                       count=len(shingles))
+
+
+def lsh_rows(threshold, num_perm):
+    """
+    Chooses the number of signature rows per LSH band.
+
+    Bands of `rows` values make two chunks candidates with probability 1 - (1 - s^rows)^bands
+    for a Jaccard similarity s. The largest band whose S-curve midpoint, (1 / bands)^(1 / rows),
+    is below the threshold is kept, so near-duplicates are rarely missed; candidates are then
+    checked against the threshold.
+
+    :param threshold: Jaccard similarity from which chunks are duplicates.
+    :param num_perm: Signature length.
+    :return: Number of rows per band (a divisor of num_perm).
+    """
+    best = 1
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0 and (rows / num_perm) ** (1 / rows) <= threshold:
+            best = rows
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index of the chunks loaded into a collection, stored in SQLite.
+
+    Each chunk gets a MinHash signature of its word shingles. The signature is cut
+    into LSH bands, and chunks sharing a band bucket are candidates whose estimated
+    Jaccard similarity is then compared with `threshold`. Chunks that are not
+    duplicates become canonical: once they are stored in the collection, their
+    signature and buckets are added with `add`, so later batches and later runs are
+    checked against them. The filepath of each chunk is kept too: a chunk is not
+    matched against indexed chunks of its own file (an earlier version of the file
+    being replaced), and `remove_filepaths` drops the chunks of replaced files.
+    """
+
+    def __init__(self, path, collection, threshold=0.85, num_perm=128, shingle_size=3, seed=1):
+        """
+        :param path: Path of the SQLite database (its folder is created if needed).
+        :param collection: Name of the collection, each collection has its own index.
+        :param threshold: Jaccard similarity from which a chunk is a near-duplicate.
+        :param num_perm: Number of MinHash permutations.
+        :param shingle_size: Number of words per shingle.
+        :param seed: Seed of the permutations, signatures are only comparable with the same seed.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.rows = lsh_rows(threshold, num_perm)
+        self.bands = num_perm // self.rows
+        # Signatures built with other parameters are not comparable, they live in their own scope
+        self.scope = f"{collection}:{num_perm}:{shingle_size}:{seed}:{self.rows}"
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = generator.integers(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "scope TEXT NOT NULL, chunk_id TEXT NOT NULL, signature BLOB NOT NULL, "
+            "PRIMARY KEY (scope, chunk_id)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "scope TEXT NOT NULL, bucket BLOB NOT NULL, chunk_id TEXT NOT NULL, "
+            "PRIMARY KEY (scope, bucket, chunk_id)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS buckets_chunk ON buckets (scope, chunk_id)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_files ("
+            "scope TEXT NOT NULL, chunk_id TEXT NOT NULL, filepath TEXT NOT NULL, "
+            "PRIMARY KEY (scope, chunk_id)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS chunk_files_filepath ON chunk_files (scope, filepath)")
+        self.connection.commit()
+        self.checked = 0
+        self.duplicates = 0
+
+    def signature(self, text):
+        """
+        :param text: Chunk text.
+        :return: uint32 MinHash signature, or None when the text has no words.
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        with np.errstate(over="ignore"):
+            values = ((hashes[:, None] * self.a + self.b) % _MERSENNE_PRIME) & _MAX_HASH
+        return values.min(axis=0).astype(np.uint32)
+
+    def band_buckets(self, signature):
+        """
+        :param signature: MinHash signature.
+        :return: List of the bucket keys of the signature, one per band.
+        """
+        return [band.to_bytes(2, "big") + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def find_duplicates(self, chunk_ids, texts, signatures=None, filepaths=None, query_size=500):
+        """
+        Finds the near-duplicates of a batch of chunks, within the batch and in the index.
+
+        The index is only read: the canonical chunks are added with `add` once they are stored.
+
+        :param chunk_ids: Stable id of each chunk (its vector point id).
+        :param texts: List of chunk texts.
+        :param signatures: Optional signature of each chunk, computed from the texts when missing.
+        :param filepaths: Optional filepath of each chunk; indexed chunks of the same file are ignored.
+        :param query_size: Number of keys per SQLite query.
+        :return: List with, for each chunk, the id of the canonical chunk it duplicates, or None.
+        """
+        if signatures is None:
+            signatures = [self.signature(text) for text in texts]
+        if filepaths is None:
+            filepaths = [None] * len(chunk_ids)
+        buckets = [self.band_buckets(signature) if signature is not None else [] for signature in signatures]
+
+        with self.lock:
+            # Chunks of the index sharing a bucket with the batch, and their signatures
+            indexed_buckets = {}
+            keys = list({key for chunk_buckets in buckets for key in chunk_buckets})
+            for start in range(0, len(keys), query_size):
+                batch = keys[start:start + query_size]
+                rows = self.connection.execute(
+                    f"SELECT bucket, chunk_id FROM buckets WHERE scope = ? AND bucket IN ({','.join('?' * len(batch))})",
+                    [self.scope, *batch]
+                ).fetchall()
+                for bucket, chunk_id in rows:
+                    indexed_buckets.setdefault(bytes(bucket), []).append(chunk_id)
+            candidate_ids = list({chunk_id for ids in indexed_buckets.values() for chunk_id in ids})
+            known = {}
+            files = {}
+            for start in range(0, len(candidate_ids), query_size):
+                batch = candidate_ids[start:start + query_size]
+                rows = self.connection.execute(
+                    f"SELECT s.chunk_id, s.signature, f.filepath FROM signatures AS s "
+                    f"LEFT JOIN chunk_files AS f ON f.scope = s.scope AND f.chunk_id = s.chunk_id "
+                    f"WHERE s.scope = ? AND s.chunk_id IN ({','.join('?' * len(batch))})",
+                    [self.scope, *batch]
+                ).fetchall()
+                for chunk_id, signature, filepath in rows:
+                    known[chunk_id] = np.frombuffer(signature, dtype=np.uint32)
+                    files[chunk_id] = filepath
+
+        canonical = []
+        for chunk_id, signature, chunk_buckets, filepath in zip(chunk_ids, signatures, buckets, filepaths):
+            best, best_similarity = None, self.threshold
+            for key in chunk_buckets:
+                for candidate in indexed_buckets.get(key, ()):
+                    if candidate == chunk_id or candidate not in known:
+                        continue
+                    if filepath is not None and files.get(candidate) == filepath:
+                        # An earlier version of the same file, about to be replaced
+                        continue
+                    similarity = float(np.mean(known[candidate] == signature))
+                    if similarity >= best_similarity:
+                        best, best_similarity = candidate, similarity
+            canonical.append(best)
+            if best is None and signature is not None:
+                # Later chunks of the batch are checked against this one too
+                known[chunk_id] = signature
+                for key in chunk_buckets:
+                    indexed_buckets.setdefault(key, []).append(chunk_id)
+        with self.lock:
+            self.checked += len(chunk_ids)
+            self.duplicates += sum(1 for chunk_id in canonical if chunk_id is not None)
+        return canonical
+
+    def add(self, chunk_ids, signatures, filepaths=None, query_size=500):
+        """
+        Adds canonical chunks to the index, once they are stored in the collection.
+
+        :param chunk_ids: Stable id of each chunk.
+        :param signatures: MinHash signature of each chunk.
+        :param filepaths: Optional filepath of each chunk.
+        :param query_size: Number of keys per SQLite query.
+        """
+        if filepaths is None:
+            filepaths = [None] * len(chunk_ids)
+        entries = [(chunk_id, signature, filepath)
+                   for chunk_id, signature, filepath in zip(chunk_ids, signatures, filepaths)
+                   if signature is not None]
+        if not entries:
+            return
+        with self.lock:
+            # A chunk loaded again replaces its previous signature
+            ids = [chunk_id for chunk_id, _, _ in entries]
+            for start in range(0, len(ids), query_size):
+                batch = ids[start:start + query_size]
+                self.connection.execute(
+                    f"DELETE FROM buckets WHERE scope = ? AND chunk_id IN ({','.join('?' * len(batch))})",
+                    [self.scope, *batch]
+                )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO signatures (scope, chunk_id, signature) VALUES (?, ?, ?)",
+                [(self.scope, chunk_id, signature.tobytes()) for chunk_id, signature, _ in entries]
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO buckets (scope, bucket, chunk_id) VALUES (?, ?, ?)",
+                [(self.scope, key, chunk_id) for chunk_id, signature, _ in entries
+                 for key in self.band_buckets(signature)]
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO chunk_files (scope, chunk_id, filepath) VALUES (?, ?, ?)",
+                [(self.scope, chunk_id, filepath) for chunk_id, _, filepath in entries if filepath is not None]
+            )
+            self.connection.commit()
+
+    def remove_filepaths(self, filepaths, query_size=500):
+        """
+        Removes the chunks of files from the index, when their points are deleted.
+
+        :param filepaths: Filepaths whose chunks are removed.
+        :param query_size: Number of filepaths per SQLite query.
+        :return: Number of chunks removed.
+        """
+        filepaths = list(filepaths)
+        removed = 0
+        with self.lock:
+            for start in range(0, len(filepaths), query_size):
+                batch = filepaths[start:start + query_size]
+                ids = [chunk_id for (chunk_id,) in self.connection.execute(
+                    f"SELECT chunk_id FROM chunk_files WHERE scope = ? "
+                    f"AND filepath IN ({','.join('?' * len(batch))})",
+                    [self.scope, *batch]
+                ).fetchall()]
+                for table in ("buckets", "signatures", "chunk_files"):
+                    for id_start in range(0, len(ids), query_size):
+                        id_batch = ids[id_start:id_start + query_size]
+                        self.connection.execute(
+                            f"DELETE FROM {table} WHERE scope = ? AND chunk_id IN ({','.join('?' * len(id_batch))})",
+                            [self.scope, *id_batch]
+                        )
+                removed += len(ids)
+            self.connection.commit()
+        return removed
+
+    def stats(self):
+        """
+        :return: Dictionary with the chunks checked, the duplicates found, the duplicate rate,
+                 the LSH bands and rows, and the number of canonical chunks in the index.
+        """
+        with self.lock:
+            entries = self.connection.execute(
+                "SELECT COUNT(*) FROM signatures WHERE scope = ?", (self.scope,)
+            ).fetchone()[0]
+        return {
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicate_rate": round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+            "bands": self.bands,
+            "rows": self.rows,
+            "entries": entries
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_near_duplicate_index(path, collection, threshold=0.85, num_perm=128, shingle_size=3):
+    """
+    Returns the process-wide index of a collection, opening it on first use.
+
+    :param path: Path of the SQLite database.
+    :param collection: Name of the collection.
+    :param threshold: Jaccard similarity from which a chunk is a near-duplicate.
+    :param num_perm: Number of MinHash permutations.
+    :param shingle_size: Number of words per shingle.
+    :return: The NearDuplicateIndex.
+    """
+    key = (path, collection, threshold, num_perm, shingle_size)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = NearDuplicateIndex(path, collection, threshold, num_perm, shingle_size)
+        return index
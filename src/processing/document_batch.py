@@ -0,0 +1,168 @@
+import time
+from datetime import datetime
+from src.processing.metadata_enrichment import enrich_metadata
+from src.processing.standardizer import standardize_data
+
+
+class DocumentBatch:
+    """
+    Column-oriented batch of ingested documents.
+
+    The batch keeps the contents and the source metadata of its documents as
+    parallel lists (the metadata dictionaries are referenced, not copied), the
+    standard per-document fields as their own columns, and the fields shared by
+    every document of the batch (data source, type, creation date) once in
+    `constants`. Enrichment and standardization run as one fused pass over the
+    columns, and MongoDB documents are only built by `to_documents`, at the write boundary.
+    """
+
+    def __init__(self, contents, metadata, filepaths=None, filenames=None, processed=None, constants=None):
+        """
+        :param contents: List of document contents.
+        :param metadata: List of source metadata dictionaries.
+        :param filepaths: Optional column of file paths.
+        :param filenames: Optional column of file names.
+        :param processed: Optional column of processed flags.
+        :param constants: Dictionary of the metadata fields shared by every document.
+        """
+        self.contents = contents
+        self.metadata = metadata
+        self.filepaths = filepaths
+        self.filenames = filenames
+        self.processed = processed
+        self.constants = constants or {}
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        :param documents: List of dictionaries with `content` and `metadata`.
+        :return: A DocumentBatch referencing their contents and metadata.
+        """
+        return cls([document.get("content", "") for document in documents],
+                   [document.get("metadata", {}) for document in documents])
+
+    def __len__(self):
+        return len(self.contents)
+
+    def enrich_and_standardize(self, source_config, created_date=None):
+        """
+        Applies `enrich_metadata` and `standardize_data` in a single pass.
+
+        The source config is read once and the creation date is taken once for the
+        whole batch; the results are otherwise identical to the two separate passes.
+
+        :param source_config: Configuration dictionary for the data source.
+        :param created_date: Creation date of the batch, defaults to now.
+        :return: A new, standardized DocumentBatch.
+        """
+        constants = {
+            "datasource": source_config.get("name", "unknown"),
+            "datasource_type": source_config.get("type", "unknown"),
+            "created_date": created_date or datetime.now().isoformat(),
+        }
+        return DocumentBatch(
+            [content.strip() for content in self.contents],
+            self.metadata,
+            [metadata.get("filepath", "unknown") for metadata in self.metadata],
+            [metadata.get("filename", "unknown") for metadata in self.metadata],
+            [metadata.get("processed", False) for metadata in self.metadata],
+            constants
+        )
+
+    def modified_filepaths(self):
+        """
+        :return: File paths of the documents whose metadata has `change == "modified"`.
+        """
+        return [filepath for filepath, metadata in zip(self.filepaths, self.metadata)
+                if metadata.get("change") == "modified"]
+
+    def to_documents(self):
+        """
+        :return: The batch as a list of MongoDB documents with `content` and `metadata`.
+        """
+        constants = self.constants
+        return [
+            {
+                "content": content,
+                "metadata": {**metadata, "filepath": filepath, "filename": filename, "processed": processed,
+                             **constants}
+            }
+            for content, metadata, filepath, filename, processed in zip(
+                self.contents, self.metadata, self.filepaths, self.filenames, self.processed
+            )
+        ]
+
+
+def benchmark_document_batches(count=1_000_000, batch_size=200, source_config=None, repeat=3):
+    """
+    Compares the per-document overhead of the two-pass enrichment and standardization with DocumentBatch.
+
+    A synthetic batch of `batch_size` documents is processed `count / batch_size` times,
+    the way IngestionBatchWriter processes a source, without storing anything.
+
+    :param count: Number of documents processed by each implementation.
+    :param batch_size: Number of documents per batch.
+    :param source_config: Data source configuration, defaults to a file source.
+    :param repeat: Number of runs, the fastest one is reported.
+    :return: Dictionary with the best time and nanoseconds per document of both
+             implementations, the speedup and whether they produced the same documents.
+    """
+    source_config = source_config or {"name": "benchmark", "type": "file"}
+    documents = [
+        {
+            "content": f"  Document {index} of the benchmark batch.  ",
+            "metadata": {"filepath": f"/data/benchmark/{index}.txt", "filename": f"{index}.txt",
+                         "extraction_time": 0.001, "change": "new", "file_hash": f"{index:064x}"}
+        }
+        for index in range(batch_size)
+    ]
+    batches = max(1, count // batch_size)
+    count = batches * batch_size
+
+    def two_passes():
+        return [standardize_data(item) for item in enrich_metadata(documents, source_config)]
+
+    def fused():
+        return DocumentBatch.from_documents(documents).enrich_and_standardize(source_config).to_documents()
+
+    def best_time(function):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(batches):
+                function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    reference_seconds = best_time(two_passes)
+    batch_seconds = best_time(fused)
+
+    # The creation date is taken per document by the two passes, it is left out of the comparison
+    def comparable(output):
+        return [{**doc, "metadata": {**doc["metadata"], "created_date": None}} for doc in output]
+
+    result = {
+        "documents": count,
+        "batch_size": batch_size,
+        "reference_seconds": round(reference_seconds, 3),
+        "batch_seconds": round(batch_seconds, 3),
+        "reference_ns_per_document": round(reference_seconds / count * 1e9, 1),
+        "batch_ns_per_document": round(batch_seconds / count * 1e9, 1),
+        "speedup": round(reference_seconds / batch_seconds, 2) if batch_seconds else None,
+        "identical_output": comparable(two_passes()) == comparable(fused())
+    }
+    print(f"Enrichment and standardization: {result['batch_ns_per_document']} ns/document vs "
+          f"{result['reference_ns_per_document']} ns/document ({result['speedup']}x) over {count} documents, "
+          f"identical output: {result['identical_output']}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks DocumentBatch against the two-pass enrichment.")
+    parser.add_argument("--documents", type=int, default=1_000_000, help="Number of documents processed")
+    parser.add_argument("--batch-size", type=int, default=200, help="Number of documents per batch")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the fastest one is reported")
+    arguments = parser.parse_args()
+    benchmark_document_batches(arguments.documents, arguments.batch_size, repeat=arguments.repeat)
@@ -0,0 +1,186 @@
+import uuid
+from bisect import bisect_right
+import numpy as np
+
+# Document metadata fields describing the whole document, not a chunk, kept out of the payloads
+PAYLOAD_EXCLUDED_FIELDS = frozenset({"page_offsets", "links"})
+
+
+def point_id(document_id, chunk_index):
+    """
+    :param document_id: Stable id of the document (its MongoDB _id, or its filepath).
+    :param chunk_index: Position of the chunk in the document.
+    :return: Deterministic UUID string of the chunk point.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document_id}#{chunk_index}"))
+
+
+class EmbeddingBatch:
+    """
+    Embeddings of many chunks in a compact form.
+
+    The vectors are one contiguous float32 matrix. Chunk texts are a parallel list,
+    and each chunk points to the metadata of its document (shared, never copied)
+    through `document_index`, with its position in the document in `chunk_index`
+    and, for span-based chunking, its character offsets in the stored content of its
+    document in `spans` (-1 when unknown). Near-duplicate chunks linked to a canonical chunk
+    carry its point id in `duplicate_of`; their vector is the canonical vector (NaN
+    until it is resolved, see `unresolved_links`). Canonical chunks checked against a
+    NearDuplicateIndex carry their MinHash signature in `signatures`, added to the
+    index once the batch is stored. Payload dictionaries are only built while the
+    batch is uploaded.
+    """
+
+    def __init__(self, vectors, texts, documents, document_index, chunk_index, document_ids=None, spans=None,
+                 duplicate_of=None, signatures=None):
+        """
+        :param vectors: float32 matrix, one row per chunk.
+        :param texts: List of chunk texts.
+        :param documents: List of document metadata dictionaries.
+        :param document_index: Index in `documents` of each chunk.
+        :param chunk_index: Position of each chunk in its document.
+        :param document_ids: Optional stable id of each document (e.g. its MongoDB _id).
+        :param spans: Optional (start, end) character offsets of each chunk.
+        :param duplicate_of: Optional point id of the canonical chunk of each chunk (None when canonical).
+        :param signatures: Optional MinHash signature of each canonical chunk (None for the others).
+        """
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.texts = texts
+        self.documents = documents
+        self.document_index = np.asarray(document_index, dtype=np.int32)
+        self.chunk_index = np.asarray(chunk_index, dtype=np.int32)
+        self.document_ids = document_ids or [None] * len(documents)
+        if spans is None or not len(spans):
+            spans = np.full((len(texts), 2), -1, dtype=np.int64)
+        self.spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+        self.duplicate_of = duplicate_of or [None] * len(texts)
+        self.signatures = signatures or [None] * len(texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def dimension(self):
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    def select(self, mask):
+        """
+        :param mask: Boolean mask (or index array) of the chunks to keep.
+        :return: A new EmbeddingBatch sharing the document metadata.
+        """
+        indices = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        return EmbeddingBatch(
+            self.vectors[indices],
+            [self.texts[i] for i in indices],
+            self.documents,
+            self.document_index[indices],
+            self.chunk_index[indices],
+            self.document_ids,
+            self.spans[indices],
+            [self.duplicate_of[i] for i in indices],
+            [self.signatures[i] for i in indices]
+        )
+
+    def validate(self):
+        """
+        Drops the chunks whose vector is not finite or is all zeros, in one vectorized pass.
+
+        :return: Tuple (valid batch, number of dropped chunks).
+        """
+        if len(self) == 0 or self.dimension == 0:
+            return self.select(np.zeros(len(self), dtype=bool)), len(self)
+        valid = np.isfinite(self.vectors).all(axis=1) & np.any(self.vectors != 0, axis=1)
+        if valid.all():
+            return self, 0
+        return self.select(valid), int(len(self) - valid.sum())
+
+    def modified_filepaths(self):
+        """
+        :return: Sorted filepaths of the documents of the batch whose metadata has `change == "modified"`;
+                 the points of their previous version are replaced by the batch.
+        """
+        return sorted({metadata["filepath"] for metadata in self.documents
+                       if metadata.get("change") == "modified" and metadata.get("filepath")})
+
+    def chunk_filepaths(self):
+        """
+        :return: List of the filepath of the document of every chunk.
+        """
+        return [self.documents[document].get("filepath") for document in self.document_index]
+
+    def point_ids(self):
+        """
+        Deterministic point ids, so processing the same stored document again overwrites its
+        points. A modified document is stored again under a new id, see `modified_filepaths`.
+
+        :return: List of UUID strings derived from the document id (or filepath) and chunk index.
+        """
+        return [
+            point_id(self.document_ids[document] or self.documents[document].get("filepath", ""), chunk)
+            for document, chunk in zip(self.document_index, self.chunk_index)
+        ]
+
+    def unresolved_links(self):
+        """
+        :return: Dictionary mapping the point id of each canonical chunk outside the batch to
+                 the rows linked to it whose vector is still unknown.
+        """
+        links = {}
+        for row, canonical in enumerate(self.duplicate_of):
+            if canonical is not None and np.isnan(self.vectors[row, 0]):
+                links.setdefault(canonical, []).append(row)
+        return links
+
+    def resolve_links(self, vectors):
+        """
+        Copies canonical vectors into the rows linked to them.
+
+        :param vectors: Dictionary mapping canonical point ids to their vectors; rows whose
+                        canonical is missing stay NaN and are dropped by `validate`.
+        :return: Number of rows resolved.
+        """
+        resolved = 0
+        for canonical, rows in self.unresolved_links().items():
+            vector = vectors.get(canonical)
+            if vector is not None:
+                self.vectors[rows] = vector
+                resolved += len(rows)
+        return resolved
+
+    def payloads(self):
+        """
+        :return: A generator of the payload of every chunk: its document metadata (without the
+                 PAYLOAD_EXCLUDED_FIELDS), text, chunk index and, when known, its `start_offset`,
+                 `end_offset`, `duplicate_of` and the `page_number` its start falls on (for
+                 documents with `page_offsets`).
+        """
+        documents = [
+            {field: value for field, value in metadata.items() if field not in PAYLOAD_EXCLUDED_FIELDS}
+            if PAYLOAD_EXCLUDED_FIELDS.intersection(metadata) else metadata
+            for metadata in self.documents
+        ]
+        page_offsets = [metadata.get("page_offsets") for metadata in self.documents]
+        for text, document, chunk, (start, end), duplicate_of in zip(self.texts, self.document_index, self.chunk_index,
+                                                                     self.spans, self.duplicate_of):
+            payload = {**documents[document], "text": text, "chunk_index": int(chunk)}
+            if start >= 0:
+                payload["start_offset"] = int(start)
+                payload["end_offset"] = int(end)
+                if page_offsets[document]:
+                    payload["page_number"] = max(bisect_right(page_offsets[document], start), 1)
+            if duplicate_of is not None:
+                payload["duplicate_of"] = duplicate_of
+            yield payload
+
+    def to_documents(self):
+        """
+        :return: The batch as a list of {"content", "embedding", "metadata"} dictionaries.
+        """
+        return [
+            {"content": text, "embedding": vector.tolist(), "metadata": payload}
+            for text, vector, payload in zip(self.texts, self.vectors, self.payloads())
+        ]
+
+    @staticmethod
+    def empty():
+        return EmbeddingBatch(np.zeros((0, 0), dtype=np.float32), [], [], [], [])
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+
+_whitespace = re.compile(r"\s+")
+
+
+def text_key(text):
+    """
+    Hashes the normalized text of a chunk (NFC, collapsed whitespace).
+
+    :param text: Chunk text.
+    :return: SHA-256 digest (bytes).
+    """
+    normalized = _whitespace.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).digest()
+
+
+def model_revision(model, default="unknown"):
+    """
+    Finds the revision (commit hash) of a SentenceTransformer model.
+
+    :param model: SentenceTransformer model.
+    :param default: Revision used when the model does not record one.
+    :return: The revision string.
+    """
+    try:
+        revision = model.model_card_data.base_model_revision
+        if revision:
+            return revision
+    except AttributeError:
+        pass
+    try:
+        return model[0].auto_model.config._commit_hash or default
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return default
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk embeddings, stored in SQLite.
+
+    Entries are keyed by (model name, model revision, hash of the normalized chunk
+    text) and hold the vector as a float32 blob, so a chunk is embedded once per
+    model whichever document or run it comes from. The cache holds at most
+    `max_entries` vectors; the least recently used ones are evicted first.
+    """
+
+    def __init__(self, path, max_entries=1_000_000):
+        """
+        :param path: Path of the SQLite database (its folder is created if needed).
+        :param max_entries: Maximum number of cached vectors.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, revision TEXT NOT NULL, text_hash BLOB NOT NULL, "
+            "vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, revision, text_hash)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model_name, revision, keys, chunk_size=500):
+        """
+        Looks up many chunks at once.
+
+        :param model_name: Name of the embedding model.
+        :param revision: Revision of the embedding model.
+        :param keys: List of `text_key` digests.
+        :param chunk_size: Number of keys per query.
+        :return: Dictionary mapping the keys found to their float32 vectors.
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for start in range(0, len(unique_keys), chunk_size):
+                batch = unique_keys[start:start + chunk_size]
+                rows = self.connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND revision = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model_name, revision, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[bytes(text_hash)] = np.frombuffer(vector, dtype=np.float32)
+            if found:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND revision = ? AND text_hash = ?",
+                    [(now, model_name, revision, key) for key in found]
+                )
+                self.connection.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, model_name, revision, keys, vectors):
+        """
+        Stores vectors, then evicts the least recently used entries over the limit.
+
+        :param model_name: Name of the embedding model.
+        :param revision: Revision of the embedding model.
+        :param keys: List of `text_key` digests.
+        :param vectors: Matrix (or list) of vectors, one per key.
+        """
+        if not len(keys):
+            return
+        now = time.time()
+        rows = [(model_name, revision, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for key, vector in zip(keys, vectors)]
+        with self.lock:
+            cursor = self.connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, revision, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.entries += max(cursor.rowcount, 0)
+            if self.entries > self.max_entries:
+                # Evict down to 90% of the limit so eviction does not run on every insert
+                excess = self.entries - int(self.max_entries * 0.9)
+                cursor = self.connection.execute(
+                    "DELETE FROM embeddings WHERE (model, revision, text_hash) IN "
+                    "(SELECT model, revision, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += cursor.rowcount
+                self.entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self.connection.commit()
+
+    def stats(self):
+        """
+        :return: Dictionary with the hits, misses, hit rate, evictions and number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self.entries
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path, max_entries=1_000_000):
+    """
+    Returns the process-wide cache stored at a path, opening it on first use.
+
+    :param path: Path of the SQLite database.
+    :param max_entries: Maximum number of cached vectors.
+    :return: The EmbeddingCache.
+    """
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = EmbeddingCache(path, max_entries)
+        cache.max_entries = max_entries
+        return cache
@@ -1,66 +1,480 @@
-from sentence_transformers import SentenceTransformer
-from src.chunking import get_chunks
+from src.common.model_registry import get_pipeline_embedding_model
+from src.chunking import get_chunks, iter_chunk_spans, materialize, split_sentences, group_sentences, SPAN_METHODS
+from src.processing.embedding_batch import EmbeddingBatch, point_id
+from src.processing.embedding_cache import get_embedding_cache, model_revision, text_key
+from src.processing.deduplication import get_near_duplicate_index
+from collections import OrderedDict
 import numpy as np
-import copy
+import threading
+import time
+
 
 def generate_embeddings(data, processing_config=None):
     """
     Generates embeddings for a batch of documents using a SentenceTransformer model.
 
+    The chunks of all the documents are encoded together, sorted by length, see `ChunkEncoder`.
+
     :param data: A list of documents with `content` fields.
-    :param model_name: The name of the embedding model to use.
-    :param chunking_config: Configuration for the chunking method.
+    :param processing_config: Pipeline processing config (`embedding_model`, `embedding_backend`,
+                              chunking options, `encode_batch_size`, `embedding_cache_path`).
     :return: A list of documents with embeddings and metadata.
     """
-    model_name = processing_config.get("embedding_model", "all-mpnet-base-v2")
-    model = SentenceTransformer(model_name)
-    results = []
-
-    for doc in data:
-        content = doc.get("content", "")
-        # Skip if content is empty
-        if not content.strip():
-            print(f"Skipping document with empty content: {doc.get('metadata', {}).get('filename', 'Unknown')}")
-            continue
+    processing_config = processing_config or {}
+    encoder = create_chunk_encoder(processing_config)
+    results = encoder.add(data).to_documents() + encoder.flush().to_documents()
+    encoder.report()
+    return results
+
+
+def create_chunk_encoder(processing_config, pool=None, collection=None):
+    """
+    Creates the chunk encoder of a pipeline.
+
+    With `dedup_mode` set to "drop" or "link", near-duplicate chunks (Jaccard similarity
+    of at least `dedup_threshold`) are checked against the NearDuplicateIndex of the
+    collection, stored at `dedup_index_path`.
+
+    :param processing_config: Pipeline processing config.
+    :param pool: Optional EmbeddingPool encoding the chunks in worker processes.
+    :param collection: Name of the vector collection, which scopes the near-duplicate index.
+    :return: A ChunkEncoder using the pool, or the shared instance of the pipeline embedding model.
+    """
+    if pool is None:
+        model_name, backend, model = get_pipeline_embedding_model(processing_config)
+    else:
+        model_name = processing_config.get("embedding_model", "all-mpnet-base-v2")
+        backend = processing_config.get("embedding_backend", "torch")
+        model = None
+    cache = None
+    if processing_config.get("embedding_cache_path"):
+        cache = get_embedding_cache(
+            processing_config["embedding_cache_path"],
+            max_entries=int(processing_config.get("embedding_cache_max_entries", 1_000_000))
+        )
+    deduplicator = None
+    dedup_mode = processing_config.get("dedup_mode", "off")
+    if dedup_mode in ("drop", "link"):
+        deduplicator = get_near_duplicate_index(
+            processing_config.get("dedup_index_path", "data/dedup_index.sqlite"),
+            collection or "default",
+            threshold=float(processing_config.get("dedup_threshold", 0.85)),
+            num_perm=int(processing_config.get("dedup_num_perm", 128))
+        )
+    elif dedup_mode != "off":
+        raise ValueError(f"Invalid dedup mode: {dedup_mode}")
+    return ChunkEncoder(
+        model,
+        processing_config,
+        batch_size=int(processing_config.get("encode_batch_size", 64)),
+        max_pending_chunks=int(processing_config.get("encode_budget", 4096)),
+        cache=cache,
+        pool=pool,
+        # Quantized backends produce slightly different vectors, they are cached apart
+        model_name=model_name if backend == "torch" else f"{model_name}@{backend}",
+        deduplicator=deduplicator,
+        dedup_mode=dedup_mode,
+        recent_vectors=int(processing_config.get("dedup_recent_vectors", 10_000))
+    )
+
+
+def chunk_document(doc, processing_config):
+    """
+    Splits the content of a document with the configured chunking method.
+
+    :param doc: Document with a `content` field.
+    :param processing_config: Pipeline processing config.
+    :return: List of chunks, empty when the document has no content.
+    """
+    return chunk_document_spans(doc, processing_config)[0]
+
+
+def chunk_document_spans(doc, processing_config):
+    """
+    Splits the content of a document, keeping the position of the chunks when the method produces spans.
+
+    :param doc: Document with a `content` field.
+    :param processing_config: Pipeline processing config.
+    :return: Tuple (chunks, spans) of the list of chunks and the list of their (start, end)
+             offsets in the content, or None for methods that do not produce spans.
+    """
+    content = doc.get("content", "")
+    # Skip if content is empty
+    if not content.strip():
+        print(f"Skipping document with empty content: {doc.get('metadata', {}).get('filename', 'Unknown')}")
+        return [], None
+    method = processing_config.get("chunking_method", "fixed_length")
+    spans = None
+    if method == "semantic_embedding":
+        # Sentences are encoded first and grouped into chunks by ChunkEncoder.embed
+        chunks = split_sentences(content, processing_config.get("semantic_sentence_words", 40))
+    elif method in SPAN_METHODS:
+        spans = list(iter_chunk_spans(
+            content,
+            method,
+            chunk_size=processing_config.get("chunk_size", 100),
+            overlap=processing_config.get("overlap", 50)
+        ))
+        chunks = materialize(content, spans)
+    else:
         # Chunk the content
         chunks = get_chunks(
             content,
-            method=processing_config.get("chunking_method", "fixed_length"),
+            method=method,
             chunk_size=processing_config.get("chunk_size", 100),
             overlap=processing_config.get("overlap", 50),
             num_topics=processing_config.get("num_topics", 5)
         )
+    if not chunks:
+        print(f"Skipping document '{doc.get('metadata', {}).get('filename', 'Unknown')}' - No valid text chunks found.")
+    return chunks, spans
 
-        if not chunks:
-            print(
-                f"Skipping document '{doc.get('metadata', {}).get('filename', 'Unknown')}' - No valid text chunks found.")
-            continue
 
-        # Generate embeddings for each chunk
-        try:
-            embeddings = model.encode(chunks, show_progress_bar=True)
-            if not isinstance(embeddings, np.ndarray) or embeddings.size == 0:
-                print(
-                    f"Skipping document '{doc.get('metadata', {}).get('filename', 'Unknown')}' - No valid embeddings generated.")
-                continue
+class ChunkEncoder:
+    """
+    Encodes the chunks of many documents together.
 
-            print("Preparing embeddings")
-            for chunk, embedding in zip(chunks, embeddings):
-                if embedding is None or not isinstance(embedding, np.ndarray) or embedding.size == 0:
-                    print(f"Skipping invalid embedding for chunk: {chunk[:50]}...")
-                    continue  # Skip invalid embeddings
+    Chunks are gathered across documents, and across batches of documents until
+    `max_pending_chunks` are pending. They are then sorted by token length and
+    encoded in batches of `batch_size` similar-length chunks, which keeps padding
+    (and the number of forward passes) low. The results are returned as an
+    EmbeddingBatch referencing the metadata of the documents they came from, with
+    the character offsets of the chunks for span-based chunking methods.
 
-                doc_metadata = copy.deepcopy(doc.get("metadata", {}))
-                doc_metadata["text"] = chunk  # ✅ Store chunk text in metadata
+    With the 'semantic_embedding' chunking method the encoded units are sentences:
+    consecutive sentences of a document are grouped where their similarity drops, and
+    the chunk vectors are derived from the sentence vectors (see `group_sentences`).
 
-                results.append({
-                    "content": chunk,
-                    "embedding": embedding.tolist(),  # Convert numpy array to list for serialization
-                    "metadata": doc_metadata
-                })
+    Identical chunks (after whitespace normalization) are encoded once. With an
+    EmbeddingCache, the vectors of chunks embedded before by the same model revision
+    are read from the cache in bulk and only the other chunks are encoded.
 
-        except Exception as e:
-            print(
-                f"Error generating embeddings for document '{doc.get('metadata', {}).get('filename', 'Unknown')}': {str(e)}")
+    With a NearDuplicateIndex, chunks whose text nearly duplicates a chunk already
+    loaded (in this batch, an earlier one or an earlier run) are not encoded. In
+    "drop" mode they are left out; in "link" mode they keep their own point and
+    payload, with the vector of the canonical chunk and its id in `duplicate_of`.
+    The vectors of recent canonical chunks are kept in memory for that, older ones
+    are read back from the vector store when the batch is stored. The index is only
+    read while encoding: canonical chunks are added to it by `commit`, once their
+    batch is stored. Sentences of the 'semantic_embedding' method are not deduplicated.
 
-    return results
+    `add_chunked` and `flush` may be called from several threads (e.g. parallel
+    pipeline stages).
+    """
+
+    def __init__(self, model, processing_config, batch_size=64, max_pending_chunks=4096, cache=None,
+                 pool=None, model_name=None, deduplicator=None, dedup_mode="drop", recent_vectors=10_000):
+        """
+        :param model: SentenceTransformer model, None when a pool is used.
+        :param processing_config: Pipeline processing config (chunking options).
+        :param batch_size: Number of chunks per forward pass.
+        :param max_pending_chunks: Number of chunks gathered before they are encoded.
+        :param cache: Optional EmbeddingCache.
+        :param pool: Optional EmbeddingPool the sorted chunks are encoded by.
+        :param model_name: Name of the model, part of the cache key.
+        :param deduplicator: Optional NearDuplicateIndex.
+        :param dedup_mode: "drop" or "link", see above.
+        :param recent_vectors: Number of canonical vectors kept in memory in "link" mode.
+        """
+        self.model = model
+        self.processing_config = processing_config
+        self.batch_size = batch_size
+        self.max_pending_chunks = max_pending_chunks
+        self.cache = cache
+        self.pool = pool
+        self.model_name = model_name
+        self.revision = None
+        if cache is not None:
+            self.revision = pool.revision if pool is not None else model_revision(model)
+        self.deduplicator = deduplicator
+        self.link_duplicates = deduplicator is not None and dedup_mode == "link"
+        self.recent_vectors = recent_vectors
+        self.canonical_vectors = OrderedDict()  # point id -> vector of recent canonical chunks
+        self.duplicates = 0
+        self.pending = []  # (doc, chunks, spans) waiting to be encoded
+        self.pending_chunks = 0
+        self.chunks = 0
+        self.encoded_chunks = 0
+        self.documents = 0
+        self.encode_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, documents):
+        """
+        Chunks documents and encodes the pending chunks once the budget is reached.
+
+        :param documents: A list of documents with `content` fields.
+        :return: EmbeddingBatch of the chunks encoded so far (possibly empty).
+        """
+        return self.add_chunked(self.chunk(documents))
+
+    def chunk(self, documents):
+        """
+        :param documents: A list of documents with `content` fields.
+        :return: List of (doc, chunks, spans) for the documents that have chunks.
+        """
+        chunked = []
+        for doc in documents:
+            chunks, spans = chunk_document_spans(doc, self.processing_config)
+            if chunks:
+                chunked.append((doc, chunks, spans))
+        return chunked
+
+    def add_chunked(self, chunked):
+        """
+        Adds chunked documents and encodes the pending chunks once the budget is reached.
+        Safe to call from several threads; the encoding runs outside the lock.
+
+        :param chunked: List of (doc, chunks, spans).
+        :return: EmbeddingBatch of the chunks encoded so far (possibly empty).
+        """
+        with self.lock:
+            self.pending.extend(chunked)
+            self.pending_chunks += sum(len(chunks) for _, chunks, _ in chunked)
+            if self.pending_chunks < self.max_pending_chunks:
+                return EmbeddingBatch.empty()
+            pending, self.pending, self.pending_chunks = self.pending, [], 0
+        return self.embed(pending)
+
+    def flush(self):
+        """
+        Encodes every pending chunk.
+
+        :return: EmbeddingBatch of the pending chunks.
+        """
+        with self.lock:
+            pending, self.pending, self.pending_chunks = self.pending, [], 0
+        return self.embed(pending)
+
+    def embed(self, pending):
+        """
+        :param pending: List of (doc, chunks, spans).
+        :return: EmbeddingBatch with one row per chunk that was embedded successfully
+                 (and per linked near-duplicate).
+        """
+        if not pending:
+            return EmbeddingBatch.empty()
+        semantic = self.processing_config.get("chunking_method") == "semantic_embedding"
+        document_ids = [str(doc["_id"]) if doc.get("_id") is not None else None for doc, _, _ in pending]
+        texts = [chunk for _, chunks, _ in pending for chunk in chunks]
+
+        start = time.perf_counter()
+        chunk_ids = []
+        canonical = signatures = [None] * len(texts)
+        if self.deduplicator is not None and not semantic:
+            chunk_ids = [point_id(document_ids[document] or doc.get("metadata", {}).get("filepath", ""), index)
+                         for document, (doc, chunks, _) in enumerate(pending) for index in range(len(chunks))]
+            signatures = [self.deduplicator.signature(text) for text in texts]
+            filepaths = [doc.get("metadata", {}).get("filepath") for doc, chunks, _ in pending for _ in chunks]
+            canonical = self.deduplicator.find_duplicates(chunk_ids, texts, signatures, filepaths)
+        unique = [position for position, duplicate_of in enumerate(canonical) if duplicate_of is None]
+        keys = [text_key(text) for text in texts]
+        vectors = self.lookup([keys[position] for position in unique], [texts[position] for position in unique])
+        with self.lock:
+            self.encode_seconds += time.perf_counter() - start
+            self.chunks += len(texts)
+            self.documents += len(pending)
+            self.duplicates += len(texts) - len(unique)
+
+        print("Preparing embeddings")
+        rows, kept_texts, document_index, chunk_index, kept_spans, links, kept_signatures = [], [], [], [], [], [], []
+        position = 0
+        for document, (_, chunks, spans) in enumerate(pending):
+            doc_rows = []  # (chunk index, chunk, vector, span, canonical point id, signature)
+            for index, chunk in enumerate(chunks):
+                span = spans[index] if spans is not None else (-1, -1)
+                duplicate_of = canonical[position]
+                if duplicate_of is None:
+                    vector = vectors.get(keys[position])
+                    if vector is None:
+                        print(f"Skipping invalid embedding for chunk: {chunk[:50]}...")
+                    else:
+                        if self.link_duplicates:
+                            self.remember(chunk_ids[position], vector)
+                        doc_rows.append((index, chunk, vector, span, None, signatures[position]))
+                elif self.link_duplicates:
+                    doc_rows.append((index, chunk, self.canonical_vector(duplicate_of), span, duplicate_of, None))
+                position += 1
+            if semantic and doc_rows:
+                grouped_texts, grouped = group_sentences(
+                    [chunk for _, chunk, _, _, _, _ in doc_rows],
+                    np.stack([vector for _, _, vector, _, _, _ in doc_rows]),
+                    chunk_size=self.processing_config.get("chunk_size", 100),
+                    threshold=self.processing_config.get("semantic_threshold"),
+                    percentile=self.processing_config.get("semantic_percentile", 20)
+                )
+                doc_rows = [(index, chunk, vector, (-1, -1), None, None)
+                            for index, (chunk, vector) in enumerate(zip(grouped_texts, grouped))]
+            for index, chunk, vector, span, duplicate_of, signature in doc_rows:
+                rows.append(vector)
+                kept_texts.append(chunk)
+                document_index.append(document)
+                chunk_index.append(index)
+                kept_spans.append(span)
+                links.append(duplicate_of)
+                kept_signatures.append(signature)
+        if not rows:
+            return EmbeddingBatch.empty()
+        # The metadata of each document is shared by its chunks, the payloads are built at upload time
+        return EmbeddingBatch(
+            np.stack(rows),
+            kept_texts,
+            [doc.get("metadata", {}) for doc, _, _ in pending],
+            document_index,
+            chunk_index,
+            document_ids=document_ids,
+            spans=kept_spans,
+            duplicate_of=links,
+            signatures=kept_signatures
+        )
+
+    def commit(self, embeddings):
+        """
+        Adds the canonical chunks of a stored batch to the near-duplicate index.
+
+        :param embeddings: EmbeddingBatch of this encoder, as it was stored.
+        """
+        if self.deduplicator is not None and any(signature is not None for signature in embeddings.signatures):
+            self.deduplicator.add(embeddings.point_ids(), embeddings.signatures, embeddings.chunk_filepaths())
+
+    def forget(self, filepaths):
+        """
+        Removes the chunks of replaced files from the near-duplicate index.
+
+        :param filepaths: Filepaths whose points were deleted.
+        """
+        if self.deduplicator is not None and filepaths:
+            self.deduplicator.remove_filepaths(filepaths)
+
+    def remember(self, chunk_id, vector):
+        """
+        Keeps the vector of a canonical chunk for the near-duplicates linked to it.
+        """
+        with self.lock:
+            self.canonical_vectors[chunk_id] = vector
+            self.canonical_vectors.move_to_end(chunk_id)
+            while len(self.canonical_vectors) > self.recent_vectors:
+                self.canonical_vectors.popitem(last=False)
+
+    def canonical_vector(self, chunk_id):
+        """
+        :param chunk_id: Point id of a canonical chunk.
+        :return: Its vector when it is recent, else a NaN vector resolved when the batch is stored.
+        """
+        with self.lock:
+            vector = self.canonical_vectors.get(chunk_id)
+        if vector is not None:
+            return vector
+        return np.full(self.dimension(), np.nan, dtype=np.float32)
+
+    def dimension(self):
+        if self.pool is not None:
+            return self.pool.dimension
+        return self.model.get_sentence_embedding_dimension()
+
+    def lookup(self, keys, texts):
+        """
+        Finds the vector of every distinct chunk, from the cache or by encoding it.
+
+        :param keys: `text_key` of each chunk.
+        :param texts: List of chunks.
+        :return: Dictionary mapping the keys to their vectors; chunks that failed to encode are missing.
+        """
+        first_text = {}
+        for key, text in zip(keys, texts):
+            first_text.setdefault(key, text)
+
+        vectors = {}
+        if self.cache is not None:
+            vectors = self.cache.get_many(self.model_name, self.revision, list(first_text))
+        missing = [key for key in first_text if key not in vectors]
+        if not missing:
+            return vectors
+
+        embeddings, valid = self.encode([first_text[key] for key in missing])
+        with self.lock:
+            self.encoded_chunks += len(missing)
+        encoded = [key for key, ok in zip(missing, valid) if ok]
+        for index in np.flatnonzero(valid):
+            vectors[missing[index]] = embeddings[index]
+        if self.cache is not None and encoded:
+            self.cache.put_many(self.model_name, self.revision, encoded, embeddings[valid])
+        return vectors
+
+    def encode(self, texts):
+        """
+        Encodes texts in batches of similar token length.
+
+        :param texts: List of chunks.
+        :return: Tuple (embeddings, valid) of a float32 matrix in the order of the texts
+                 and a boolean mask of the rows that were encoded successfully.
+        """
+        order = np.argsort(self.token_lengths(texts), kind="stable")[::-1]
+        embeddings = None
+        valid = np.zeros(len(texts), dtype=bool)
+        if self.pool is not None:
+            try:
+                batch = self.pool.encode([texts[i] for i in order])
+            except Exception as e:
+                print(f"Error generating embeddings for {len(texts)} chunks: {str(e)}")
+                return embeddings, valid
+            embeddings = np.empty_like(batch)
+            embeddings[order] = batch
+            return embeddings, np.isfinite(embeddings).all(axis=1)
+
+        for start in range(0, len(texts), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            try:
+                batch = self.model.encode([texts[i] for i in indices], batch_size=len(indices),
+                                          show_progress_bar=False, convert_to_numpy=True)
+            except Exception as e:
+                print(f"Error generating embeddings for {len(indices)} chunks: {str(e)}")
+                continue
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[indices] = batch
+            valid[indices] = np.isfinite(batch).all(axis=1)
+        return embeddings, valid
+
+    def token_lengths(self, texts):
+        """
+        :param texts: List of chunks.
+        :return: Number of tokens of each chunk, or its number of characters when the
+                 model has no fast tokenizer (or lives in pool workers).
+        """
+        if self.model is None:
+            return np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        try:
+            encoded = self.model.tokenizer(texts, add_special_tokens=False, truncation=True,
+                                           max_length=self.model.max_seq_length, return_length=True)
+            return np.asarray(encoded["length"])
+        except Exception:
+            return np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+
+    def stats(self):
+        """
+        :return: Dictionary with the chunks and documents processed, the chunks actually
+                 encoded, the near-duplicates found, the encoding time, the throughput in
+                 chunks per second and the cache and near-duplicate index stats.
+        """
+        return {
+            "chunks": self.chunks,
+            "encoded_chunks": self.encoded_chunks,
+            "duplicates": self.duplicates,
+            "documents": self.documents,
+            "encode_seconds": round(self.encode_seconds, 3),
+            "chunks_per_sec": round(self.chunks / self.encode_seconds, 1) if self.encode_seconds else 0.0,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "dedup": self.deduplicator.stats() if self.deduplicator is not None else None
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Embedded {stats['chunks']} chunks from {stats['documents']} documents "
+              f"({stats['encoded_chunks']} encoded) in {stats['encode_seconds']}s ({stats['chunks_per_sec']} chunks/sec)")
+        if stats["cache"]:
+            print(f"Embedding cache hit rate: {stats['cache']['hit_rate']:.1%} ({stats['cache']['entries']} entries)")
+        if stats["dedup"]:
+            print(f"Near-duplicate chunks: {stats['duplicates']} ({stats['dedup']['duplicate_rate']:.1%}), "
+                  f"{stats['dedup']['entries']} canonical chunks indexed")
+        return stats
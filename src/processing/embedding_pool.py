@@ -0,0 +1,227 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class EmbeddingPool:
+    """
+    Pool of embedding processes, each holding its own copy of the model.
+
+    Chunk batches are sent to the workers through a task queue; each worker writes
+    the embeddings of its batch as a float32 matrix into a shared memory slot owned
+    by the pool, so results are never pickled. Every worker is limited to
+    `threads_per_worker` intra-op threads so the workers together do not
+    oversubscribe the cores. Use it as a context manager (or call `close`) so the
+    workers and the shared memory are released when the pipeline ends or fails.
+    """
+
+    def __init__(self, model_name, workers, model_options=None, threads_per_worker=None, max_batch_chunks=64,
+                 start_timeout=600, loader=None):
+        """
+        :param model_name: Name of the embedding model.
+        :param workers: Number of worker processes.
+        :param model_options: Keyword arguments of `get_embedding_model` (backend, export_dir, ...).
+        :param threads_per_worker: Intra-op threads per worker, defaults to cpu_count / workers.
+        :param max_batch_chunks: Maximum number of chunks per task.
+        :param start_timeout: Seconds to wait for the workers to load the model.
+        :param loader: Optional module-level callable (model_name, **model_options) loading the
+                       model in the workers, defaults to `get_embedding_model`.
+        """
+        self.workers = workers
+        self.max_batch_chunks = max_batch_chunks
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.processes = [
+            context.Process(
+                target=_worker_main,
+                args=(model_name, model_options or {}, self.threads_per_worker, self.tasks, self.results, loader),
+                name=f"embedding-worker-{index}",
+                daemon=True
+            )
+            for index in range(workers)
+        ]
+        self.slots = []
+        self.closed = False
+        self.lock = threading.Lock()
+        for process in self.processes:
+            process.start()
+
+        try:
+            self.dimension, self.revision = None, None
+            start = time.perf_counter()
+            for _ in range(workers):
+                _, dimension, revision, error = self._next_result(start_timeout)
+                if error:
+                    raise Exception(f"Failed to start embedding worker: {error}")
+                self.dimension, self.revision = dimension, revision
+            # Two slots per worker, so a worker never waits for the parent to copy a result out
+            self.slots = [
+                shared_memory.SharedMemory(create=True, size=max_batch_chunks * self.dimension * 4)
+                for _ in range(workers * 2)
+            ]
+        except Exception:
+            self.close()
+            raise
+        print(f"Started {workers} embedding workers with {self.threads_per_worker} threads each "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    def encode(self, texts):
+        """
+        Encodes texts across the workers, keeping their order.
+
+        :param texts: List of chunks (ideally sorted by length, batches are consecutive slices).
+        :return: float32 matrix with one row per text.
+        """
+        # The slots are shared, concurrent callers take turns (the workers parallelize each call)
+        with self.lock:
+            return self._encode(texts)
+
+    def _encode(self, texts):
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        batches = [(start, texts[start:start + self.max_batch_chunks])
+                   for start in range(0, len(texts), self.max_batch_chunks)]
+        free_slots = list(range(len(self.slots)))
+        in_flight = {}
+        next_batch = 0
+        failure = None
+        while (next_batch < len(batches) and failure is None) or in_flight:
+            while free_slots and next_batch < len(batches) and failure is None:
+                slot = free_slots.pop()
+                start, batch = batches[next_batch]
+                self.tasks.put((slot, self.slots[slot].name, batch))
+                in_flight[slot] = (start, len(batch))
+                next_batch += 1
+
+            slot, rows, _, error = self._next_result()
+            start, count = in_flight.pop(slot)
+            free_slots.append(slot)
+            if error:
+                # Batches already sent are still collected so they do not leak into the next call
+                failure = failure or error
+                continue
+            embeddings[start:start + count] = np.ndarray((rows, self.dimension), dtype=np.float32,
+                                                         buffer=self.slots[slot].buf)
+        if failure:
+            raise Exception(f"Embedding worker failed: {failure}")
+        return embeddings
+
+    def _next_result(self, timeout=None):
+        """
+        Waits for the next worker message, failing if a worker died.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [process.name for process in self.processes if not process.is_alive()]
+                if dead:
+                    raise Exception(f"Embedding workers exited unexpectedly: {', '.join(dead)}")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise Exception("Timed out waiting for the embedding workers")
+
+    def close(self, timeout=10):
+        """
+        Stops the workers and releases the shared memory. Safe to call more than once.
+
+        :param timeout: Seconds to wait for each worker before terminating it.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for process in self.processes:
+            if process.is_alive():
+                self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for slot in self.slots:
+            slot.close()
+            slot.unlink()
+        self.tasks.close()
+        self.results.close()
+        print(f"Stopped {len(self.processes)} embedding workers")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_embedding_pool(processing_config):
+    """
+    Starts the embedding pool of a pipeline when `embedding_workers` is greater than 1.
+
+    :param processing_config: Pipeline processing config (`embedding_workers`,
+                              `embedding_threads_per_worker`, `encode_batch_size`, model options).
+    :return: An EmbeddingPool, or None when encoding runs in this process.
+    """
+    workers = int(processing_config.get("embedding_workers", 1))
+    if workers <= 1:
+        return None
+    backend = processing_config.get("embedding_backend", "torch")
+    model_options = {"backend": backend}
+    if backend == "onnx-int8":
+        model_options["export_dir"] = processing_config.get("onnx_export_dir", "models/onnx")
+        model_options["quantization"] = processing_config.get("onnx_quantization", "avx2")
+    threads = processing_config.get("embedding_threads_per_worker")
+    return EmbeddingPool(
+        processing_config.get("embedding_model", "all-mpnet-base-v2"),
+        workers,
+        model_options=model_options,
+        threads_per_worker=int(threads) if threads else None,
+        max_batch_chunks=int(processing_config.get("encode_batch_size", 64))
+    )
+
+
+def _worker_main(model_name, model_options, threads, tasks, results, loader=None):
+    # Thread limits must be set before torch / onnxruntime are imported
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    try:
+        from src.common.model_registry import get_embedding_model
+        from src.processing.embedding_cache import model_revision
+
+        try:
+            import torch
+            torch.set_num_threads(threads)
+            torch.set_num_interop_threads(1)
+        except ImportError:
+            pass
+        model = (loader or get_embedding_model)(model_name, **model_options)
+        results.put((None, model.get_sentence_embedding_dimension(), model_revision(model), None))
+    except Exception as e:
+        results.put((None, None, None, str(e)))
+        return
+
+    # Slots are reused for every task, they are attached once
+    blocks = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            slot, slot_name, texts = task
+            try:
+                embeddings = model.encode(texts, batch_size=len(texts), show_progress_bar=False,
+                                          convert_to_numpy=True)
+                if slot_name not in blocks:
+                    blocks[slot_name] = shared_memory.SharedMemory(name=slot_name)
+                np.ndarray(embeddings.shape, dtype=np.float32, buffer=blocks[slot_name].buf)[:] = embeddings
+                results.put((slot, len(texts), None, None))
+            except Exception as e:
+                results.put((slot, 0, None, str(e)))
+    finally:
+        # The blocks are owned (and unlinked) by the pool
+        for block in blocks.values():
+            block.close()
+
@@ -13,6 +13,7 @@ def enrich_metadata(data, source_config):
         # Ensure metadata fields exist
         metadata = item.get("metadata", {})
         enriched_metadata = {
+            **metadata,  # Keep source specific fields (e.g. extraction_time)
             "filepath": metadata.get("filepath", "unknown"),
             "filename": metadata.get("filename", "unknown"),
             "processed": metadata.get("processed", False),  # Preserve processed status
@@ -8,6 +8,7 @@ def standardize_data(data):
     standardized_data = {
         "content": data.get("content", "").strip(),  # Ensure content is cleaned
         "metadata": {
+            **data["metadata"],
             "filepath": data["metadata"].get("filepath", "unknown"),
             "filename": data["metadata"].get("filename", "unknown"),
             "processed": data["metadata"].get("processed", False),  # Preserve processed status
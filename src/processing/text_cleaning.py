@@ -1,6 +1,156 @@
+import random
 import re
+import time
+
+DEFAULT_RULES = {
+    "ascii": True,  # Drop non-ASCII characters
+    "remove_emoji": True,
+    "collapse_whitespace": True,  # Runs of whitespace become one space, ends are stripped
+    "remove_special_characters": True,  # Drop characters that are neither word characters nor whitespace
+    "lowercase": False,
+}
+
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F),  # Emoticons
+    (0x1F300, 0x1F5FF),  # Symbols & pictographs
+    (0x1F680, 0x1F6FF),  # Transport & map symbols
+    (0x1F1E0, 0x1F1FF),  # Flags
+]
+
+_whitespace = re.compile(r"\s+")
+_special_characters = re.compile(r"[^\w\s]+")
+_normalizers = {}
+
+
+class TextNormalizer:
+    """
+    Text normalization rules compiled once into the fewest passes.
+
+    With the default rules the result is identical to the original `clean_text`:
+    ASCII folding is one C-level encode/decode (which also removes every emoji), the
+    whitespace is collapsed with one regex pass, and the special characters are
+    deleted with one `str.translate` table covering the 128 ASCII characters. Without
+    ASCII folding, emoji are deleted by a translate table and special characters by
+    one compiled regex.
+    """
+
+    def __init__(self, rules=None):
+        """
+        :param rules: Dictionary overriding DEFAULT_RULES.
+        """
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.steps = self._compile()
+
+    @classmethod
+    def from_config(cls, processing_config):
+        """
+        :param processing_config: Pipeline processing config with optional `text_normalization` rules.
+        :return: The TextNormalizer of the pipeline.
+        """
+        return cls((processing_config or {}).get("text_normalization"))
+
+    def _compile(self):
+        rules = self.rules
+        steps = []
+        if rules["ascii"]:
+            steps.append(_to_ascii)
+        elif rules["remove_emoji"] and not rules["remove_special_characters"]:
+            # Emoji are special characters, only needed when those are kept
+            emoji_table = dict.fromkeys(code for first, last in EMOJI_RANGES for code in range(first, last + 1))
+            steps.append(lambda text: text.translate(emoji_table))
+
+        if rules["collapse_whitespace"]:
+            steps.append(_collapse_whitespace)
+
+        if rules["remove_special_characters"]:
+            if rules["ascii"]:
+                # The text is ASCII at this point, a 128-entry table replaces the regex
+                special_table = dict.fromkeys(
+                    code for code in range(128) if not re.match(r"[\w\s]", chr(code))
+                )
+                steps.append(lambda text: text.translate(special_table))
+            else:
+                steps.append(lambda text: _special_characters.sub("", text))
+
+        if rules["lowercase"]:
+            steps.append(str.lower)
+        return steps
+
+    def normalize(self, text):
+        """
+        :param text: Text to normalize.
+        :return: The normalized text, "" for empty or non-string values.
+        """
+        if not text or not isinstance(text, str):
+            return ""
+        for step in self.steps:
+            text = step(text)
+        return text
+
+    def normalize_batch(self, texts, executor=None, min_parallel_chars=1024 * 1024, group_chars=256 * 1024):
+        """
+        Normalizes many texts, fanning large batches out to a process pool.
+
+        :param texts: List of texts.
+        :param executor: Optional ProcessPoolExecutor; batches smaller than
+                         `min_parallel_chars` are normalized in this process anyway.
+        :param min_parallel_chars: Total size from which the executor is used.
+        :param group_chars: Approximate number of characters sent to a worker at a time.
+        :return: List of normalized texts, in order.
+        """
+        total = sum(len(text) for text in texts if isinstance(text, str))
+        if executor is None or total < min_parallel_chars:
+            return [self.normalize(text) for text in texts]
+
+        groups = []
+        group, size = [], 0
+        for text in texts:
+            group.append(text)
+            size += len(text) if isinstance(text, str) else 0
+            if size >= group_chars:
+                groups.append(group)
+                group, size = [], 0
+        if group:
+            groups.append(group)
+
+        rules = tuple(sorted(self.rules.items()))
+        futures = [executor.submit(_normalize_group, rules, group) for group in groups]
+        return [text for future in futures for text in future.result()]
+
+
+def _to_ascii(text):
+    return text.encode("ascii", "ignore").decode("ascii")
+
+
+def _collapse_whitespace(text):
+    return _whitespace.sub(" ", text).strip()
+
+
+def _normalize_group(rules, texts):
+    # Runs in pool workers, each worker compiles a rule set once
+    normalizer = _normalizers.get(rules)
+    if normalizer is None:
+        normalizer = _normalizers[rules] = TextNormalizer(dict(rules))
+    return [normalizer.normalize(text) for text in texts]
+
+
+_default_normalizer = TextNormalizer()
+
 
 def clean_text(text):
+    """
+    Normalizes a text with the default rules, see TextNormalizer.
+
+    :param text: Text to clean.
+    :return: The cleaned text.
+    """
+    return _default_normalizer.normalize(text)
+
+
+def clean_text_reference(text):
+    """
+    Original four-pass implementation of `clean_text`, kept to benchmark and check TextNormalizer.
+    """
     if not text or not isinstance(text, str):
         return ""
 
@@ -25,22 +175,131 @@ def clean_text(text):
     return text
 
 
-def clean_batch(batch):
+def clean_batch(batch, normalizer=None, executor=None):
     """
     Cleans the contents of a batch of documents.
 
     :param batch: A list of documents with `content` fields.
+    :param normalizer: TextNormalizer of the pipeline, defaults to the `clean_text` rules.
+    :param executor: Optional ProcessPoolExecutor used for large batches.
     :return: A cleaned batch of documents.
     """
+    normalizer = normalizer or _default_normalizer
     cleaned_batch = []
     for doc in batch:
         # Ensure the document is a dictionary and has a content field
         if isinstance(doc, dict) and "content" in doc and doc["content"]:
+            cleaned_batch.append(doc)
+        else:
+            print(f"Skipping invalid document: {doc}")
+
+    try:
+        contents = normalizer.normalize_batch([doc["content"] for doc in cleaned_batch], executor)
+    except Exception as e:
+        print(f"Error cleaning batch, cleaning documents one by one: {e}")
+        contents = []
+        for doc in cleaned_batch:
             try:
-                doc["content"] = clean_text(doc["content"])
-                cleaned_batch.append(doc)
+                contents.append(normalizer.normalize(doc["content"]))
             except Exception as e:
                 print(f"Error cleaning document: {e}")
-        else:
-            print(f"Skipping invalid document: {doc}")
-    return cleaned_batch
+                contents.append(None)
+
+    for doc, content in zip(cleaned_batch, contents):
+        doc["content"] = content
+    return [doc for doc in cleaned_batch if doc["content"] is not None]
+
+
+def clean_chunks(chunked, normalizer=None, executor=None):
+    """
+    Cleans the chunks of documents chunked before cleaning, keeping their spans in the stored content.
+
+    :param chunked: List of (doc, chunks, spans), see `ChunkEncoder.chunk`.
+    :param normalizer: TextNormalizer of the pipeline, defaults to the `clean_text` rules.
+    :param executor: Optional ProcessPoolExecutor used for large batches.
+    :return: List of (doc, chunks, spans) without the chunks left empty by cleaning.
+    """
+    normalizer = normalizer or _default_normalizer
+    contents = normalizer.normalize_batch([chunk for _, chunks, _ in chunked for chunk in chunks], executor)
+    cleaned_chunked = []
+    position = 0
+    for doc, chunks, spans in chunked:
+        kept = [index for index in range(len(chunks)) if contents[position + index]]
+        if kept:
+            cleaned_chunked.append((
+                doc,
+                [contents[position + index] for index in kept],
+                [spans[index] for index in kept] if spans is not None else None
+            ))
+        position += len(chunks)
+    return cleaned_chunked
+
+
+def synthetic_texts(count=2000, words_per_text=300, seed=0):
+    """
+    Generates texts mixing plain words, punctuation, URLs, accented characters, emoji
+    and runs of whitespace, to benchmark text normalization without a real corpus.
+
+    :param count: Number of texts.
+    :param words_per_text: Number of tokens per text.
+    :param seed: Seed of the generator.
+    :return: List of texts.
+    """
+    generator = random.Random(seed)
+    tokens = ["the", "data", "pipeline", "ingests", "documents", "and", "of", "Qdrant", "v2.1", "(draft)",
+              "e-mail:", "https://example.com/docs?id=42", "café", "naïve", "Zürich", "日本語", "\U0001F600",
+              "\U0001F680", "50%", "--", "#tag", "user@example.com"]
+    separators = [" ", " ", " ", "  ", "\n", "\t", ", ", ". "]
+    return [
+        "".join(generator.choice(tokens) + generator.choice(separators) for _ in range(words_per_text))
+        for _ in range(count)
+    ]
+
+
+def benchmark_text_normalization(texts, normalizer=None, repeat=3):
+    """
+    Compares TextNormalizer with the original `clean_text` on a sample.
+
+    :param texts: Sample of texts.
+    :param normalizer: TextNormalizer to benchmark, defaults to the `clean_text` rules.
+    :param repeat: Number of runs, the fastest one is reported.
+    :return: Dictionary with the best time and MB/s of both implementations, the
+             speedup and whether they produced the same output.
+    """
+    normalizer = normalizer or _default_normalizer
+    megabytes = sum(len(text) for text in texts if isinstance(text, str)) / 1024 ** 2
+
+    def best_time(function):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = [function(text) for text in texts]
+            timings.append(time.perf_counter() - start)
+        return min(timings), output
+
+    reference_seconds, reference_output = best_time(clean_text_reference)
+    normalizer_seconds, normalizer_output = best_time(normalizer.normalize)
+    result = {
+        "texts": len(texts),
+        "megabytes": round(megabytes, 3),
+        "reference_seconds": round(reference_seconds, 4),
+        "normalizer_seconds": round(normalizer_seconds, 4),
+        "reference_mb_per_sec": round(megabytes / reference_seconds, 2) if reference_seconds else None,
+        "normalizer_mb_per_sec": round(megabytes / normalizer_seconds, 2) if normalizer_seconds else None,
+        "speedup": round(reference_seconds / normalizer_seconds, 2) if normalizer_seconds else None,
+        "identical_output": reference_output == normalizer_output
+    }
+    print(f"Text normalization: {result['normalizer_mb_per_sec']} MB/s vs {result['reference_mb_per_sec']} MB/s "
+          f"({result['speedup']}x), identical output: {result['identical_output']}")
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks TextNormalizer against the original clean_text.")
+    parser.add_argument("--texts", type=int, default=2000, help="Number of synthetic texts")
+    parser.add_argument("--words", type=int, default=300, help="Number of tokens per text")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the fastest one is reported")
+    arguments = parser.parse_args()
+    benchmark_text_normalization(synthetic_texts(arguments.texts, arguments.words), repeat=arguments.repeat)
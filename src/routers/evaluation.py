@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from src.common.db import get_db
-from src.services import evaluate_embeddings, test_retrieval, optimize_prompt, cluster_embeddings, benchmark_embeddings
+from src.common.model_registry import model_registry
+from src.services import (evaluate_embeddings, test_retrieval, optimize_prompt, cluster_embeddings, benchmark_embeddings,
+                          evaluate_backend)
 
 router = APIRouter()
 
@@ -57,3 +59,22 @@ def benchmark_embeddings_api(pipeline_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/backend-agreement/{pipeline_id}")
+def backend_agreement_api(pipeline_id: int, backend: str = None, sample_size: int = 200, db: Session = Depends(get_db)):
+    """Compares a quantized embedding backend with the fp32 model on a sample of the pipeline chunks"""
+    try:
+        result = evaluate_backend(db, pipeline_id, backend, sample_size)
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return {"status": "success", "backend_agreement": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Failed in backend agreement: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/model-stats")
+def model_stats_api():
+    """Reports the embedding models loaded in this process with their load times and cache hits"""
+    return {"status": "success", "model_stats": model_registry.stats()}
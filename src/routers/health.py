@@ -0,0 +1,28 @@
+from typing import List
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse
+from src.services import readiness, start_warm_up
+
+router = APIRouter()
+
+
+@router.get("/live")
+def liveness_api():
+    """Reports that the API process is up"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def readiness_api():
+    """Reports whether the API is ready to serve and which models are warm; 503 while it is not ready"""
+    result = readiness()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content=result)
+
+
+@router.post("/warmup")
+def warmup_api(models: List[str] = Query(default=[]), prompt_optimizer: bool = False):
+    """Loads embedding models (and optionally the prompt optimizer) in the background"""
+    thread = start_warm_up(models, prompt_optimizer)
+    if thread is None:
+        return {"status": "skipped", "message": "Nothing to warm up"}
+    return {"status": "started", "readiness": readiness()}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from src.workflows import run_data_ingestion, data_processing_pipeline
 from src.common.db import get_db
@@ -12,7 +13,15 @@ def start_data_ingestion(pipeline_id: int, db: Session = Depends(get_db)):
         result = run_data_ingestion(db, pipeline_id)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
-        return {"status": "success", "message": result["message"]}
+        content = {"status": result["status"], "message": result["message"], "sources": result.get("sources", [])}
+        if result["status"] == "failed":
+            raise HTTPException(status_code=500, detail=content)
+        if result["status"] == "partial":
+            # Some sources were stored, the report tells which ones failed
+            return JSONResponse(status_code=207, content=content)
+        return content
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in data ingestion: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -25,7 +34,8 @@ def start_data_processing(pipeline_id: int, db: Session = Depends(get_db)):
         result = data_processing_pipeline(db, pipeline_id)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
-        return {"status": "success", "message": result["message"]}
+        return {"status": "success", "message": result["message"], "embedding_stats": result.get("embedding_stats"),
+                "stage_stats": result.get("stage_stats")}
     except Exception as e:
         print(f"Error in data ingestion: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
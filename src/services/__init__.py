@@ -1,5 +1,6 @@
 from .benchmark import benchmark_embeddings
 from .clustering import cluster_embeddings
-from .evaluation import evaluate_embeddings
+from .evaluation import evaluate_embeddings, evaluate_backend
 from .query_testing import test_retrieval
-from .prompt_optimizer import optimize_prompt
\ No newline at end of file
+from .prompt_optimizer import optimize_prompt
+from .warmup import init_database, warm_up, start_warm_up, readiness
@@ -1,6 +1,4 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from datasets import load_dataset
 
 from src.common import get_qdrant_config, generate_embedding
 from src.crud import get_pipeline_by_id
@@ -14,6 +12,8 @@ def load_benchmark_dataset():
         Returns:
             List of dictionaries with "embedding" and "text".
         """
+    from datasets import load_dataset
+
     # Load a benchmark dataset (MS MARCO / SQuAD / SciDocs)
     dataset = load_dataset("ms_marco", split="train[:1000]")  # Limit for efficiency
 
@@ -56,6 +56,7 @@ def benchmark_embeddings(db, pipeline_id):
     dataset_vectors = np.array([sample["embedding"] for sample in dataset])
 
     # Compute cosine similarity
+    from sklearn.metrics.pairwise import cosine_similarity
     similarity_scores = cosine_similarity(vectors, dataset_vectors)
 
     return {
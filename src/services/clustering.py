@@ -1,6 +1,4 @@
 import numpy as np
-import umap
-import matplotlib.pyplot as plt
 
 from src.common import get_qdrant_config
 from src.crud import get_pipeline_by_id
@@ -24,6 +22,12 @@ def cluster_embeddings(db, pipeline_id):
     if len(embeddings) == 0:
         return {"error": "No embeddings found"}
 
+    # UMAP and matplotlib take seconds to import, they are loaded on first use
+    import umap
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     vectors = np.array([e["vector"] for e in embeddings])
     reducer = umap.UMAP(n_neighbors=10, min_dist=0.1, metric="cosine")
     embedding_2d = reducer.fit_transform(vectors)
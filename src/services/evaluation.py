@@ -1,7 +1,10 @@
+import time
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from src.storage.qdrant_storage import QdrantStorage
-from src.common import get_qdrant_config
+from src.storage import MongoDBStorage
+from src.common import get_qdrant_config, get_mongodb_config, get_processing_config, get_embedding_model
+from src.processing import clean_batch, TextNormalizer
+from src.processing.embedding_generation import chunk_document
 
 def evaluate_embeddings(db, pipeline_id):
     """
@@ -50,6 +53,7 @@ def evaluate_embeddings(db, pipeline_id):
 
     # Compute cosine similarity
     try:
+        from sklearn.metrics.pairwise import cosine_similarity
         similarity_matrix = cosine_similarity(vectors)
     except ValueError as e:
         return {"error": f"Failed to compute similarity: {str(e)}"}
@@ -63,3 +67,91 @@ def evaluate_embeddings(db, pipeline_id):
         "sparsity_ratio": float(sparsity_ratio),  # Ensure Python native float
         "embedding_count": len(valid_vectors),
     }
+
+
+def compare_backends(model_name, texts, backend="onnx-int8", batch_size=64, **options):
+    """
+    Measures how closely an inference backend reproduces the fp32 PyTorch embeddings.
+
+    :param model_name: Name of the embedding model.
+    :param texts: Sample of chunks to encode with both backends.
+    :param backend: Backend compared to "torch".
+    :param batch_size: Encoding batch size.
+    :param options: Keyword arguments of the backend loader (export_dir, quantization).
+    :return: Cosine agreement between the two embeddings of every text (mean, min,
+             5th percentile) and the throughput of both backends.
+    """
+    reference_model = get_embedding_model(model_name)
+    backend_model = get_embedding_model(model_name, backend, **options)
+
+    results = {}
+    vectors = {}
+    for name, model in (("torch", reference_model), (backend, backend_model)):
+        start = time.perf_counter()
+        vectors[name] = model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                                     convert_to_numpy=True, normalize_embeddings=True)
+        elapsed = time.perf_counter() - start
+        results[name] = {"seconds": round(elapsed, 3), "chunks_per_sec": round(len(texts) / elapsed, 1)}
+
+    # Both sides are normalized, the row-wise dot product is the cosine similarity
+    agreement = np.sum(vectors["torch"] * vectors[backend], axis=1)
+    return {
+        "model": model_name,
+        "backend": backend,
+        "sample_size": len(texts),
+        "mean_cosine": float(np.mean(agreement)),
+        "min_cosine": float(np.min(agreement)),
+        "p5_cosine": float(np.percentile(agreement, 5)),
+        "speedup": round(results["torch"]["seconds"] / results[backend]["seconds"], 2),
+        "throughput": results
+    }
+
+
+def evaluate_backend(db, pipeline_id, backend=None, sample_size=200):
+    """
+    Compares the pipeline embedding backend with fp32 PyTorch on a sample of its chunks.
+
+    :param db: Database session
+    :param pipeline_id: Pipeline ID
+    :param backend: Backend to evaluate, defaults to the pipeline `embedding_backend` (or onnx-int8)
+    :param sample_size: Number of chunks in the sample
+    :return: Agreement and speed metrics, see `compare_backends`
+    """
+    mongo_config = get_mongodb_config(db, pipeline_id)
+    if "error" in mongo_config:
+        return {"error": mongo_config["error"]}
+    processing_config = get_processing_config(db, pipeline_id)
+
+    mongo_storage = MongoDBStorage(
+        uri=mongo_config["uri"],
+        db_name=mongo_config["db_name"],
+        collection_name=mongo_config["collection_name"]
+    )
+    try:
+        texts = []
+        normalizer = TextNormalizer.from_config(processing_config)
+        for batch in mongo_storage.fetch_data_in_batches(batch_size=50):
+            for doc in clean_batch(batch, normalizer):
+                texts.extend(chunk_document(doc, processing_config))
+            if len(texts) >= sample_size:
+                break
+    finally:
+        mongo_storage.close_connection()
+
+    if not texts:
+        return {"error": "No documents found to sample"}
+
+    backend = backend or processing_config.get("embedding_backend", "torch")
+    if backend == "torch":
+        backend = "onnx-int8"
+    options = {}
+    if backend == "onnx-int8":
+        options["export_dir"] = processing_config.get("onnx_export_dir", "models/onnx")
+        options["quantization"] = processing_config.get("onnx_quantization", "avx2")
+    return compare_backends(
+        processing_config.get("embedding_model", "all-mpnet-base-v2"),
+        texts[:sample_size],
+        backend,
+        batch_size=int(processing_config.get("encode_batch_size", 64)),
+        **options
+    )
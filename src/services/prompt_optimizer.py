@@ -1,26 +1,43 @@
-from transformers import pipeline
-import torch
+import threading
 
-torch.mps.empty_cache()
-# Load a text generation model from Hugging Face (Llama 2 or Mistral)
-# generator = pipeline("text-generation", model="meta-llama/Llama-2-7b-chat-hf")
-# Set device to CPU instead of MPS (Mac Metal GPU)
-device = torch.device("cpu")  # Force CPU usage
-# generator = pipeline("text-generation", model="deepseek-ai/deepseek-llm-7b-chat", device=device)
-# lighter model
-# generator = pipeline("text-generation", model="gpt2", device=device)
-generator = pipeline(
-    "text-generation",
-    model="deepseek-ai/deepseek-llm-7b-chat",
-    torch_dtype=torch.float16,
-    device=device
-)
+PROMPT_MODEL = "deepseek-ai/deepseek-llm-7b-chat"
 
+_generator = None
+_generator_lock = threading.Lock()
 
 
+def get_generator():
+    """
+    Loads the text generation model on first use (it takes minutes and several GB), then returns the shared instance.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                from transformers import pipeline
+                import torch
+
+                # Load a text generation model from Hugging Face (Llama 2 or Mistral)
+                # generator = pipeline("text-generation", model="meta-llama/Llama-2-7b-chat-hf")
+                # Set device to CPU instead of MPS (Mac Metal GPU)
+                device = torch.device("cpu")  # Force CPU usage
+                # lighter model
+                # generator = pipeline("text-generation", model="gpt2", device=device)
+                _generator = pipeline(
+                    "text-generation",
+                    model=PROMPT_MODEL,
+                    torch_dtype=torch.float16,
+                    device=device
+                )
+    return _generator
+
+
+def is_generator_loaded():
+    return _generator is not None
+
 
 def optimize_prompt(query):
     """Suggests optimized prompts for better retrieval using a Hugging Face model"""
     prompt = f"Generate optimized variations of the query for better retrieval:\nQuery: {query}\nVariations:"
-    response = generator(prompt, max_length=50, num_return_sequences=1)
+    response = get_generator()(prompt, max_length=50, num_return_sequences=1)
     return response[0]["generated_text"].strip()
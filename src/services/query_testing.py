@@ -1,7 +1,6 @@
 # File: src/query_testing.py
-from src.common import get_qdrant_config, get_processing_config
+from src.common import get_qdrant_config, get_processing_config, get_pipeline_embedding_model
 from src.storage.qdrant_storage import QdrantStorage
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
 
@@ -26,9 +25,8 @@ def test_retrieval(db, pipeline_id, query):
 
     processing_config = get_processing_config(db, pipeline_id)
 
-    # Load embedding model
-    model_name = processing_config.get("embedding_model", "sentence-transformers/all-MiniLM-L6-v2")
-    embedding_model = SentenceTransformer(model_name)
+    # Shared embedding model, loaded once per process
+    _, _, embedding_model = get_pipeline_embedding_model(processing_config, "sentence-transformers/all-MiniLM-L6-v2")
 
     # Generate embedding for the query
     query_embedding = embedding_model.encode(query).tolist()  # Convert to list
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from src.common import Base, engine
+from src.common.model_registry import model_registry, get_embedding_model
+from src.services.prompt_optimizer import get_generator, is_generator_loaded, PROMPT_MODEL
+
+_state = {
+    "database": {"ready": False, "error": None},
+    "warmup": {"status": "idle", "models": [], "errors": {}, "seconds": None},
+}
+_state_lock = threading.Lock()
+
+
+def init_database():
+    """
+    Creates the tables, recording the result for the readiness check instead of failing startup.
+
+    :return: True when the database is ready.
+    """
+    try:
+        Base.metadata.create_all(bind=engine)
+        error = None
+    except Exception as e:
+        print(f"Failed to initialize the database: {e}")
+        error = str(e)
+    with _state_lock:
+        _state["database"] = {"ready": error is None, "error": error}
+    return error is None
+
+
+def warm_up(embedding_models=(), prompt_optimizer=False):
+    """
+    Loads models ahead of the first request.
+
+    :param embedding_models: Names of the embedding models to load into the model registry.
+    :param prompt_optimizer: Whether to load the prompt optimizer text generation model.
+    :return: The warm-up state.
+    """
+    targets = list(embedding_models) + ([PROMPT_MODEL] if prompt_optimizer else [])
+    with _state_lock:
+        _state["warmup"] = {"status": "running", "models": targets, "errors": {}, "seconds": None}
+    start = time.perf_counter()
+    errors = {}
+    for model_name in embedding_models:
+        try:
+            get_embedding_model(model_name)
+        except Exception as e:
+            print(f"Failed to warm up embedding model {model_name}: {e}")
+            errors[model_name] = str(e)
+    if prompt_optimizer:
+        try:
+            get_generator()
+        except Exception as e:
+            print(f"Failed to warm up the prompt optimizer: {e}")
+            errors[PROMPT_MODEL] = str(e)
+    with _state_lock:
+        _state["warmup"] = {"status": "failed" if errors else "done", "models": targets, "errors": errors,
+                            "seconds": round(time.perf_counter() - start, 3)}
+        return dict(_state["warmup"])
+
+
+def start_warm_up(embedding_models=None, prompt_optimizer=None):
+    """
+    Warms up models in a background thread, so the API starts serving right away.
+
+    Defaults come from the WARMUP_EMBEDDING_MODELS (comma-separated model names) and
+    WARMUP_PROMPT_OPTIMIZER ("1"/"true") environment variables; nothing is loaded when unset.
+
+    :return: The warm-up thread, or None when there is nothing to warm up.
+    """
+    if embedding_models is None:
+        embedding_models = [name.strip() for name in os.getenv("WARMUP_EMBEDDING_MODELS", "").split(",")
+                            if name.strip()]
+    if prompt_optimizer is None:
+        prompt_optimizer = os.getenv("WARMUP_PROMPT_OPTIMIZER", "").lower() in ("1", "true", "yes")
+    if not embedding_models and not prompt_optimizer:
+        return None
+    thread = threading.Thread(target=warm_up, args=(embedding_models, prompt_optimizer), name="model-warmup",
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness():
+    """
+    :return: Dictionary with the overall readiness (database initialized and no warm-up
+             running), the database state, the warm-up state and the models loaded in this process.
+    """
+    with _state_lock:
+        database = dict(_state["database"])
+        warmup = dict(_state["warmup"])
+    warm_models = [entry["model"] for entry in model_registry.stats()["resident_models"]]
+    if is_generator_loaded():
+        warm_models.append(PROMPT_MODEL)
+    return {
+        "ready": database["ready"] and warmup["status"] != "running",
+        "database": database,
+        "warmup": warmup,
+        "warm_models": warm_models
+    }
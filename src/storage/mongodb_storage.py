@@ -1,6 +1,11 @@
-from pymongo import MongoClient
+import re
+import threading
+from pymongo import ASCENDING, MongoClient, UpdateOne
 from pymongo.errors import PyMongoError
 
+_indexed_collections = set()
+_indexed_collections_lock = threading.Lock()
+
 class MongoDBStorage:
     def __init__(self, uri, db_name, collection_name):
         """
@@ -16,6 +21,7 @@ class MongoDBStorage:
             self.db = self.client[db_name]
             self.collection = self.db[collection_name]
             self._ensure_database_exists()
+            self._ensure_indexes(uri)
             print(f"Connected to MongoDB: {db_name}.{collection_name}")
         except PyMongoError as e:
             raise Exception(f"Failed to connect to MongoDB: {e}")
@@ -30,6 +36,21 @@ class MongoDBStorage:
             self.collection.insert_one({"temp": "delete_me"})
             self.collection.delete_many({"temp": "delete_me"})  # Clean up
 
+    def _ensure_indexes(self, uri):
+        """
+        Creates the indexes of the lookups by filepath, root and state key, once per
+        collection and process.
+        """
+        key = (uri, self.db_name, self.collection_name)
+        with _indexed_collections_lock:
+            if key in _indexed_collections:
+                return
+            self.manifest_collection.create_index([("filepath", ASCENDING)], unique=True)
+            self.manifest_collection.create_index([("root", ASCENDING)])
+            self.state_collection.create_index([("key", ASCENDING)], unique=True)
+            self.collection.create_index([("metadata.filepath", ASCENDING)])
+            _indexed_collections.add(key)
+
     def store_data(self, data):
         """
         Inserts a single document into the collection.
@@ -147,4 +168,132 @@ class MongoDBStorage:
                     break
                 yield batch
         except Exception as e:
-            raise Exception(f"Failed to fetch data in batches: {e}")
\ No newline at end of file
+            raise Exception(f"Failed to fetch data in batches: {e}")
+
+    @property
+    def manifest_collection(self):
+        """Collection holding the ingestion manifest of this collection."""
+        return self.db[f"{self.collection_name}_manifest"]
+
+    def fetch_manifest(self, root):
+        """
+        Loads all manifest entries of an ingestion root in a single query.
+
+        :param root: Folder (or other source root) the entries belong to.
+        :return: Dictionary mapping filepath to its manifest entry.
+        """
+        try:
+            cursor = self.manifest_collection.find({"root": root}, {"_id": 0})
+            return {entry["filepath"]: entry for entry in cursor}
+        except PyMongoError as e:
+            raise Exception(f"Failed to fetch ingestion manifest: {e}")
+
+    def upsert_manifest_entries(self, entries):
+        """
+        Inserts or updates manifest entries in one bulk write.
+
+        :param entries: List of manifest entry dictionaries keyed by `filepath`.
+        """
+        if not entries:
+            return
+        try:
+            self.manifest_collection.bulk_write(
+                [UpdateOne({"filepath": entry["filepath"]}, {"$set": entry}, upsert=True) for entry in entries],
+                ordered=False
+            )
+        except PyMongoError as e:
+            raise Exception(f"Failed to update ingestion manifest: {e}")
+
+    def delete_manifest_entries(self, filepaths):
+        """
+        Removes manifest entries.
+
+        :param filepaths: Filepaths whose entries are removed.
+        """
+        if not filepaths:
+            return
+        try:
+            self.manifest_collection.delete_many({"filepath": {"$in": list(filepaths)}})
+        except PyMongoError as e:
+            raise Exception(f"Failed to delete ingestion manifest entries: {e}")
+
+    def fetch_filepaths(self, prefix, query=None):
+        """
+        Returns the distinct filepaths stored under a folder.
+
+        :param prefix: Folder to match, its sibling folders sharing the prefix are not matched.
+        :param query: Optional additional conditions on the documents.
+        :return: Set of filepaths.
+        """
+        return set(self.iter_filepaths(prefix, query))
+
+    def iter_filepaths(self, prefix, query=None, batch_size=10000):
+        """
+        Streams the distinct filepaths stored under a folder.
+
+        The paths are grouped by an aggregation read through a cursor, so the result is
+        not bound by the 16MB limit of a `distinct` reply.
+
+        :param prefix: Folder to match, its sibling folders sharing the prefix are not matched.
+        :param query: Optional additional conditions on the documents.
+        :param batch_size: Number of paths per cursor batch.
+        :return: A generator of filepaths.
+        """
+        folder = prefix if prefix.endswith("/") else f"{prefix}/"
+        pipeline = [
+            {"$match": {**(query or {}), "metadata.filepath": {"$regex": f"^{re.escape(folder)}"}}},
+            {"$group": {"_id": "$metadata.filepath"}}
+        ]
+        try:
+            for entry in self.collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size):
+                yield entry["_id"]
+        except PyMongoError as e:
+            raise Exception(f"Failed to fetch filepaths: {e}")
+
+    @property
+    def state_collection(self):
+        """Collection holding per-source ingestion state (watermarks, offsets, ...)."""
+        return self.db[f"{self.collection_name}_state"]
+
+    def get_ingestion_state(self, key):
+        """
+        Reads the persisted ingestion state of a source.
+
+        :param key: Unique key of the source.
+        :return: The stored state dictionary, or None.
+        """
+        try:
+            entry = self.state_collection.find_one({"key": key}, {"_id": 0})
+            return entry["state"] if entry else None
+        except PyMongoError as e:
+            raise Exception(f"Failed to read ingestion state: {e}")
+
+    def set_ingestion_state(self, key, state):
+        """
+        Persists the ingestion state of a source.
+
+        :param key: Unique key of the source.
+        :param state: JSON-serializable state dictionary.
+        """
+        try:
+            self.state_collection.update_one({"key": key}, {"$set": {"state": state}}, upsert=True)
+        except PyMongoError as e:
+            raise Exception(f"Failed to store ingestion state: {e}")
+
+    def fetch_metadata_map(self, query, fields):
+        """
+        Loads selected metadata fields of all matching documents in a single query.
+
+        :param query: A dictionary representing the MongoDB query.
+        :param fields: Metadata field names to return.
+        :return: Dictionary mapping metadata.filepath to a dictionary of the fields.
+        """
+        try:
+            projection = {"_id": 0, "metadata.filepath": 1, **{f"metadata.{field}": 1 for field in fields}}
+            return {
+                doc["metadata"]["filepath"]: {field: doc["metadata"].get(field) for field in fields}
+                for doc in self.collection.find(query, projection)
+                if "filepath" in doc.get("metadata", {})
+            }
+        except PyMongoError as e:
+            raise Exception(f"Failed to fetch metadata: {e}")
@@ -1,5 +1,6 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, PointStruct, Filter
+from qdrant_client.models import (VectorParams, PointStruct, Filter, FieldCondition, FilterSelector, MatchAny,
+                                  PayloadSchemaType)
 import numpy as np
 
 
@@ -17,6 +18,7 @@ class QdrantStorage:
         """
         self.client = QdrantClient(url=config["url"], api_key=config.get("api_key", None))
         self.collection_name = config["collection"]
+        self.collection_ready = False
 
     def ensure_collection_exists(self, vector_size):
         """
@@ -32,6 +34,8 @@ class QdrantStorage:
                     distance="Cosine"  # Distance metric for similarity search
                 )
             )
+            # Points are deleted by filepath when their document is modified
+            self.client.create_payload_index(self.collection_name, "filepath", PayloadSchemaType.KEYWORD)
             print(f"Collection '{self.collection_name}' created.")
         else:
             print(f"Collection '{self.collection_name}' already exists.")
@@ -81,6 +85,83 @@ class QdrantStorage:
         except Exception as e:
             raise Exception(f"Failed to load data into Qdrant: {e}")
 
+    def upsert_batch(self, batch, batch_size=500):
+        """
+        Uploads an EmbeddingBatch without converting its vectors to Python lists.
+
+        Point ids are derived from the document and chunk index (uuid5), so loading the
+        same stored document again overwrites its points and no existence check is
+        needed before the upload. A modified document is stored under a new id: the
+        points of its previous version are removed with `delete_filepaths` first.
+
+        :param batch: EmbeddingBatch to upload.
+        :param batch_size: Number of points sent per request.
+        :return: Number of points uploaded.
+        """
+        try:
+            if not len(batch):
+                print("No data to insert.")
+                return 0
+
+            if not self.collection_ready:
+                self.ensure_collection_exists(vector_size=batch.dimension)
+                self.collection_ready = True
+
+            self.client.upload_collection(
+                collection_name=self.collection_name,
+                vectors=batch.vectors,
+                payload=batch.payloads(),
+                ids=batch.point_ids(),
+                batch_size=batch_size
+            )
+            print(f"Inserted {len(batch)} points.")
+            return len(batch)
+
+        except Exception as e:
+            raise Exception(f"Failed to load data into Qdrant: {e}")
+
+    def delete_filepaths(self, filepaths):
+        """
+        Deletes every point whose `filepath` payload is one of the filepaths.
+
+        :param filepaths: Filepaths of the documents whose points are removed.
+        """
+        try:
+            if not filepaths or not self.client.collection_exists(self.collection_name):
+                return
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(
+                    filter=Filter(must=[FieldCondition(key="filepath", match=MatchAny(any=list(filepaths)))])
+                ),
+                wait=True
+            )
+            print(f"Deleted the points of {len(filepaths)} modified documents.")
+
+        except Exception as e:
+            raise Exception(f"Failed to delete points from Qdrant: {e}")
+
+    def fetch_vectors(self, point_ids):
+        """
+        Reads the vectors of points by id.
+
+        :param point_ids: List of point ids.
+        :return: Dictionary mapping the ids found to their float32 vectors.
+        """
+        try:
+            if not point_ids:
+                return {}
+            points = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=point_ids,
+                with_payload=False,
+                with_vectors=True
+            )
+            return {str(point.id): np.asarray(point.vector, dtype=np.float32) for point in points}
+
+        except Exception as e:
+            raise Exception(f"Failed to fetch vectors from Qdrant: {e}")
+
     def query_points(self, query_embedding, top_k=10):
         """
         Searches for the top-K most relevant documents using `query_points` API.
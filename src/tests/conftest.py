@@ -0,0 +1,20 @@
+import os
+import pytest
+
+# src.common logs to logs/app.log relative to the working directory
+os.makedirs("logs", exist_ok=True)
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """MongoDBStorage backed by an in-memory mongomock client."""
+    mongomock = pytest.importorskip("mongomock")
+    import src.storage.mongodb_storage as mongodb_storage
+    monkeypatch.setattr(mongodb_storage, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(mongodb_storage, "_indexed_collections", set())
+
+    # pymongo >= 4.11 passes `sort` to bulk updates, which mongomock does not know yet
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, "add_update",
+                        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs))
+    return mongodb_storage.MongoDBStorage("mongodb://localhost", "ingestion", "documents")
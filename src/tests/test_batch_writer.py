@@ -0,0 +1,56 @@
+import pytest
+from src.workflows.batch_writer import IngestionBatchWriter
+
+SOURCE = {"name": "docs", "type": "file"}
+
+
+def document(filepath, content="text", **metadata):
+    return {"content": content, "metadata": {"filepath": filepath, "filename": filepath.rsplit("/", 1)[-1],
+                                             **metadata}}
+
+
+def test_batches_are_flushed_at_the_document_count(storage):
+    flushed = []
+    writer = IngestionBatchWriter(storage, SOURCE, batch_size=3, on_flush=lambda batch: flushed.append(len(batch)))
+    for index in range(7):
+        writer.add(document(f"/data/{index}.txt"))
+    assert flushed == [3, 3]
+    writer.close()
+    assert flushed == [3, 3, 1]
+    assert (writer.flushes, writer.stored_documents) == (3, 7)
+    assert storage.collection.count_documents({}) == 7
+
+
+def test_batches_are_flushed_at_the_byte_limit(storage):
+    writer = IngestionBatchWriter(storage, SOURCE, batch_size=100, max_batch_bytes=10)
+    writer.add(document("/data/a.txt", "x" * 6))
+    assert writer.flushes == 0
+    writer.add(document("/data/b.txt", "x" * 6))
+    assert (writer.flushes, writer.stored_bytes, writer.buffered_bytes) == (1, 12, 0)
+
+
+def test_checkpoint_is_persisted_once_its_batch_is_stored(storage):
+    writer = IngestionBatchWriter(storage, SOURCE, batch_size=2, state_key="database:docs")
+    writer.add(document("/data/a.txt", checkpoint={"watermark": 1}))
+    assert storage.get_ingestion_state("database:docs") is None
+    writer.add(document("/data/b.txt", checkpoint={"watermark": 2}))
+    assert storage.get_ingestion_state("database:docs") == {"watermark": 2}
+    # The checkpoint is not stored with the documents
+    assert storage.collection.count_documents({"metadata.checkpoint": {"$exists": True}}) == 0
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_modified_documents_replace_the_stored_file(storage, columnar):
+    writer = IngestionBatchWriter(storage, SOURCE, columnar=columnar)
+    for part in ("first", "second", "third"):
+        writer.add(document("/data/a.txt", part))
+    writer.add(document("/data/b.txt", "other"))
+    writer.close()
+
+    # Only the first document of a modified file carries the flag
+    writer.add(document("/data/a.txt", "new first", change="modified"))
+    writer.add(document("/data/a.txt", "new second"))
+    writer.close()
+    stored = sorted(doc["content"] for doc in storage.collection.find({"metadata.filepath": "/data/a.txt"}))
+    assert stored == ["new first", "new second"]
+    assert storage.collection.count_documents({"metadata.filepath": "/data/b.txt"}) == 1
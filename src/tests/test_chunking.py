@@ -0,0 +1,97 @@
+import random
+import numpy as np
+from src.chunking import (fixed_length_chunking, sliding_window_chunking, iter_fixed_length_spans,
+                          iter_sliding_window_spans, materialize, group_sentences)
+from src.chunking.embedding_chunking import find_boundaries
+from src.processing.text_cleaning import clean_chunks
+from src.processing.embedding_generation import chunk_document_spans
+
+
+def reference_fixed_length_chunking(content, chunk_size):
+    words = content.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+
+def reference_sliding_window_chunking(content, chunk_size, overlap):
+    words = content.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size - overlap)]
+
+
+def random_texts(count=200, seed=7):
+    generator = random.Random(seed)
+    separators = [" ", "  ", "\n", "\t", " \n "]
+    for _ in range(count):
+        words = [generator.choice(["alpha", "b", "gamma-ray", "d.", "épsilon", "42"])
+                 for _ in range(generator.randint(0, 60))]
+        text = "".join(word + generator.choice(separators) for word in words)
+        yield generator.choice(["", " ", "\n"]) + text
+
+
+def test_span_chunkers_match_the_word_list_chunkers():
+    for text in random_texts():
+        for chunk_size in (1, 3, 7, 100):
+            assert fixed_length_chunking(text, chunk_size) == reference_fixed_length_chunking(text, chunk_size)
+            spans = list(iter_fixed_length_spans(text, chunk_size))
+            assert [" ".join(chunk.split()) for chunk in materialize(text, spans)] == \
+                reference_fixed_length_chunking(text, chunk_size)
+            for overlap in (0, chunk_size // 2, chunk_size - 1, -2):
+                expected = reference_sliding_window_chunking(text, chunk_size, overlap)
+                assert sliding_window_chunking(text, chunk_size, overlap) == expected
+                spans = list(iter_sliding_window_spans(text, chunk_size, overlap))
+                assert [" ".join(chunk.split()) for chunk in materialize(text, spans)] == expected
+
+
+def test_cleaned_chunks_keep_offsets_into_the_stored_content():
+    content = "Hello,   world! 🙂 ; ;Second   part: café."
+    doc = {"content": content, "metadata": {"filepath": "/data/a.txt"}}
+    chunks, spans = chunk_document_spans(doc, {"chunking_method": "punctuation_based"})
+
+    (cleaned_doc, cleaned, cleaned_spans), = clean_chunks([(doc, chunks, spans)])
+    assert cleaned_doc["content"] == content
+    # The piece left empty by cleaning is dropped with its span
+    assert cleaned == ["Hello world", "Second part caf"]
+    assert [content[start:end] for start, end in cleaned_spans] == ["Hello,   world! 🙂 ", "Second   part: café."]
+
+
+def topic_vectors(topics, dimension=4):
+    """Fake sentence encoder: each sentence points along the axis of its topic."""
+    vectors = np.zeros((len(topics), dimension), dtype=np.float32)
+    vectors[np.arange(len(topics)), topics] = 1.0
+    vectors += 0.05  # Sentences of different topics stay slightly similar
+    return vectors
+
+
+def test_boundaries_are_where_the_similarity_drops():
+    vectors = topic_vectors([0, 0, 0, 1, 1, 2, 2, 2])
+    assert find_boundaries(vectors, threshold=0.5).tolist() == [3, 5]
+    # Without a threshold the lowest adjacent similarities are cut
+    assert find_boundaries(vectors, percentile=30).tolist() == [3, 5]
+    assert find_boundaries(vectors[:1]).tolist() == []
+
+
+def test_sentences_are_grouped_in_order_within_the_chunk_size():
+    topics = [0, 0, 0, 1, 1, 2, 2, 2]
+    sentences = [f"sentence {index} about topic {topic}" for index, topic in enumerate(topics)]
+    vectors = topic_vectors(topics)
+
+    chunks, chunk_vectors = group_sentences(sentences, vectors, chunk_size=100, threshold=0.5)
+    assert chunks == [" ".join(sentences[0:3]), " ".join(sentences[3:5]), " ".join(sentences[5:8])]
+
+    # Each sentence has 5 words, a chunk of 10 words holds two at most
+    small_chunks, _ = group_sentences(sentences, vectors, chunk_size=10, threshold=0.5)
+    assert " ".join(small_chunks) == " ".join(sentences)
+    assert all(len(chunk.split()) <= 10 for chunk in small_chunks)
+    assert len(small_chunks) == 5
+
+    # Chunk vectors are the length-weighted mean of their sentence vectors, normalized
+    weights = np.array([len(sentence) for sentence in sentences[3:5]], dtype=np.float32)
+    pooled = weights @ vectors[3:5]
+    np.testing.assert_allclose(chunk_vectors[1], pooled / np.linalg.norm(pooled), rtol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(chunk_vectors, axis=1), 1.0, rtol=1e-6)
+
+
+def test_long_sentence_is_a_chunk_on_its_own():
+    sentences = ["short one", " ".join(["word"] * 30), "short two"]
+    chunks, vectors = group_sentences(sentences, topic_vectors([0, 0, 0]), chunk_size=10, threshold=0.0)
+    assert chunks == sentences
+    assert vectors.shape == (3, 4)
@@ -0,0 +1,89 @@
+import httpx
+import pytest
+import src.ingestion.confluence_ingestion as confluence_ingestion
+from src.ingestion.confluence_ingestion import iter_confluence
+
+API_URL = "https://wiki.example.com/rest/api/content"
+PAGES = {str(number): {"id": str(number), "title": f"Page {number}", "version": {"number": number}}
+         for number in range(1, 6)}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    delays = []
+
+    async def backoff(attempt, retry_after=None):
+        delays.append(attempt)
+
+    monkeypatch.setattr(confluence_ingestion, "_backoff", backoff)
+    return delays
+
+
+def confluence(failures):
+    """
+    MockTransport of a content API listing PAGES two at a time. `failures` maps a path
+    to the errors (status codes, or exceptions to raise) returned before it succeeds.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        errors = failures.get(request.url.path)
+        if errors:
+            error = errors.pop(0)
+            if isinstance(error, Exception):
+                raise error
+            return httpx.Response(error, headers={"Retry-After": "0"})
+
+        page_id = request.url.path.rsplit("/", 1)[-1]
+        if page_id in PAGES:
+            return httpx.Response(200, json={**PAGES[page_id], "body": {"storage": {"value": f"<p>{page_id}</p>"}}})
+
+        start = int(request.url.params.get("start", 0))
+        ids = sorted(PAGES)[start:start + 2]
+        links = {"base": "https://wiki.example.com"}
+        if start + 2 < len(PAGES):
+            links["next"] = f"/rest/api/content?limit=2&start={start + 2}&expand=version"
+        return httpx.Response(200, json={"results": [PAGES[page_id] for page_id in ids], "_links": links})
+
+    return httpx.MockTransport(handler), requests
+
+
+def fetch(transport, stored_versions=None):
+    documents = iter_confluence(API_URL, None, stored_versions, page_size=2, max_retries=2, transport=transport)
+    return sorted(documents, key=lambda doc: doc["metadata"]["id"])
+
+
+def test_listing_is_followed_across_pages():
+    transport, requests = confluence({})
+    documents = fetch(transport)
+    assert [doc["metadata"]["id"] for doc in documents] == ["1", "2", "3", "4", "5"]
+    assert documents[0]["content"] == "<p>1</p>"
+    assert all(doc["metadata"]["change"] == "new" for doc in documents)
+    assert [request.url.params.get("start") for request in requests if request.url.path.endswith("content")] == \
+           ["0", "2", "4"]
+
+
+def test_unchanged_versions_are_skipped():
+    transport, requests = confluence({})
+    stored = {f"{API_URL}/1": 1, f"{API_URL}/2": 1, f"{API_URL}/3": 3}
+    documents = fetch(transport, stored)
+    assert [(doc["metadata"]["id"], doc["metadata"]["change"]) for doc in documents] == \
+           [("2", "modified"), ("4", "new"), ("5", "new")]
+    assert not any(request.url.path.endswith(("/1", "/3")) for request in requests)
+
+
+def test_errors_and_timeouts_are_retried(no_backoff):
+    transport, requests = confluence({
+        "/rest/api/content": [503],
+        "/rest/api/content/2": [httpx.ConnectError("connection refused"), 429],
+        "/rest/api/content/4": [httpx.ReadTimeout("read timed out")],
+    })
+    documents = fetch(transport)
+    assert [doc["metadata"]["id"] for doc in documents] == ["1", "2", "3", "4", "5"]
+    assert sorted(no_backoff) == [0, 0, 0, 1]
+
+
+def test_page_failing_after_the_retries_is_left_out():
+    transport, _ = confluence({"/rest/api/content/3": [httpx.ConnectError("connection refused")] * 3})
+    assert [doc["metadata"]["id"] for doc in fetch(transport)] == ["1", "2", "4", "5"]
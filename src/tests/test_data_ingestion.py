@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import src.routers.workflow as workflow
+import src.workflows.data_ingestion as data_ingestion
+from src.common.db import get_db
+
+
+@pytest.fixture
+def pipeline(monkeypatch, storage, tmp_path):
+    (tmp_path / "a.txt").write_text("first file")
+    sources = [
+        {"name": "docs", "type": "file", "config": {"folder_path": str(tmp_path)}},
+        # No connection settings, the source fails
+        {"name": "orders", "type": "database"},
+    ]
+    monkeypatch.setattr(data_ingestion, "get_mongodb_config",
+                        lambda db, pipeline_id: {"uri": "mongodb://localhost", "db_name": "ingestion",
+                                                 "collection_name": "documents"})
+    monkeypatch.setattr(data_ingestion, "get_ingestion_config", lambda db, pipeline_id: {"source_concurrency": 2})
+    monkeypatch.setattr(data_ingestion, "get_pipeline_data_sources", lambda db, pipeline_id: sources)
+    monkeypatch.setattr(data_ingestion, "MongoDBStorage", lambda **config: storage)
+    return sources
+
+
+def test_failing_source_does_not_stop_the_others(pipeline, storage):
+    result = data_ingestion.run_data_ingestion(None, 1)
+    assert result["status"] == "partial"
+    reports = {report["name"]: report for report in result["sources"]}
+    assert reports["docs"]["status"] == "success" and reports["docs"]["documents"] == 1
+    assert reports["orders"]["status"] == "failed" and reports["orders"]["error"]
+    assert storage.collection.count_documents({}) == 1
+
+
+def test_run_status_follows_the_source_reports():
+    assert data_ingestion.ingestion_status([{"status": "success"}, {"status": "skipped"}]) == "success"
+    assert data_ingestion.ingestion_status([{"status": "failed"}, {"status": "success"}]) == "partial"
+    assert data_ingestion.ingestion_status([{"status": "failed"}, {"status": "skipped"}]) == "failed"
+
+
+def test_ingestion_route_reports_failures_with_the_status_code(pipeline):
+    app = FastAPI()
+    app.include_router(workflow.router)
+    app.dependency_overrides[get_db] = lambda: None
+    client = TestClient(app)
+
+    response = client.post("/start-ingestion/1")
+    assert response.status_code == 207
+    assert response.json()["status"] == "partial"
+
+    pipeline.pop(0)
+    response = client.post("/start-ingestion/1")
+    assert response.status_code == 500
+    assert response.json()["detail"]["sources"][0]["name"] == "orders"
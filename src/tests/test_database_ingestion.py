@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from src.ingestion.database_ingestion import _iter_keyset, _row_to_document, iter_database, ingest_database
+import src.ingestion.database_ingestion as database_ingestion
+
+
+class FakeCursor:
+    def __init__(self, rows, columns, executed):
+        self.rows = rows
+        self.description = [(column,) for column in columns]
+        self.executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params):
+        self.executed.append(list(params))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self.rows, self.columns, self.executed)
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn):
+        pass
+
+
+def test_checkpoint_keeps_time_zone_and_key():
+    updated = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone(timedelta(hours=2)))
+    document = _row_to_document(
+        {"id": 7, "content": "row", "updated_at": updated},
+        {"database": "shop"},
+        {"name": "orders", "key_column": "id", "watermark_column": "updated_at"}
+    )
+    assert document["metadata"]["checkpoint"] == {"watermark": "2024-05-01T12:30:15.123456+02:00", "key": 7}
+
+
+def test_resume_starts_after_watermark_and_key(monkeypatch):
+    conn = FakeConnection([], ["id", "content", "updated_at"])
+    monkeypatch.setattr(database_ingestion, "get_connection_pool", lambda config: FakePool(conn))
+    conn.rollback = lambda: None
+    source = {"query": "SELECT * FROM orders", "key_column": "id", "watermark_column": "updated_at", "batch_size": 2}
+
+    list(iter_database({"database": "shop"}, source, "2024-05-01T12:30:15.123456+02:00", 7))
+    assert conn.executed == [["2024-05-01T12:30:15.123456+02:00", 7, 2]]
+
+
+def test_keyset_pages_follow_watermark_and_key():
+    rows = [(1, "a", "2024-01-01"), (2, "b", "2024-01-01")]
+    conn = FakeConnection(rows, ["id", "content", "updated_at"])
+    read = list(_iter_keyset(conn, "SELECT 1", ["updated_at", "id"], None, 2))
+    assert [row for _, row in read] == rows
+    # The second page starts after the last (watermark, key) read
+    assert conn.executed == [[2], ["2024-01-01", 2, 2]]
+
+
+def test_missing_query_is_an_error(monkeypatch):
+    monkeypatch.setattr(database_ingestion, "get_connection_pool",
+                        lambda config: pytest.fail("No connection is opened without a query"))
+    with pytest.raises(ValueError, match="orders has no query"):
+        list(iter_database({"database": "shop"}, {"name": "orders"}))
+    with pytest.raises(ValueError, match="shop has no query"):
+        ingest_database({"database": "shop"})
@@ -0,0 +1,45 @@
+import boto3
+import pytest
+from moto import mock_aws
+from src.ingestion.datalake_ingestion import iter_datalake
+from src.workflows.data_ingestion import open_source
+
+BUCKET = "lake"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key="docs/a.txt", Body=b"first object")
+        client.put_object(Bucket=BUCKET, Key="docs/b.txt", Body=b"second object")
+        yield client
+
+
+def test_last_document_of_an_object_carries_its_count(s3):
+    documents = list(iter_datalake(BUCKET, "docs/", s3_client=s3, workers=2))
+    assert sorted(doc["metadata"]["filepath"] for doc in documents) == ["s3://lake/docs/a.txt",
+                                                                          "s3://lake/docs/b.txt"]
+    assert all(doc["metadata"]["document_count"] == 1 for doc in documents)
+    assert all(doc["metadata"]["change"] == "new" for doc in documents)
+
+
+def test_partially_stored_object_is_ingested_again(s3, storage):
+    source = {"name": "lake", "type": "datalake", "bucket_name": BUCKET, "prefix": "docs/", "workers": 2}
+    stored = {doc["metadata"]["filepath"]: doc for doc in iter_datalake(BUCKET, "docs/", s3_client=s3)}
+    complete = stored["s3://lake/docs/a.txt"]
+    partial = stored["s3://lake/docs/b.txt"]
+    # b.txt has a document stored by a run that stopped before its last document
+    del partial["metadata"]["document_count"]
+    for doc in (complete, partial):
+        doc["metadata"]["datasource"] = "lake"
+        storage.store_data(doc)
+
+    documents, _ = open_source(source, storage, {})
+    documents = list(documents)
+    assert [doc["metadata"]["filepath"] for doc in documents] == ["s3://lake/docs/b.txt"]
+    assert documents[0]["metadata"]["change"] == "modified"
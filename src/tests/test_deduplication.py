@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from src.processing.deduplication import NearDuplicateIndex
+from src.processing.embedding_generation import ChunkEncoder
+from src.workflows.data_processing import store_embeddings
+
+TEXT = "the quick brown fox jumps over the lazy dog near the river bank today"
+
+
+class FakeModel:
+    def encode(self, texts, **options):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+
+class FailingStorage:
+    def upsert_batch(self, embeddings):
+        raise RuntimeError("Qdrant is down")
+
+
+class FakeStorage:
+    def __init__(self):
+        self.points = []
+
+    def upsert_batch(self, embeddings):
+        self.points.extend(embeddings.point_ids())
+
+
+def test_find_duplicates_does_not_write_the_index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), "docs")
+    # Duplicates within the batch are still found
+    assert index.find_duplicates(["a", "b"], [TEXT, TEXT]) == [None, "a"]
+    assert index.stats()["entries"] == 0
+    assert index.find_duplicates(["c"], [TEXT]) == [None]
+
+    index.add(["a"], [index.signature(TEXT)])
+    assert index.find_duplicates(["c"], [TEXT]) == ["a"]
+
+
+def test_canonical_chunks_are_indexed_once_stored(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), "docs")
+    encoder = ChunkEncoder(FakeModel(), {"chunking_method": "fixed_length", "chunk_size": 100},
+                           deduplicator=index)
+    documents = [{"content": TEXT, "metadata": {"filepath": "/data/a.txt"}}]
+
+    batch = encoder.embed(encoder.chunk(documents))
+    with pytest.raises(RuntimeError):
+        store_embeddings(FailingStorage(), batch, encoder)
+    # The chunk was never stored, so it is not a canonical chunk for the next run
+    assert index.stats()["entries"] == 0
+
+    storage = FakeStorage()
+    batch = encoder.embed(encoder.chunk(documents))
+    assert store_embeddings(storage, batch, encoder) == 1
+    assert index.stats()["entries"] == 1
+    copy = [{"content": TEXT, "metadata": {"filepath": "/data/b.txt"}}]
+    assert len(encoder.embed(encoder.chunk(copy))) == 0
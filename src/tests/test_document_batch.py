@@ -0,0 +1,32 @@
+from src.processing import DocumentBatch, enrich_metadata, standardize_data, benchmark_document_batches
+
+SOURCE = {"name": "docs", "type": "file"}
+
+
+def without_created_date(documents):
+    # The two passes take the creation date per document, the batch once
+    return [{**doc, "metadata": {**doc["metadata"], "created_date": None}} for doc in documents]
+
+
+def test_batch_output_matches_the_two_passes():
+    documents = [
+        {"content": "  padded content \n", "metadata": {"filepath": "/data/a.txt", "filename": "a.txt",
+                                                       "change": "modified", "page_count": 2}},
+        {"content": "", "metadata": {}},
+        {"content": "already processed", "metadata": {"filepath": "/data/b.txt", "processed": True,
+                                                      "datasource": "stale", "created_date": "2020-01-01"}},
+        {"content": "no metadata"},
+    ]
+    expected = [standardize_data(item) for item in enrich_metadata(documents, SOURCE)]
+    batch = DocumentBatch.from_documents(documents).enrich_and_standardize(SOURCE)
+
+    assert without_created_date(batch.to_documents()) == without_created_date(expected)
+    assert batch.modified_filepaths() == ["/data/a.txt"]
+    # The source metadata is referenced, not modified
+    assert documents[2]["metadata"]["datasource"] == "stale"
+
+
+def test_benchmark_reports_identical_output():
+    result = benchmark_document_batches(count=400, batch_size=100, repeat=1)
+    assert result["documents"] == 400
+    assert result["identical_output"]
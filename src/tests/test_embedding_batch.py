@@ -0,0 +1,33 @@
+import numpy as np
+from src.processing.embedding_batch import EmbeddingBatch
+
+
+def test_document_level_fields_are_kept_out_of_payloads():
+    metadata = {"filepath": "/data/report.pdf", "page_count": 3, "page_offsets": [0, 1200, 2500]}
+    batch = EmbeddingBatch(np.ones((2, 4), dtype=np.float32), ["first", "second"], [metadata], [0, 0], [0, 1],
+                           spans=[(0, 5), (6, 12)])
+    payloads = list(batch.payloads())
+    assert payloads[1] == {"filepath": "/data/report.pdf", "page_count": 3, "text": "second", "chunk_index": 1,
+                           "start_offset": 6, "end_offset": 12, "page_number": 1}
+    # The stored document metadata is left untouched
+    assert metadata["page_offsets"] == [0, 1200, 2500]
+
+
+def test_chunks_get_the_page_number_of_their_start():
+    metadata = {"filepath": "/data/report.pdf", "page_count": 3, "page_offsets": [0, 10, 25]}
+    batch = EmbeddingBatch(np.ones((4, 4), dtype=np.float32), ["a", "b", "c", "d"], [metadata, {}], [0, 0, 0, 1],
+                           [0, 1, 2, 0], spans=[(0, 12), (10, 30), (26, 40), (3, 8)])
+    assert [payload.get("page_number") for payload in batch.payloads()] == [1, 2, 3, None]
+
+
+def test_crawled_links_are_kept_out_of_payloads():
+    metadata = {"filepath": "https://example.com/", "links": [f"https://example.com/{i}" for i in range(500)]}
+    batch = EmbeddingBatch(np.ones((1, 4), dtype=np.float32), ["home"], [metadata], [0], [0])
+    assert "links" not in next(batch.payloads())
+    assert "links" not in batch.to_documents()[0]["metadata"]
+
+
+def test_selected_batch_keeps_signatures():
+    batch = EmbeddingBatch(np.ones((2, 4), dtype=np.float32), ["a", "b"], [{}], [0, 0], [0, 1],
+                           signatures=["sig-a", None])
+    assert batch.select(np.array([False, True])).signatures == [None]
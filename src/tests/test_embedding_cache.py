@@ -0,0 +1,60 @@
+import itertools
+import numpy as np
+import pytest
+import src.processing.embedding_cache as embedding_cache
+from src.processing.embedding_cache import EmbeddingCache, text_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Every call is one second later, so the least recently used entry is well defined
+    ticks = itertools.count(1)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: float(next(ticks)))
+
+
+def vectors(count, offset=0):
+    return np.arange(offset, offset + count * 2, dtype=np.float32).reshape(count, 2)
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    keys = [text_key(text) for text in ("alpha", "beta", "gamma")]
+    assert cache.get_many("model", "rev", keys) == {}
+    cache.put_many("model", "rev", keys[:2], vectors(2))
+
+    found = cache.get_many("model", "rev", keys)
+    assert set(found) == set(keys[:2])
+    np.testing.assert_array_equal(found[keys[1]], vectors(2)[1])
+    # Whitespace differences map to the same entry
+    assert text_key("  alpha\n") in cache.get_many("model", "rev", [text_key("  alpha\n")])
+    assert cache.stats() == {"hits": 3, "misses": 4, "hit_rate": 0.4286, "evictions": 0, "entries": 2}
+    cache.close()
+
+    # Entries are kept on disk
+    assert EmbeddingCache(str(tmp_path / "cache.sqlite")).stats()["entries"] == 2
+
+
+def test_entries_are_isolated_by_model_and_revision(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    key = text_key("alpha")
+    cache.put_many("model", "rev-1", [key], vectors(1))
+    cache.put_many("model", "rev-2", [key], vectors(1, offset=10))
+
+    np.testing.assert_array_equal(cache.get_many("model", "rev-1", [key])[key], vectors(1)[0])
+    np.testing.assert_array_equal(cache.get_many("model", "rev-2", [key])[key], vectors(1, offset=10)[0])
+    assert cache.get_many("other-model", "rev-1", [key]) == {}
+    assert cache.get_many("model", "rev-3", [key]) == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    keys = [text_key(f"chunk {index}") for index in range(11)]
+    for index in range(10):
+        cache.put_many("model", "rev", [keys[index]], vectors(1, offset=index))
+    cache.get_many("model", "rev", [keys[0]])  # chunk 0 becomes the most recently used
+
+    # Over the limit, the cache is trimmed to 90% of it
+    cache.put_many("model", "rev", [keys[10]], vectors(1))
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["entries"] == 9
+    assert set(cache.get_many("model", "rev", keys)) == set(keys) - {keys[1], keys[2]}
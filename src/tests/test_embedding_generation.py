@@ -0,0 +1,58 @@
+import random
+import numpy as np
+from src.chunking import fixed_length_chunking
+from src.processing.embedding_generation import ChunkEncoder
+
+
+class LengthModel:
+    """Deterministic encoder: the vector of a text is its length and a checksum of its characters."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **options):
+        self.batches.append(list(texts))
+        return np.array([[len(text), sum(map(ord, text)) % 9973, 1.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+def expected_vector(text):
+    return [len(text), sum(map(ord, text)) % 9973, 1.0]
+
+
+def test_rows_keep_their_text_document_and_chunk_index():
+    generator = random.Random(3)
+    words = ["a", "bb", "ccc", "dddd", "eeeee", "ffffff"]
+    documents = [
+        {"_id": f"doc-{index}", "content": " ".join(generator.choice(words) for _ in range(generator.randint(1, 40))),
+         "metadata": {"filepath": f"/data/{index}.txt"}}
+        for index in range(30)
+    ]
+    documents.append({"_id": "copy", "content": documents[0]["content"], "metadata": {"filepath": "/data/copy.txt"}})
+    model = LengthModel()
+    encoder = ChunkEncoder(model, {"chunking_method": "fixed_length", "chunk_size": 4}, batch_size=8,
+                           max_pending_chunks=50)
+
+    batches = [encoder.add(documents[start:start + 5]) for start in range(0, len(documents), 5)]
+    batches.append(encoder.flush())
+    assert sum(len(batch) for batch in batches) == sum(
+        len(fixed_length_chunking(doc["content"], 4)) for doc in documents)
+
+    rows = 0
+    for batch in batches:
+        for row, text in enumerate(batch.texts):
+            assert batch.vectors[row].tolist() == expected_vector(text)
+            document = batch.documents[batch.document_index[row]]
+            source = next(doc for doc in documents if doc["metadata"] is document)
+            assert fixed_length_chunking(source["content"], 4)[batch.chunk_index[row]] == text
+            assert batch.document_ids[batch.document_index[row]] == source["_id"]
+            rows += 1
+    assert rows == encoder.stats()["chunks"]
+    # Identical chunks (the copied document among others) are encoded once
+    assert sum(len(encoded) for encoded in model.batches) == encoder.stats()["encoded_chunks"] < rows
+
+    # Each forward pass holds chunks of similar length, longest first
+    for encoded in model.batches:
+        assert [len(text) for text in encoded] == sorted((len(text) for text in encoded), reverse=True)
@@ -0,0 +1,67 @@
+import gc
+import os
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from src.processing.embedding_pool import EmbeddingPool
+
+
+class StubModel:
+    """Deterministic model: the vector of a text encodes its length and first character."""
+
+    def encode(self, texts, **options):
+        if "fail" in texts:
+            raise ValueError("cannot encode 'fail'")
+        return np.array([[len(text), ord(text[0]) if text else 0, 1.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+def load_stub_model(model_name, **options):
+    # Imported by the spawned workers, which cannot see monkeypatches of the parent
+    return StubModel()
+
+
+def shm_segments():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = EmbeddingPool("stub", 2, max_batch_chunks=4, start_timeout=60, loader=load_stub_model)
+    yield pool
+    pool.close()
+
+
+def test_vectors_match_in_process_encoding(pool):
+    texts = [f"chunk {'x' * index}" for index in range(21)]
+    assert pool.dimension == 3 and pool.revision == "unknown"
+    np.testing.assert_array_equal(pool.encode(texts), StubModel().encode(texts))
+    # The slots are reused by the next call
+    np.testing.assert_array_equal(pool.encode(texts[:3]), StubModel().encode(texts[:3]))
+
+
+def test_worker_exception_is_raised_and_the_pool_recovers(pool):
+    with pytest.raises(Exception, match="cannot encode 'fail'"):
+        pool.encode(["a", "b", "c", "d", "fail", "e", "f", "g", "h", "i"])
+    np.testing.assert_array_equal(pool.encode(["ok"]), StubModel().encode(["ok"]))
+
+
+def test_close_releases_workers_and_shared_memory():
+    before = shm_segments()
+    pool = EmbeddingPool("stub", 2, max_batch_chunks=4, start_timeout=60, loader=load_stub_model)
+    names = [slot.name for slot in pool.slots]
+    assert len(names) == 4
+    pool.encode([f"text {index}" for index in range(10)])
+
+    pool.close()
+    pool.close()
+    assert not any(process.is_alive() for process in pool.processes)
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    # The queue semaphores go with the pool
+    del pool
+    gc.collect()
+    assert shm_segments() <= before
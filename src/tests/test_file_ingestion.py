@@ -0,0 +1,98 @@
+from src.ingestion.file_ingestion import iter_files
+from src.ingestion.manifest import IngestionManifest
+from src.processing import standardize_data
+from src.workflows.data_ingestion import run_source
+
+
+def ingest(folder, storage):
+    manifest = IngestionManifest(storage, str(folder)).load()
+    documents = list(iter_files(str(folder), manifest))
+    return documents, manifest
+
+
+def test_unrecorded_file_with_stored_documents_is_replaced(tmp_path, storage):
+    (tmp_path / "a.txt").write_text("first file")
+    (tmp_path / "b.txt").write_text("second file")
+    documents, manifest = ingest(tmp_path, storage)
+    assert sorted(doc["metadata"]["change"] for doc in documents) == ["new", "new"]
+
+    # The run stopped after storing both files, but before b.txt was recorded
+    storage.bulk_store_data(documents)
+    manifest.record([doc for doc in documents if doc["metadata"]["filename"] == "a.txt"])
+
+    documents, _ = ingest(tmp_path, storage)
+    assert [(doc["metadata"]["filename"], doc["metadata"]["change"]) for doc in documents] == [("b.txt", "modified")]
+
+
+def test_first_run_stopped_before_recording_is_not_adopted(tmp_path, storage):
+    (tmp_path / "a.txt").write_text("first file")
+    documents, _ = ingest(tmp_path, storage)
+    storage.bulk_store_data(documents)
+
+    # The manifest is empty, but the stored documents carry a fingerprint: they are not legacy
+    documents, _ = ingest(tmp_path, storage)
+    assert [doc["metadata"]["change"] for doc in documents] == ["modified"]
+
+
+def test_legacy_documents_are_adopted(tmp_path, storage):
+    (tmp_path / "a.txt").write_text("first file")
+    storage.store_data({"content": "first file", "metadata": {"filepath": str(tmp_path / "a.txt")}})
+
+    documents, manifest = ingest(tmp_path, storage)
+    assert documents == []
+    assert manifest.unchanged == 1
+
+
+def test_extraction_pool_workers_are_spawned(tmp_path, storage):
+    for index in range(3):
+        (tmp_path / f"{index}.txt").write_text(f"file {index}")
+    manifest = IngestionManifest(storage, str(tmp_path)).load()
+    documents = list(iter_files(str(tmp_path), manifest, {"extraction_workers": 2}))
+    assert sorted(doc["content"] for doc in documents) == ["file 0", "file 1", "file 2"]
+
+
+def test_manifest_delta_is_reported_with_the_source(tmp_path, storage):
+    (tmp_path / "a.txt").write_text("first file")
+    (tmp_path / "b.txt").write_text("second file")
+    source = {"name": "docs", "type": "file", "config": {"folder_path": str(tmp_path)}}
+    report = run_source(source, storage, {})
+    assert report["status"] == "success"
+    assert sorted(report["delta"]["new"]) == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+
+    (tmp_path / "b.txt").write_text("second file, edited")
+    (tmp_path / "a.txt").unlink()
+    report = run_source(source, storage, {})
+    assert report["delta"] == {"new": [], "modified": [str(tmp_path / "b.txt")],
+                               "deleted": [str(tmp_path / "a.txt")], "unchanged": 0}
+
+
+def test_pdf_page_offsets_index_the_stored_content(monkeypatch):
+    import src.ingestion.extractors as extractors
+    monkeypatch.setattr(extractors, "extract_pdf_pages", lambda file_path, **options: ["\n  First page", "Second"])
+
+    (content, metadata), = extractors.extract_pdf_documents("report.pdf", {})
+    stored = standardize_data({"content": content, "metadata": metadata})["content"]
+    assert [stored[offset:offset + 6] for offset in metadata["page_offsets"]] == ["First ", "Second"]
+
+
+def test_file_without_documents_is_recorded(tmp_path, storage):
+    (tmp_path / "empty.csv").write_text("id,content\n")
+    (tmp_path / "a.txt").write_text("first file")
+    source = {"name": "docs", "type": "file", "config": {"folder_path": str(tmp_path)}}
+    report = run_source(source, storage, {})
+    assert sorted(report["delta"]["new"]) == [str(tmp_path / "a.txt"), str(tmp_path / "empty.csv")]
+    assert storage.fetch_manifest(str(tmp_path))[str(tmp_path / "empty.csv")]["document_count"] == 0
+
+    report = run_source(source, storage, {})
+    assert report["delta"] == {"new": [], "modified": [], "deleted": [], "unchanged": 2}
+
+
+def test_file_emptied_since_the_last_run_loses_its_documents(tmp_path, storage):
+    (tmp_path / "rows.csv").write_text("id,content\n1,first row\n2,second row\n")
+    source = {"name": "docs", "type": "file", "config": {"folder_path": str(tmp_path)}}
+    assert run_source(source, storage, {})["documents"] > 0
+
+    (tmp_path / "rows.csv").write_text("id,content\n")
+    report = run_source(source, storage, {})
+    assert report["delta"]["modified"] == [str(tmp_path / "rows.csv")]
+    assert storage.collection.count_documents({"metadata.filepath": str(tmp_path / "rows.csv")}) == 0
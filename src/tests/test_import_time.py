@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+# Generous for a cold CI machine; loading torch alone usually exceeds it
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", 10))
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import src.main
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def test_app_import_stays_light(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # src.common logs to logs/app.log relative to the working directory
+    (tmp_path / "logs").mkdir()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    completed = subprocess.run([sys.executable, "-c", PROBE], cwd=tmp_path, env=env, capture_output=True,
+                               text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert result["loaded"] == [], f"Models are loaded on first use, not at import: {result['loaded']}"
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, f"import src.main took {result['seconds']:.2f}s"
@@ -0,0 +1,73 @@
+import os
+from src.ingestion.log_ingestion import iter_logs
+
+
+def read(path, state=None, **options):
+    documents = list(iter_logs(str(path), state, **options))
+    lines = [line for doc in documents for line in doc["content"].split("\n")]
+    return lines, (documents[-1]["metadata"]["checkpoint"] if documents else state)
+
+
+def test_appended_lines_are_read_once(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("one\ntwo\n")
+    lines, state = read(log)
+    assert lines == ["one", "two"]
+
+    with open(log, "a") as file:
+        file.write("three\n")
+    lines, state = read(log, state)
+    assert lines == ["three"]
+    assert read(log, state)[0] == []
+
+
+def test_partial_line_waits_for_its_end(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("one\ntw")
+    lines, state = read(log)
+    assert lines == ["one"]
+
+    with open(log, "a") as file:
+        file.write("o\n")
+    lines, state = read(log, state)
+    assert lines == ["two"]
+    assert state["files"][0]["line"] == 2
+
+
+def test_rotated_file_is_finished_before_the_new_one(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("one\n")
+    _, state = read(tmp_path)
+
+    with open(log, "a") as file:
+        file.write("two\n")
+    os.rename(log, tmp_path / "app.log.1")
+    log.write_text("three\n")
+
+    # The rotated copy is only read for the lines appended before the rotation
+    lines, state = read(tmp_path, state)
+    assert lines == ["two", "three"]
+    assert read(tmp_path, state)[0] == []
+
+
+def test_truncated_file_is_read_from_the_start(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("first line\nsecond line\n")
+    _, state = read(log)
+
+    log.write_text("new\n")
+    assert read(log, state)[0] == ["new"]
+
+
+def test_short_file_fingerprint_grows_with_the_file(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("start\n")
+    _, state = read(log)
+    with open(log, "a") as file:
+        file.write("x" * 100 + "\n")
+    _, state = read(log, state)
+    assert state["files"][0]["head_length"] == 64
+
+    # Same first bytes and a larger size, but different content within the first 64 bytes
+    log.write_text("start\n" + "y" * 100 + "\n" + "z\n")
+    assert read(log, state)[0] == ["start", "y" * 100, "z"]
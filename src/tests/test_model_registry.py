@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+import types
+import pytest
+from src.common.model_registry import load_quantized_onnx_model, ModelRegistry
+
+
+class FakeSentenceTransformer:
+    instances = []
+
+    def __init__(self, model_name, backend="torch", model_kwargs=None, **options):
+        self.model_name = model_name
+        self.model_kwargs = model_kwargs or {}
+        if self.model_kwargs.get("file_name"):
+            assert os.path.exists(os.path.join(model_name, self.model_kwargs["file_name"]))
+        FakeSentenceTransformer.instances.append(self)
+
+    def save(self, path):
+        os.makedirs(os.path.join(path, "onnx"), exist_ok=True)
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    exports = []
+
+    def export_dynamic_quantized_onnx_model(model, quantization_config, model_name_or_path, push_to_hub=False,
+                                            create_pr=False, file_suffix=None):
+        # Same naming rule as sentence-transformers: the default suffix depends on the weight type
+        suffix = file_suffix or f"quint8_{quantization_config}"
+        exports.append(suffix)
+        open(os.path.join(model_name_or_path, "onnx", f"model_{suffix}.onnx"), "wb").close()
+
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    module.export_dynamic_quantized_onnx_model = export_dynamic_quantized_onnx_model
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    FakeSentenceTransformer.instances = []
+    return exports
+
+
+def test_quantized_export_is_loaded_and_reused(tmp_path, fake_sentence_transformers):
+    model = load_quantized_onnx_model("org/tiny-model", str(tmp_path), "avx2")
+    assert fake_sentence_transformers == ["int8_avx2"]
+    assert model.model_kwargs["file_name"] == "onnx/model_int8_avx2.onnx"
+
+    # The export is found on the next load instead of being redone
+    load_quantized_onnx_model("org/tiny-model", str(tmp_path), "avx2")
+    assert fake_sentence_transformers == ["int8_avx2"]
+
+
+def test_quantized_round_trip_with_tiny_model(tmp_path):
+    pytest.importorskip("optimum.onnxruntime")
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    # A tiny random BERT built locally, so the test needs no download
+    bert_dir = tmp_path / "bert"
+    bert_dir.mkdir()
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "hello", "world", "quantized", "model"]
+    (bert_dir / "vocab.txt").write_text("\n".join(vocab))
+    BertTokenizer(str(bert_dir / "vocab.txt")).save_pretrained(str(bert_dir))
+    BertModel(BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+                         intermediate_size=37)).save_pretrained(str(bert_dir))
+    transformer = sentence_transformers.models.Transformer(str(bert_dir))
+    pooling = sentence_transformers.models.Pooling(transformer.get_word_embedding_dimension())
+    model_dir = tmp_path / "tiny-model"
+    sentence_transformers.SentenceTransformer(modules=[transformer, pooling]).save(str(model_dir))
+
+    export_dir = tmp_path / "onnx"
+    model = load_quantized_onnx_model(str(model_dir), str(export_dir), "avx2")
+    embeddings = model.encode(["hello world", "quantized model"])
+    assert embeddings.shape == (2, 32)
+
+    exported = os.path.join(export_dir, str(model_dir).replace("/", "__"), "onnx", "model_int8_avx2.onnx")
+    assert os.path.exists(exported)
+    modified = os.path.getmtime(exported)
+    load_quantized_onnx_model(str(model_dir), str(export_dir), "avx2")
+    assert os.path.getmtime(exported) == modified
+
+
+class FakeTensor:
+    def __init__(self, size):
+        self.size = size
+
+    def numel(self):
+        return self.size
+
+    def element_size(self):
+        return 1
+
+
+class FakeModel:
+    def __init__(self, name, size=0):
+        self.name = name
+        self.size = size
+
+    def parameters(self):
+        return [FakeTensor(self.size)]
+
+    def buffers(self):
+        return []
+
+
+def test_least_recently_used_model_is_evicted():
+    loads = []
+    registry = ModelRegistry(max_models=2, loader=lambda name, **options: loads.append(name) or FakeModel(name))
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")  # b is the least recently used
+    registry.get("a")
+    registry.get("b")
+
+    assert loads == ["a", "b", "c", "b"]
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 2)
+    assert [model["model"] for model in stats["resident_models"]] == ["a", "b"]
+
+
+def test_models_are_evicted_beyond_the_memory_limit():
+    registry = ModelRegistry(max_models=5, max_memory_bytes=100,
+                             loader=lambda name, size: FakeModel(name, size))
+    registry.get("a", size=60)
+    registry.get("b", size=30)
+    registry.get("c", size=30)
+    assert [model["model"] for model in registry.stats()["resident_models"]] == ["b", "c"]
+    # A model larger than the limit is still kept, alone
+    registry.get("d", size=150)
+    assert registry.stats()["resident_memory_bytes"] == 150
+
+
+def test_limits_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MODEL_REGISTRY_MAX_MODELS", "4")
+    monkeypatch.setenv("MODEL_REGISTRY_MAX_MEMORY_MB", "1.5")
+    registry = ModelRegistry.from_env()
+    assert (registry.max_models, registry.max_memory_bytes) == (4, 1572864)
+
+    monkeypatch.delenv("MODEL_REGISTRY_MAX_MODELS")
+    monkeypatch.delenv("MODEL_REGISTRY_MAX_MEMORY_MB")
+    registry = ModelRegistry.from_env()
+    assert (registry.max_models, registry.max_memory_bytes) == (2, None)
+
+
+def test_concurrent_requests_share_one_load():
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        started.set()
+        release.wait(5)
+        return FakeModel(name)
+
+    registry = ModelRegistry(loader=loader)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("a"))) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    time.sleep(0.1)  # Let the second request reach the pending load
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == ["a"]
+    assert registry.stats()["misses"] == 1
+    assert len(models) == 2 and models[0] is models[1]
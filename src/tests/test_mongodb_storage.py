@@ -0,0 +1,30 @@
+import mongomock
+from src.storage.mongodb_storage import MongoDBStorage
+
+
+def test_lookup_indexes_are_created(storage):
+    manifest_indexes = storage.manifest_collection.index_information()
+    assert manifest_indexes["filepath_1"]["unique"]
+    assert "root_1" in manifest_indexes
+    assert storage.state_collection.index_information()["key_1"]["unique"]
+    assert "metadata.filepath_1" in storage.collection.index_information()
+
+
+def test_indexes_are_created_once_per_collection(storage, monkeypatch):
+    calls = []
+    monkeypatch.setattr(mongomock.Collection, "create_index", lambda self, *args, **kwargs: calls.append(args))
+    MongoDBStorage("mongodb://localhost", "ingestion", "documents")
+    assert calls == []
+
+
+def test_filepaths_are_matched_under_the_folder_only(storage):
+    storage.bulk_store_data([
+        {"content": "a", "metadata": {"filepath": "/data/docs/a.txt"}},
+        {"content": "a, part 2", "metadata": {"filepath": "/data/docs/a.txt"}},
+        {"content": "b", "metadata": {"filepath": "/data/docs/sub/b.txt", "content_hash": "b"}},
+        {"content": "c", "metadata": {"filepath": "/data/docs2/c.txt"}},
+    ])
+    assert storage.fetch_filepaths("/data/docs") == {"/data/docs/a.txt", "/data/docs/sub/b.txt"}
+    assert storage.fetch_filepaths("/data/docs/") == {"/data/docs/a.txt", "/data/docs/sub/b.txt"}
+    assert set(storage.iter_filepaths("/data/docs", {"metadata.content_hash": {"$exists": False}})) == \
+           {"/data/docs/a.txt"}
@@ -0,0 +1,55 @@
+import numpy as np
+from qdrant_client import QdrantClient
+import src.storage.qdrant_storage as qdrant_storage
+from src.processing.deduplication import NearDuplicateIndex
+from src.processing.embedding_generation import ChunkEncoder
+from src.workflows.data_processing import store_embeddings
+
+TEXT = "the quick brown fox jumps over the lazy dog near the river bank today"
+
+
+class FakeModel:
+    def encode(self, texts, **options):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+
+def stored_points(storage):
+    points, _ = storage.client.scroll(storage.collection_name, limit=100, with_payload=True)
+    return sorted((point.payload["filepath"], point.payload["chunk_index"], str(point.id)) for point in points)
+
+
+def test_modified_documents_replace_their_points(monkeypatch):
+    monkeypatch.setattr(qdrant_storage, "QdrantClient", lambda **config: QdrantClient(":memory:"))
+    storage = qdrant_storage.QdrantStorage({"url": "http://localhost:6333", "collection": "chunks"})
+    encoder = ChunkEncoder(FakeModel(), {"chunking_method": "fixed_length", "chunk_size": 5})
+
+    original = [
+        {"_id": "first", "content": " ".join([TEXT] * 3), "metadata": {"filepath": "/data/a.txt"}},
+        {"_id": "other", "content": TEXT, "metadata": {"filepath": "/data/b.txt"}},
+    ]
+    assert store_embeddings(storage, encoder.embed(encoder.chunk(original)), encoder) == 12
+    other = [point for point in stored_points(storage) if point[0] == "/data/b.txt"]
+
+    # The modified file is stored again in MongoDB under a new _id, with fewer chunks
+    modified = [{"_id": "second", "content": TEXT, "metadata": {"filepath": "/data/a.txt", "change": "modified"}}]
+    batch = encoder.embed(encoder.chunk(modified))
+    assert store_embeddings(storage, batch, encoder) == 3
+
+    points = stored_points(storage)
+    assert [point for point in points if point[0] == "/data/a.txt"] == \
+        sorted(("/data/a.txt", index, point) for index, point in enumerate(batch.point_ids()))
+    assert [point for point in points if point[0] == "/data/b.txt"] == other
+
+
+def test_replaced_files_leave_the_near_duplicate_index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), "docs")
+    index.add(["a", "b"], [index.signature(TEXT)] * 2, ["/data/a.txt", "/data/b.txt"])
+
+    # A new version of a file is not a duplicate of its previous version
+    assert index.find_duplicates(["c"], [TEXT], filepaths=["/data/a.txt"]) == ["b"]
+    assert index.remove_filepaths(["/data/b.txt"]) == 1
+    assert index.find_duplicates(["c"], [TEXT], filepaths=["/data/a.txt"]) == [None]
+    assert index.find_duplicates(["d"], [TEXT], filepaths=["/data/d.txt"]) == ["a"]
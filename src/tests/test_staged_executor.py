@@ -0,0 +1,76 @@
+import itertools
+import threading
+import time
+import pytest
+from src.workflows.staged_executor import Stage, run_stages
+
+
+def run_in_thread(function):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = function()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_single_worker_stages_keep_the_order():
+    output = []
+    stats = run_stages(range(50), [Stage("double", lambda item: item * 2), Stage("store", output.append)])
+    assert output == [item * 2 for item in range(50)]
+    assert stats["stages"]["fetch"]["items"] == 50
+    assert stats["stages"]["store"]["items"] == 50
+
+
+def test_full_queue_blocks_the_source():
+    produced = []
+    release = threading.Event()
+
+    def source():
+        for item in range(100):
+            produced.append(item)
+            yield item
+
+    thread, result = run_in_thread(lambda: run_stages(source(), [Stage("slow", lambda item: release.wait(5) and None)],
+                                                      queue_size=1))
+    time.sleep(0.3)
+    # One item in the stage, one in the queue and one waiting for room
+    assert len(produced) <= 3
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(produced) == 100 and "error" not in result
+
+
+def test_finish_result_reaches_the_next_stage_after_the_items():
+    buffer, output = [], []
+
+    def collect(item):
+        buffer.append(item)
+
+    def flush():
+        return list(buffer)
+
+    run_stages(range(5), [Stage("collect", collect, 2, finish=flush), Stage("store", output.append)])
+    assert len(output) == 1
+    assert sorted(output[0]) == [0, 1, 2, 3, 4]
+
+
+def test_stage_error_is_raised_without_deadlock():
+    def fail(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    # An endless source and a blocked queue must not keep the pipeline alive
+    thread, result = run_in_thread(lambda: run_stages(itertools.count(), [
+        Stage("check", fail, 2), Stage("store", lambda item: time.sleep(0.01))], queue_size=1))
+    thread.join(5)
+    assert not thread.is_alive()
+    with pytest.raises(ValueError, match="bad item"):
+        raise result["error"]
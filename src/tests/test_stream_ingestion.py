@@ -0,0 +1,50 @@
+import pytest
+from src.ingestion.stream_ingestion import InMemoryBroker, MessageBroker, run_stream_ingestion
+
+
+def test_broker_interface_is_abstract():
+    class PollOnlyBroker(MessageBroker):
+        def poll(self, max_records, timeout):
+            return []
+
+    with pytest.raises(TypeError):
+        PollOnlyBroker()
+
+
+def test_batches_are_written_then_committed():
+    broker = InMemoryBroker([f"message {index}".encode() for index in range(5)])
+    written = []
+    stats = run_stream_ingestion(broker, written.append, max_batch_size=2, max_batch_seconds=0.05,
+                                 idle_timeout=0.2)
+    assert [doc["content"] for batch in written for doc in batch] == [f"message {index}" for index in range(5)]
+    assert broker.committed == {("in-memory", 0): 4}
+    assert stats["messages"] == 5
+
+
+def test_tombstones_are_skipped_and_committed():
+    broker = InMemoryBroker([b"created", None, b"", b"updated"])
+    written = []
+    stats = run_stream_ingestion(broker, written.append, max_batch_size=10, max_batch_seconds=0.05,
+                                 idle_timeout=0.2)
+    assert [doc["content"] for batch in written for doc in batch] == ["created", "updated"]
+    assert broker.committed == {("in-memory", 0): 3}
+    assert stats["skipped"] == 2
+
+
+def test_batch_of_tombstones_is_committed_without_writing():
+    broker = InMemoryBroker([None, None])
+    written = []
+    run_stream_ingestion(broker, written.append, max_batch_size=10, max_batch_seconds=0.05, idle_timeout=0.2)
+    assert written == []
+    assert broker.committed == {("in-memory", 0): 1}
+
+
+def test_failed_write_is_not_committed():
+    broker = InMemoryBroker([b"message"])
+
+    def write_batch(documents):
+        raise RuntimeError("MongoDB is down")
+
+    with pytest.raises(Exception, match="MongoDB is down"):
+        run_stream_ingestion(broker, write_batch, max_batch_seconds=0.05, idle_timeout=0.2)
+    assert broker.committed == {}
@@ -0,0 +1,38 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from src.processing.text_cleaning import (TextNormalizer, clean_batch, clean_text_reference, synthetic_texts,
+                                          benchmark_text_normalization)
+
+
+def test_large_batch_is_normalized_by_spawned_workers():
+    normalizer = TextNormalizer.from_config({})
+    batch = [{"content": f"  Document   {index}\n" + "word " * 2000} for index in range(200)]
+    expected = [normalizer.normalize(doc["content"]) for doc in batch]
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        cleaned = clean_batch(batch, normalizer, executor)
+    assert [doc["content"] for doc in cleaned] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    None,
+    42,
+    "   \n\t  ",
+    "See https://example.com/path?query=1&b=2#frag for details.",
+    "Mail user@example.com, or call +1 (555) 010-0000!",
+    "Café naïve Zürich 日本語 façade",
+    "Launch 🚀 now 😀 with flags 🇫🇷 and ✨ sparkles",
+    "The and of a an the is are was were to in on at",
+    "tabs\tand\r\nnewlines\u00a0and\u2003wide spaces",
+    "snake_case_words and 50% off -- #tags",
+])
+def test_default_rules_match_the_original_clean_text(text):
+    assert TextNormalizer().normalize(text) == clean_text_reference(text)
+
+
+def test_synthetic_corpus_benchmark_reports_identical_output():
+    texts = synthetic_texts(count=50, words_per_text=40)
+    assert texts == synthetic_texts(count=50, words_per_text=40)
+    assert all(TextNormalizer().normalize(text) == clean_text_reference(text) for text in texts)
+    assert benchmark_text_normalization(texts, repeat=1)["identical_output"]
@@ -0,0 +1,122 @@
+from src.processing import enrich_metadata, standardize_data, DocumentBatch
+
+
+class IngestionBatchWriter:
+    """
+    Buffers ingested documents and flushes them to MongoDB in small batches.
+
+    Enrichment and standardization run on each batch right before it is stored, so
+    only one batch of documents is held in memory per source. A batch is flushed
+    when it reaches `batch_size` documents or `max_batch_bytes` of content.
+
+    Documents whose metadata has `change == "modified"` replace the documents already
+    stored under the same filepath. A `checkpoint` in the metadata is removed before
+    storing, and the last one of a batch is persisted under `state_key` once the
+    batch is stored, so incremental sources resume from what actually reached MongoDB.
+
+    With `columnar`, each batch is enriched and standardized in one pass as a
+    DocumentBatch and only turned into MongoDB documents when it is stored.
+    """
+
+    def __init__(self, mongo_storage, source_config, batch_size=200, max_batch_bytes=32 * 1024 * 1024,
+                 on_flush=None, state_key=None, columnar=False):
+        """
+        :param mongo_storage: MongoDBStorage the batches are written to.
+        :param source_config: Configuration dictionary for the data source.
+        :param batch_size: Maximum number of documents per batch.
+        :param max_batch_bytes: Approximate maximum size of the buffered content per batch.
+        :param on_flush: Optional callable receiving each batch once it is stored.
+        :param state_key: Ingestion state key the source checkpoints are stored under.
+        :param columnar: Whether to process batches as DocumentBatch.
+        """
+        self.mongo_storage = mongo_storage
+        self.source_config = source_config
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.on_flush = on_flush
+        self.state_key = state_key
+        self.columnar = columnar
+        self.documents = []
+        self.buffered_bytes = 0
+        self.stored_documents = 0
+        self.stored_bytes = 0
+        self.flushes = 0
+        self.status = "success"
+        self.error = None
+        # Manifest delta of the run (new, modified, deleted, unchanged) for file sources
+        self.delta = None
+
+    def add(self, document):
+        """
+        Adds a document to the current batch, flushing the batch when it is full.
+
+        :param document: Dictionary with `content` and `metadata`.
+        """
+        self.documents.append(document)
+        self.buffered_bytes += document_size(document)
+        if len(self.documents) >= self.batch_size or self.buffered_bytes >= self.max_batch_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        Enriches, standardizes and stores the buffered documents.
+        """
+        if not self.documents:
+            return
+
+        checkpoint = None
+        for document in self.documents:
+            checkpoint = document.get("metadata", {}).pop("checkpoint", checkpoint)
+
+        if self.columnar:
+            batch = DocumentBatch.from_documents(self.documents).enrich_and_standardize(self.source_config)
+            replaced = batch.modified_filepaths()
+            standardized_data = batch.to_documents()
+        else:
+            enriched_data = enrich_metadata(self.documents, self.source_config)
+            standardized_data = [standardize_data(item) for item in enriched_data]
+            replaced = [doc["metadata"]["filepath"] for doc in standardized_data
+                        if doc["metadata"].get("change") == "modified"]
+        if replaced:
+            self.mongo_storage.delete_data({"metadata.filepath": {"$in": replaced}})
+        self.mongo_storage.bulk_store_data(standardized_data, batch_size=len(standardized_data))
+        if self.on_flush:
+            self.on_flush(standardized_data)
+        if checkpoint is not None and self.state_key:
+            self.mongo_storage.set_ingestion_state(self.state_key, checkpoint)
+
+        self.flushes += 1
+        self.stored_documents += len(standardized_data)
+        self.stored_bytes += self.buffered_bytes
+        print(f"Flushed batch {self.flushes} for {self.source_config.get('name', 'unknown')}: "
+              f"{len(standardized_data)} documents, {self.buffered_bytes} bytes")
+        self.documents = []
+        self.buffered_bytes = 0
+
+    def fail(self, error):
+        """
+        Marks the source as failed. Batches stored before the failure are kept.
+
+        :param error: The exception that stopped the source.
+        """
+        self.status = "failed"
+        self.error = self.error or str(error)
+
+    def close(self):
+        """
+        Flushes whatever is left in the buffer.
+        """
+        self.flush()
+
+
+def document_size(document):
+    """
+    Approximates the in-memory size of a document by the length of its content.
+
+    :param document: Dictionary with `content`.
+    :return: Approximate size in bytes.
+    """
+    content = document.get("content", "")
+    if isinstance(content, (str, bytes)):
+        return len(content)
+    return len(str(content))
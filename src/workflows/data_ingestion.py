@@ -1,12 +1,28 @@
-from src.ingestion import ingest_files, ingest_confluence, ingest_database, ingest_logs, ingest_datalake#, ingest_stream
-from src.processing import enrich_metadata, standardize_data
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.ingestion import (IngestionManifest, iter_files, iter_confluence, iter_database, iter_logs, iter_datalake,
+                           iter_crawl, KafkaBroker, run_stream_ingestion)
 from src.storage import MongoDBStorage
-from src.common import logger, construct_mongo_uri, get_mongodb_config
+from src.common import logger, construct_mongo_uri, get_mongodb_config, get_ingestion_config
 from src.crud import get_pipeline_by_id, get_config, get_pipeline_data_sources
+from src.workflows.batch_writer import IngestionBatchWriter
 from sqlalchemy.orm import Session
 
 
 def run_data_ingestion(db: Session, pipeline_id: int):
+    """
+    Ingests every data source of a pipeline, `source_concurrency` sources at a time.
+
+    A failing source does not stop the others; the overall status is derived from the
+    per-source reports (see `ingestion_status`). Stream sources are consumed until they
+    have been idle for their `idle_timeout` (30 seconds by default), so a pipeline with a
+    stream source takes at least that long.
+
+    :param db: Database session.
+    :param pipeline_id: ID of the pipeline.
+    :return: Dictionary with the status ("success", "partial" or "failed"), a message and
+             the report of every source, or {"error": ...} when the run could not start.
+    """
     try:
         # Fetch pipeline ingestion config
         print(f"Fetching pipeline: {pipeline_id}")
@@ -15,6 +31,10 @@ def run_data_ingestion(db: Session, pipeline_id: int):
         if "error" in mongo_config:
             return {"error": mongo_config["error"]}
 
+        ingestion_config = get_ingestion_config(db, pipeline_id)
+        if "error" in ingestion_config:
+            return {"error": ingestion_config["error"]}
+
         # Initialize MongoDB storage
         mongo_storage = MongoDBStorage(
             uri=mongo_config["uri"],
@@ -22,52 +42,234 @@ def run_data_ingestion(db: Session, pipeline_id: int):
             collection_name=mongo_config["collection_name"]
         )
 
-        all_data = []
         data_sources = get_pipeline_data_sources(db, pipeline_id)
         if "error" in data_sources:
             return {"error": data_sources["error"]}
 
         print("Start ingesting")
-        for source in data_sources:
-            print(f"ingesting source: {source}")
-            try:
-                if source["type"] == "file":
-                    data = ingest_files(source["config"]["folder_path"], mongo_storage)
-                elif source["type"] == "confluence":
-                    data = ingest_confluence(source["api_url"], source["auth"])
-                elif source["type"] == "database":
-                    data = ingest_database(source["connection"], source["query"])
-                elif source["type"] == "log":
-                    data = ingest_logs(source["file_path"])
-                elif source["type"] == "datalake":
-                    data = ingest_datalake(source["bucket_name"], source["prefix"])
-                # elif source["type"] == "stream":
-                #     data = ingest_stream(source["bootstrap_servers"], source["topic"], source["group_id"])
-                else:
-                    logger.warning(f"Unsupported source type: {source['type']}")
-                    continue
-
-                # Step 2: Enrich metadata
-                print("Enriching Metadata")
-                enriched_data = enrich_metadata(data, source)
-                # Step 3: Standardize data
-                print("Standardizing data structure")
-                standardized_data = [standardize_data(item) for item in enriched_data]
-                # Step 4: Add to all_data for bulk storage
-                print("Add to list for insertion")
-                all_data.extend(standardized_data)
-
-            except Exception as e:
-                logger.error(f"Error processing {source['name']}: {e}")
-
-        # Perform bulk insert in batches
-        print("Bulk insert")
-        mongo_storage.bulk_store_data(all_data, batch_size=200)
+        concurrency = max(1, int(ingestion_config.get("source_concurrency", 4)))
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest-source") as executor:
+            reports = list(executor.map(
+                lambda source: run_source(source, mongo_storage, ingestion_config), data_sources
+            ))
 
         # Close the connection after the pipeline is complete
         mongo_storage.close_connection()
-        return {"status": "success", "message": "Data ingestion completed successfully"}
+        status = ingestion_status(reports)
+        messages = {
+            "success": "Data ingestion completed successfully",
+            "partial": "Data ingestion completed with failed sources",
+            "failed": "Data ingestion failed for every source"
+        }
+        return {"status": status, "message": messages[status], "sources": reports}
 
     except Exception as e:
         logger.error(f"Data ingestion failed: {str(e)}")
         return {"error": f"Data ingestion failed: {str(e)}"}
+
+
+def ingestion_status(reports):
+    """
+    :param reports: Reports of the sources of a run, see `run_source`.
+    :return: "failed" when every ingested source failed, "partial" when some did, else "success".
+    """
+    failed = sum(1 for report in reports if report["status"] == "failed")
+    if failed and failed == sum(1 for report in reports if report["status"] != "skipped"):
+        return "failed"
+    return "partial" if failed else "success"
+
+
+def run_source(source, mongo_storage, ingestion_config):
+    """
+    Ingests one data source and reports how it went. Never raises, so one failing
+    source does not affect the others running concurrently.
+
+    :param source: Data source configuration.
+    :param mongo_storage: MongoDBStorage the documents are written to.
+    :param ingestion_config: Pipeline ingestion config.
+    :return: Dictionary with the source name, type, status, stored documents and bytes,
+             wall time in seconds and, for file sources, the manifest delta.
+    """
+    print(f"ingesting source: {source.get('name')}")
+    start = time.perf_counter()
+    report = {"name": source.get("name", "unknown"), "type": source.get("type", "unknown")}
+    try:
+        writer = ingest_source(source, mongo_storage, ingestion_config)
+        report.update({
+            "status": writer.status,
+            "documents": writer.stored_documents,
+            "bytes": writer.stored_bytes,
+        })
+        if writer.error:
+            report["error"] = writer.error
+        if writer.delta is not None:
+            report["delta"] = writer.delta
+    except Exception as e:
+        logger.error(f"Error processing {report['name']}: {e}")
+        report.update({"status": "failed", "documents": 0, "bytes": 0, "error": str(e)})
+    report["wall_time"] = round(time.perf_counter() - start, 3)
+    print(f"Source {report['name']}: {report['status']}, {report['documents']} documents, "
+          f"{report['bytes']} bytes in {report['wall_time']}s")
+    return report
+
+
+def ingest_source(source, mongo_storage, ingestion_config):
+    """
+    Streams the documents of one data source into MongoDB.
+
+    Documents are enriched, standardized and stored batch by batch as the source
+    yields them, so batches written before a failure are kept.
+
+    :param source: Data source configuration.
+    :param mongo_storage: MongoDBStorage the documents are written to.
+    :param ingestion_config: Pipeline ingestion config (`batch_size`, `batch_max_bytes`, `columnar_batches`).
+    :return: The batch writer, holding the stored document and byte counts and the manifest delta.
+    """
+    if source["type"] == "stream":
+        return ingest_stream_source(source, mongo_storage)
+
+    documents, manifest = open_source(source, mongo_storage, ingestion_config)
+    writer = IngestionBatchWriter(
+        mongo_storage,
+        source,
+        batch_size=int(ingestion_config.get("batch_size", 200)),
+        max_batch_bytes=int(ingestion_config.get("batch_max_bytes", 32 * 1024 * 1024)),
+        on_flush=manifest.record if manifest is not None else None,
+        state_key=source_state_key(source),
+        columnar=bool(ingestion_config.get("columnar_batches", False))
+    )
+    try:
+        if documents is None:
+            logger.warning(f"Unsupported source type: {source['type']}")
+            writer.status = "skipped"
+            return writer
+
+        for document in documents:
+            writer.add(document)
+    except Exception as e:
+        logger.error(f"Error processing {source['name']}: {e}")
+        writer.fail(e)
+    finally:
+        try:
+            writer.close()
+        except Exception as e:
+            logger.error(f"Error storing last batch of {source['name']}: {e}")
+            writer.fail(e)
+    if manifest is not None:
+        # Set once the files were all walked, see IngestionManifest.finish
+        writer.delta = manifest.delta
+
+    print(f"Stored {writer.stored_documents} documents from {source['name']}")
+    return writer
+
+
+def open_source(source, mongo_storage, ingestion_config):
+    """
+    Returns the documents of a data source and its ingestion manifest.
+
+    :param source: Data source configuration.
+    :param mongo_storage: MongoDBStorage of the pipeline.
+    :param ingestion_config: Pipeline ingestion config.
+    :return: Tuple (documents, manifest). documents is None for unsupported source types,
+             manifest is the IngestionManifest recording the stored batches of file sources, else None.
+    """
+    if source["type"] == "file":
+        folder_path = source["config"]["folder_path"]
+        manifest = IngestionManifest(mongo_storage, folder_path).load()
+        return iter_files(folder_path, manifest, ingestion_config), manifest
+    elif source["type"] == "confluence":
+        stored = mongo_storage.fetch_metadata_map({"metadata.datasource": source["name"]}, ["version"])
+        stored_versions = {filepath: fields["version"] for filepath, fields in stored.items()}
+        return iter_confluence(
+            source["api_url"],
+            source["auth"],
+            stored_versions,
+            concurrency=int(source.get("concurrency", 8)),
+            page_size=int(source.get("page_size", 50))
+        ), None
+    elif source["type"] == "database":
+        state = mongo_storage.get_ingestion_state(source_state_key(source)) or {}
+        return iter_database(source["connection"], source, state.get("watermark"), state.get("key")), None
+    elif source["type"] == "log":
+        return iter_logs(
+            source["file_path"],
+            mongo_storage.get_ingestion_state(source_state_key(source)),
+            record_pattern=source.get("record_pattern"),
+            records_per_document=int(source.get("records_per_document", 1000))
+        ), None
+    elif source["type"] == "datalake":
+        stored = mongo_storage.fetch_metadata_map({"metadata.datasource": source["name"]}, ["etag"])
+        # Only the last document of an object carries `document_count`, objects without it are incomplete
+        completed = mongo_storage.fetch_metadata_map(
+            {"metadata.datasource": source["name"], "metadata.document_count": {"$exists": True}}, ["etag"]
+        )
+        stored_etags = {filepath: completed.get(filepath, {}).get("etag") for filepath in stored}
+        return iter_datalake(
+            source["bucket_name"],
+            source["prefix"],
+            stored_etags,
+            ingestion_config,
+            workers=int(source.get("workers", 8))
+        ), None
+    elif source["type"] == "web":
+        stored = mongo_storage.fetch_metadata_map(
+            {"metadata.datasource": source["name"]}, ["etag", "last_modified", "links"]
+        )
+        return iter_crawl(
+            source["seed_urls"],
+            stored,
+            max_depth=int(source.get("max_depth", 2)),
+            max_pages=int(source.get("max_pages", 1000)),
+            concurrency=int(source.get("concurrency", 16)),
+            per_host_concurrency=int(source.get("per_host_concurrency", 4))
+        ), None
+    return None, None
+
+
+def ingest_stream_source(source, mongo_storage, broker=None, stop_event=None):
+    """
+    Consumes a stream source in micro-batches until it is idle (or stopped).
+
+    Each micro-batch is enriched, standardized and stored as one MongoDB batch, and its
+    offsets are committed only once it is stored.
+
+    :param source: Stream source configuration (bootstrap_servers, topic, group_id,
+                   max_batch_size, max_batch_seconds, max_pending_batches, idle_timeout, max_batches).
+    :param mongo_storage: MongoDBStorage the documents are written to.
+    :param broker: Optional MessageBroker, defaults to a Kafka consumer of the source.
+    :param stop_event: Optional threading.Event stopping the consumer.
+    :return: The batch writer, holding the stored document and byte counts.
+    """
+    writer = IngestionBatchWriter(mongo_storage, source, batch_size=float("inf"), max_batch_bytes=float("inf"))
+
+    def write_batch(documents):
+        for document in documents:
+            writer.add(document)
+        writer.flush()
+
+    try:
+        broker = broker or KafkaBroker(source["bootstrap_servers"], source["topic"], source["group_id"])
+        run_stream_ingestion(
+            broker,
+            write_batch,
+            max_batch_size=int(source.get("max_batch_size", 500)),
+            max_batch_seconds=float(source.get("max_batch_seconds", 5.0)),
+            max_pending_batches=int(source.get("max_pending_batches", 4)),
+            stop_event=stop_event,
+            max_batches=source.get("max_batches"),
+            idle_timeout=float(source.get("idle_timeout", 30.0))
+        )
+    except Exception as e:
+        logger.error(f"Error processing {source['name']}: {e}")
+        writer.fail(e)
+
+    print(f"Stored {writer.stored_documents} documents from {source['name']}")
+    return writer
+
+
+def source_state_key(source):
+    """
+    :param source: Data source configuration.
+    :return: Key the ingestion state (checkpoints) of the source is stored under.
+    """
+    return f"{source['type']}:{source.get('name', 'unknown')}"
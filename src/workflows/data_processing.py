@@ -1,6 +1,9 @@
+import multiprocessing
 from src.storage import MongoDBStorage, QdrantStorage
-from src.processing import clean_batch, generate_embeddings
-import copy
+from concurrent.futures import ProcessPoolExecutor
+from src.chunking import SPAN_METHODS
+from src.processing import clean_batch, clean_chunks, create_chunk_encoder, create_embedding_pool, TextNormalizer
+from src.workflows.staged_executor import Stage, run_stages
 from sqlalchemy.orm import Session
 from src.common import get_processing_config, get_mongodb_config, get_qdrant_config
 
@@ -10,6 +13,13 @@ def data_processing_pipeline(db: Session, pipeline_id: int):
     Pipeline to fetch data from MongoDB, clean it, chunk it, generate embeddings,
     and load the embeddings into Qdrant vector database.
 
+    The stages run concurrently (see `run_stages`); `stage_workers` in the processing
+    config sets the threads of the clean, embed and load stages. Text is normalized
+    with the `text_normalization` rules, in `cleaning_workers` processes for large batches.
+    Span-based chunking methods chunk the stored content and clean each chunk, so the
+    chunk offsets in the Qdrant payloads index the content stored in MongoDB.
+    With `dedup_mode` set, near-duplicate chunks are dropped or linked before embedding.
+
     :param config: Configuration dictionary with MongoDB and Qdrant details.
     """
     # MongoDB Configuration
@@ -35,50 +45,139 @@ def data_processing_pipeline(db: Session, pipeline_id: int):
     qdrant_storage = QdrantStorage(qdrant_config)
 
     batch_size = 200
+    stage_workers = processing_config.get("stage_workers", {})
+    normalizer = TextNormalizer.from_config(processing_config)
+    cleaning_workers = int(processing_config.get("cleaning_workers", 1))
+    cleaning_executor = None
+    if cleaning_workers > 1:
+        # The stages run in threads, so the cleaning workers are spawned rather than forked
+        cleaning_executor = ProcessPoolExecutor(max_workers=cleaning_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+    pool = None
     try:
-        for batch in mongo_storage.fetch_unprocessed_data(batch_size):
-            if not isinstance(batch, list):
-                raise ValueError("Expected batch to be a list of documents.")
-            if not batch:  # Stop if the batch is empty
-                print("No more data to process. Stopping the pipeline.")
-                break
-
-            print(f"Fetched batch of size {len(batch)} from MongoDB.")
-
+        # With `embedding_workers` > 1 the chunks are encoded by worker processes
+        pool = create_embedding_pool(processing_config)
+        # Chunks are gathered across batches and encoded together, see ChunkEncoder
+        encoder = create_chunk_encoder(processing_config, pool, qdrant_config["collection"])
+        chunk_spans = processing_config.get("chunking_method", "fixed_length") in SPAN_METHODS
+        stored = []
+
+        def fetch_batches():
+            for batch in mongo_storage.fetch_unprocessed_data(batch_size):
+                if not isinstance(batch, list):
+                    raise ValueError("Expected batch to be a list of documents.")
+                if not batch:  # Stop if the batch is empty
+                    print("No more data to process. Stopping the pipeline.")
+                    break
+                print(f"Fetched batch of size {len(batch)} from MongoDB.")
+                yield batch
+
+        def clean_and_chunk(batch):
             # Step 1: Clean the batch
-            cleaned_batch = clean_batch(batch)
+            if chunk_spans:
+                # The stored content is chunked, so the chunk offsets index it, then the chunks are cleaned
+                chunked = clean_chunks(encoder.chunk(valid_documents(batch)), normalizer, cleaning_executor)
+                print(f"Cleaned chunks of {len(chunked)} documents.")
+                return chunked
+            cleaned_batch = clean_batch(batch, normalizer, cleaning_executor)
             print(f"Cleaned batch of size {len(cleaned_batch)}.")
+            return encoder.chunk(cleaned_batch)
 
-            # Step 2: Generate embeddings
-            embeddings = generate_embeddings(cleaned_batch, processing_config)
-            # Validate the embeddings
-            if not embeddings or not isinstance(embeddings, list):
-                print("Error: generate_embeddings returned None or invalid data")
-                return {"error": "Embedding generation failed. Ensure input data is correct."}
-
-            # Check for invalid vectors (None, empty, or incorrect format)
-            valid_embeddings = []
-            for emb in embeddings:
-                if emb.get("embedding") and isinstance(emb["embedding"], list) and len(emb["embedding"]) > 0:
-                    valid_embeddings.append(emb)
+        def embed(chunked):
+            # Step 2: Generate embeddings once enough chunks are pending
+            return encoder.add_chunked(chunked) or None
 
-            if not valid_embeddings:
-                print("Error: All generated embeddings are empty or invalid.")
-                return {"error": "Generated embeddings are empty or invalid. Check embedding model."}
+        def flush_embeddings():
+            return encoder.flush() or None
 
-            print(f"Generated {len(valid_embeddings)} valid embeddings.")
-
-            qdrant_storage.upsert_documents(valid_embeddings)
-            print(f"Loaded {len(valid_embeddings)} embeddings into Qdrant.")
+        def load(embeddings):
+            # Step 3: Load the embeddings into Qdrant
+            stored.append(store_embeddings(qdrant_storage, embeddings, encoder))
 
             # Step 4: Mark documents as processed
             # for doc in batch:
             #     mongo_storage.mark_as_processed(doc["metadata"]["filepath"])
-        return {"status": "success", "message": "Data processing completed successfully"}
+
+        # Fetch, clean/chunk, embed and load run concurrently, connected by bounded queues
+        stage_stats = run_stages(
+            fetch_batches(),
+            [
+                Stage("clean", clean_and_chunk, int(stage_workers.get("clean", 1))),
+                Stage("embed", embed, int(stage_workers.get("embed", 1)), finish=flush_embeddings),
+                Stage("load", load, int(stage_workers.get("load", 1))),
+            ],
+            queue_size=int(processing_config.get("stage_queue_size", 4))
+        )
+        embedding_stats = encoder.report()
+        # Chunks dropped as near-duplicates are not expected in Qdrant
+        if embedding_stats["chunks"] > embedding_stats["duplicates"] and not sum(stored):
+            print("Error: All generated embeddings are empty or invalid.")
+            return {"error": "Generated embeddings are empty or invalid. Check embedding model."}
+
+        return {"status": "success", "message": "Data processing completed successfully",
+                "embedding_stats": embedding_stats, "stage_stats": stage_stats}
 
     except Exception as e:
         print(f"Error in data processing pipeline: {e}")
         return {"error": f"Failed to process data: {str(e)}"}
     finally:
+        if pool is not None:
+            pool.close()
+        if cleaning_executor is not None:
+            cleaning_executor.shutdown(cancel_futures=True)
         mongo_storage.close_connection()
         print("MongoDB connection closed.")
+
+
+def valid_documents(batch):
+    """
+    :param batch: A list of documents.
+    :return: The documents with a non-empty string `content`.
+    """
+    documents = []
+    for doc in batch:
+        if isinstance(doc, dict) and isinstance(doc.get("content"), str) and doc["content"]:
+            documents.append(doc)
+        else:
+            print(f"Skipping invalid document: {doc}")
+    return documents
+
+
+def store_embeddings(qdrant_storage, embeddings, encoder=None):
+    """
+    Validates embeddings and loads the valid ones into Qdrant, after deleting the points
+    of the previous version of the modified documents.
+
+    :param qdrant_storage: QdrantStorage of the pipeline.
+    :param embeddings: EmbeddingBatch of the pipeline's ChunkEncoder.
+    :param encoder: Optional ChunkEncoder, whose near-duplicate index gets the stored canonical chunks.
+    :return: Number of embeddings loaded.
+    """
+    if not len(embeddings):
+        return 0
+
+    # A modified document was stored under a new id, the points of its old version are removed
+    replaced = embeddings.modified_filepaths()
+    if replaced:
+        qdrant_storage.delete_filepaths(replaced)
+        if encoder is not None:
+            encoder.forget(replaced)
+
+    # Near-duplicates linked to chunks of earlier batches take their vector from Qdrant
+    links = embeddings.unresolved_links()
+    if links:
+        resolved = embeddings.resolve_links(qdrant_storage.fetch_vectors(list(links)))
+        print(f"Linked {resolved} near-duplicate chunks to stored vectors.")
+
+    # Drop non-finite or all-zero vectors in one pass over the matrix
+    valid_embeddings, invalid = embeddings.validate()
+    if invalid:
+        print(f"Skipping {invalid} invalid embeddings.")
+
+    print(f"Generated {len(valid_embeddings)} valid embeddings.")
+    if len(valid_embeddings):
+        qdrant_storage.upsert_batch(valid_embeddings)
+        print(f"Loaded {len(valid_embeddings)} embeddings into Qdrant.")
+        if encoder is not None:
+            encoder.commit(valid_embeddings)
+    return len(valid_embeddings)
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+Stage = namedtuple("Stage", ["name", "function", "workers", "finish"], defaults=[1, None])
+Stage.__doc__ = """
+A step of a staged pipeline.
+
+:param name: Name reported in the stats.
+:param function: Callable receiving one item and returning the item passed to the
+                 next stage, or None to pass nothing on.
+:param workers: Number of threads running the stage.
+:param finish: Optional callable run once after the last item, whose result (if not
+               None) is passed to the next stage, e.g. to flush a buffer.
+"""
+
+_DONE = object()
+
+
+def run_stages(source, stages, queue_size=4, source_name="fetch"):
+    """
+    Runs a source and a chain of stages concurrently, connected by bounded queues.
+
+    Every stage runs on its own threads, so I/O-bound stages (fetching, storing) overlap
+    with CPU-bound ones (cleaning, encoding). A stage whose output queue is full blocks,
+    which throttles the stages before it. Items may be reordered by stages running
+    more than one worker. The first exception raised by any stage stops the pipeline
+    and is raised again once every thread exited.
+
+    :param source: Iterable producing the items of the first stage.
+    :param stages: List of Stage.
+    :param queue_size: Capacity of each queue between two stages.
+    :param source_name: Name of the source in the stats.
+    :return: Dictionary with the wall time and, per stage, its number of workers, items
+             processed, busy seconds (summed over workers), idle seconds (waiting for
+             input or for room in the output queue) and busy ratio.
+    """
+    names = [source_name] + [stage.name for stage in stages]
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stats = {name: {"workers": 1 if index == 0 else stages[index - 1].workers, "items": 0,
+                    "busy_seconds": 0.0, "idle_seconds": 0.0}
+             for index, name in enumerate(names)}
+    lock = threading.Lock()
+    stop = threading.Event()
+    failure = []
+
+    def put(output_queue, item, stage_stats):
+        start = time.perf_counter()
+        while not stop.is_set():
+            try:
+                output_queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with lock:
+            stage_stats["idle_seconds"] += time.perf_counter() - start
+
+    def fail(error):
+        with lock:
+            failure.append(error)
+        stop.set()
+
+    def run_source():
+        stage_stats = stats[source_name]
+        output_queue = queues[0] if queues else None
+        try:
+            iterator = iter(source)
+            while not stop.is_set():
+                start = time.perf_counter()
+                item = next(iterator, _DONE)
+                with lock:
+                    stage_stats["busy_seconds"] += time.perf_counter() - start
+                if item is _DONE:
+                    break
+                with lock:
+                    stage_stats["items"] += 1
+                if output_queue is not None:
+                    put(output_queue, item, stage_stats)
+        except Exception as e:
+            fail(e)
+        finally:
+            if output_queue is not None:
+                for _ in range(stages[0].workers):
+                    put(output_queue, _DONE, stage_stats)
+
+    remaining = [stage.workers for stage in stages]
+
+    def run_worker(index):
+        stage = stages[index]
+        stage_stats = stats[stage.name]
+        input_queue = queues[index]
+        output_queue = queues[index + 1] if index + 1 < len(queues) else None
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = input_queue.get(timeout=0.1)
+                except queue.Empty:
+                    with lock:
+                        stage_stats["idle_seconds"] += time.perf_counter() - start
+                    continue
+                with lock:
+                    stage_stats["idle_seconds"] += time.perf_counter() - start
+                if item is _DONE:
+                    break
+
+                start = time.perf_counter()
+                result = stage.function(item)
+                with lock:
+                    stage_stats["busy_seconds"] += time.perf_counter() - start
+                    stage_stats["items"] += 1
+                if result is not None and output_queue is not None:
+                    put(output_queue, result, stage_stats)
+        except Exception as e:
+            fail(e)
+        finally:
+            with lock:
+                remaining[index] -= 1
+                last_worker = remaining[index] == 0
+            if last_worker:
+                # The last worker of a stage finishes it and tells the next stage
+                try:
+                    if stage.finish is not None and not stop.is_set():
+                        start = time.perf_counter()
+                        result = stage.finish()
+                        with lock:
+                            stage_stats["busy_seconds"] += time.perf_counter() - start
+                        if result is not None and output_queue is not None:
+                            put(output_queue, result, stage_stats)
+                except Exception as e:
+                    fail(e)
+                finally:
+                    if output_queue is not None:
+                        for _ in range(stages[index + 1].workers):
+                            put(output_queue, _DONE, stage_stats)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_source, name=f"stage-{source_name}", daemon=True)]
+    for index, stage in enumerate(stages):
+        for worker in range(stage.workers):
+            threads.append(threading.Thread(target=run_worker, args=(index,), name=f"stage-{stage.name}-{worker}",
+                                            daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    if failure:
+        raise failure[0]
+
+    for stage_stats in stats.values():
+        capacity = wall_seconds * stage_stats["workers"]
+        stage_stats["busy_ratio"] = round(stage_stats["busy_seconds"] / capacity, 3) if capacity else 0.0
+        stage_stats["busy_seconds"] = round(stage_stats["busy_seconds"], 3)
+        stage_stats["idle_seconds"] = round(stage_stats["idle_seconds"], 3)
+    bottleneck = max(stats, key=lambda name: stats[name]["busy_ratio"])
+    for name, stage_stats in stats.items():
+        print(f"Stage {name}: {stage_stats['items']} items, {stage_stats['workers']} worker(s), "
+              f"busy {stage_stats['busy_seconds']}s, idle {stage_stats['idle_seconds']}s "
+              f"({stage_stats['busy_ratio']:.0%} busy)")
+    print(f"Pipeline ran in {wall_seconds:.2f}s, bottleneck stage: {bottleneck}")
+    return {"wall_seconds": round(wall_seconds, 3), "bottleneck": bottleneck, "stages": stats}